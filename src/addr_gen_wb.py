@@ -14,16 +14,20 @@ Marek Guminski (marek.guminski<at>gmail.com)
 The code is published under LGPL V2 license
 """
 from lxml import etree as let
-import xml.etree.ElementTree as et
-import xml.parsers.expat as pe
-from io import StringIO
 import os
 import sys
-import shutil
 import zlib
 import argparse
+import atexit
+import cProfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 import wb_block as wb
 import include
+import incremental as inc
+from incremental import write_file
+from emitter import Emitter
+import profiler as prof
 import logging as log
 
 # The module expressions accepts definitions of constants (function addval)
@@ -40,20 +44,46 @@ PARSER.add_argument("--ipbus", help="IPbus outputs destination", default="")
 PARSER.add_argument("--amapxml", help="AMap XML outputs destination", default="")
 PARSER.add_argument("--header", help="C header outputs destination", default="")
 PARSER.add_argument("--fs", help="Forth outputs destination", default="")
-PARSER.add_argument("--python", help="Python outputs destination (can't be used together with --pythondca)", default="")
-PARSER.add_argument("--pythondca", help="Python for DCA outputs destination (can't be used together with --python)", default="")
+PARSER.add_argument("--python", help="Python outputs destination (can't be used together with --pythondca or --pythonasync)", default="")
+PARSER.add_argument("--pythondca", help="Python for DCA outputs destination (can't be used together with --python or --pythonasync)", default="")
+PARSER.add_argument("--pythonasync", help="Python for asyncio outputs destination (can't be used together with --python or --pythondca)", default="")
+PARSER.add_argument("--python_props", help="Generate Python classes with subblocks, registers and bitfields as class attributes", action="store_true")
 PARSER.add_argument("--html", help="HTML documentation destination", default="")
 PARSER.add_argument(
     "--fusesoc", help="Generate FuseSoc .core file", action="store_true"
 )
 PARSER.add_argument("--fusesoc_vlnv", help="FuseSoc VLNV tag", default="")
 PARSER.add_argument("--eprj", help="Generate the VEXTPROJ .eprj file", action="store_true")
+PARSER.add_argument("--manifest", help="Manifest file path (if the inputs and outputs didn't change since the previous run, the generation is skipped)", default="")
+PARSER.add_argument("--cache", help="Cache file path (the elaborated model is stored there, and reused if the XML files and the generator didn't change)", default="")
+PARSER.add_argument("--jobs", help="Number of parallel generation processes", type=int, default=1)
 PARSER.add_argument("--verbose", help="Add verbosity to program output", action="store_true")
+PARSER.add_argument("--profile", help="Profile output path (JSON trace with time, memory peak and object counts of the generation phases and blocks)", default="")
+PARSER.add_argument("--cprofile", help="cProfile statistics output path", default="")
 ARGS = PARSER.parse_args()
 
 if ARGS.verbose:
     log.basicConfig(level=log.DEBUG)
-    
+
+def finish_profile():
+    """ Writes the profiling results (also when the generation
+    is finished with sys.exit).
+    """
+    if ARGS.cprofile:
+        CPROFILE.disable()
+        CPROFILE.dump_stats(ARGS.cprofile)
+    if ARGS.profile:
+        prof.end_all()
+        prof.write_trace(ARGS.profile)
+        print(prof.summary(), end="")
+
+if ARGS.profile:
+    prof.start()
+if ARGS.cprofile:
+    CPROFILE = cProfile.Profile()
+    CPROFILE.enable()
+if ARGS.profile or ARGS.cprofile:
+    atexit.register(finish_profile)
 
 INFILENAME = ARGS.infile
 
@@ -77,9 +107,9 @@ wb.GLB.C_HEADER_PATH = ARGS.header
 if wb.GLB.C_HEADER_PATH:
     os.makedirs(wb.GLB.C_HEADER_PATH, exist_ok=True)
 
-# We need a special handling of two mutual exclusive Python targets
-if ARGS.python and ARGS.pythondca:
-    print("--python and --pythondca can't be used together")
+# We need a special handling of three mutual exclusive Python targets
+if len([p for p in (ARGS.python, ARGS.pythondca, ARGS.pythonasync) if p]) > 1:
+    print("--python, --pythondca and --pythonasync can't be used together")
     sys.exit(1)
 
 wb.GLB.PYTHON_PATH = ""
@@ -91,81 +121,173 @@ if ARGS.pythondca:
     wb.GLB.PYTHON_PATH = ARGS.pythondca
     wb.GLB.PYTHON_SRC_PATH = "../targets/python/agwb_dca/"
 
+if ARGS.pythonasync:
+    wb.GLB.PYTHON_PATH = ARGS.pythonasync
+    wb.GLB.PYTHON_SRC_PATH = "../targets/python/agwb_async/"
+
 if wb.GLB.PYTHON_PATH:
     os.makedirs(wb.GLB.PYTHON_PATH, exist_ok=True)
+wb.GLB.PYTHON_PROPS = ARGS.python_props
 
 wb.GLB.HTML_PATH = ARGS.html
 if wb.GLB.HTML_PATH:
     os.makedirs(wb.GLB.HTML_PATH, exist_ok=True)
 
-# The line below reads the XML and recursively inserts included XMLs
-# it also generates the list of objects describing the origin of each line
-# in the final XML (to facilitate future error detection)
-FINAL_XML, LINES_ORIGIN = include.handle_includes(INFILENAME)
-# The version ID is calculated as a hash of the XML defining the interface
-# it is encoded in UTF-8, to avoid problems with different locales
-wb.GLB.VER_ID = zlib.crc32(bytes(FINAL_XML.encode("utf-8")))
-
-# We get the root element, and find the corresponding block
-try:
-    EL_ROOT = et.fromstring(FINAL_XML)
-except et.ParseError as perr:
-    # Handle the parsing error
-    ROW, COL = perr.position
-    print(
-        "Parsing error "
-        + str(perr.code)
-        + "("
-        + pe.ErrorString(perr.code)
-        + ") in column "
-        + str(COL)
-        + " of the line "
-        + str(ROW)
-        + " of the concatenated XML:"
+# The elaborated model may be restored from the cache, if neither
+# the included XML files, nor the generator were changed
+MODEL = None
+if ARGS.cache:
+    prof.begin("load_cache")
+    MODEL = inc.load_model(ARGS.cache, INFILENAME)
+    prof.end()
+if MODEL is None:
+    prof.begin("includes")
+    # The line below reads the XML and recursively inserts included XMLs
+    # it also generates the list of objects describing the origin of each line
+    # in the final XML (to facilitate future error detection)
+    FINAL_XML, LINES_ORIGIN = include.handle_includes(INFILENAME)
+    # The version ID is calculated as a hash of the XML defining the interface
+    # it is encoded in UTF-8, to avoid problems with different locales
+    wb.GLB.VER_ID = zlib.crc32(bytes(FINAL_XML.encode("utf-8")))
+    XML_HASH = inc.text_hash(FINAL_XML)
+    prof.end()
+else:
+    XML_HASH = MODEL["xml_hash"]
+    wb.GLB.VER_ID = MODEL["ver_id"]
+    TOP_NAME = MODEL["top_name"]
+    wb.GLB.TOP_NAME = TOP_NAME
+    for cnst in MODEL["defines"]:
+        ex.locals[cnst] = MODEL["defines"][cnst]
+        ex.defines[cnst] = MODEL["defines"][cnst]
+        ex.comments[cnst] = MODEL["comments"][cnst]
+    wb.GLB.blocks = MODEL["blocks"]
+    wb.GLB.blackboxes = MODEL["blackboxes"]
+    wb.GLB.variants = MODEL["variants"]
+    log.info("Elaborated model restored from the cache")
+
+# If the inputs and the generated files didn't change since the previous run,
+# there is nothing to do
+if ARGS.manifest:
+    # Options that don't affect the generated files are not included
+    INPUTS_HASH = inc.inputs_hash(
+        XML_HASH,
+        {k: v for k, v in vars(ARGS).items()
+         if k not in ("jobs", "verbose", "cache", "manifest", "profile", "cprofile")},
     )
-    print(FINAL_XML.split("\n")[ROW - 1])
-    print(COL * "-" + "|")
-    print("The erroneous line was produced from the following sources:")
-    ERR_SRC = include.find_error(LINES_ORIGIN, ROW)
-    for src in ERR_SRC:
-        print("file: " + src[0] + ", line:" + str(src[1]))
-    sys.exit(1)
-
-# Check tree with DTD
-lxml_parser = let.XMLParser(dtd_validation=True)
-dtd_path = os.path.join(os.path.dirname(__file__), "agwb.dtd")
-dtd = let.DTD(dtd_path)
-agwb_tree = let.parse(StringIO(FINAL_XML))
-valid = dtd.validate(agwb_tree)
-if not valid:
-    print(dtd.error_log)
-    errline=str(dtd.error_log[0]).split(":")
-    if len(errline) > 2:
-        ROW=int(errline[1])
-        COL=int(errline[2])
+    if inc.manifest_up_to_date(ARGS.manifest, INPUTS_HASH):
+        log.info("Inputs and outputs unchanged, generation skipped")
+        sys.exit(0)
+
+if MODEL is None:
+    # We get the root element, and find the corresponding block
+    # The XML is parsed only once (with lxml), and the same tree
+    # is validated and used to build the blocks
+    prof.begin("parse")
+    try:
+        EL_ROOT = let.fromstring(FINAL_XML.encode("utf-8"))
+    except let.XMLSyntaxError as perr:
+        # Handle the parsing error
+        ROW, COL = perr.position
+        print(
+            "Parsing error "
+            + str(perr.code)
+            + "("
+            + perr.msg
+            + ") in column "
+            + str(COL)
+            + " of the line "
+            + str(ROW)
+            + " of the concatenated XML:"
+        )
         print(FINAL_XML.split("\n")[ROW - 1])
-        print(COL * "-" + "|")
+        print((COL - 1) * "-" + "|")
         print("The erroneous line was produced from the following sources:")
         ERR_SRC = include.find_error(LINES_ORIGIN, ROW)
         for src in ERR_SRC:
-            print("file: " + src[0] + ", line:" + str(src[1]))        
-    sys.exit(1)
-    
-TOP_NAME = EL_ROOT.attrib["top"]
-wb.GLB.TOP_NAME = TOP_NAME
+            print("file: " + src[0] + ", line:" + str(src[1]))
+        sys.exit(1)
+    prof.end()
+
+    # Check tree with DTD
+    prof.begin("validate")
+    dtd_path = os.path.join(os.path.dirname(__file__), "agwb.dtd")
+    dtd = let.DTD(dtd_path)
+    valid = dtd.validate(EL_ROOT)
+    if not valid:
+        print(dtd.error_log)
+        ROW = dtd.error_log[0].line
+        COL = dtd.error_log[0].column
+        if ROW > 0:
+            print(FINAL_XML.split("\n")[ROW - 1])
+            print(COL * "-" + "|")
+            print("The erroneous line was produced from the following sources:")
+            ERR_SRC = include.find_error(LINES_ORIGIN, ROW)
+            for src in ERR_SRC:
+                print("file: " + src[0] + ", line:" + str(src[1]))        
+        sys.exit(1)
+    prof.end()
+
+    prof.begin("construct")
+    TOP_NAME = EL_ROOT.attrib["top"]
+    wb.GLB.TOP_NAME = TOP_NAME
+
+    if "masters" in EL_ROOT.attrib:
+        N_MASTERS = ex.exprval(EL_ROOT.attrib["masters"])
+    else:
+        N_MASTERS = 1
+    # Find constants and feed them into the expressions module
+    for el in EL_ROOT.findall("constant"):
+        ex.addval(el.attrib["name"], el.attrib["val"])
+
+    # Now we find the top block definition
+
+    # We should evaluate the address space requirements in each block
+    # In the first run, we calculate the space occupied by registers,
+    # but as blocks may be defined in different order, we also
+    # analyze the block dependencies.
+
+    # Create the list of blocks
+    for el in EL_ROOT.findall("block"):
+        # Here we take each block and count registers inside
+        # We also prepare the list of subblocks (of vectors of
+        # subblocks)
+        bn = el.attrib["name"]
+        if bn in wb.blocks():
+            raise Exception("Duplicate definition of block: " + bn)
+        bl = wb.WbBlock(el)
+        wb.blocks()[bn] = bl
+    prof.end()
+    # Here we have everything, we could get from the first scan.
+    prof.begin("analyze")
+    BL = wb.blocks()[TOP_NAME]
+    # overwite the number of master ports in the top module
+    BL.N_MASTERS = N_MASTERS
+    BL.analyze()
+    prof.end()
+    if ARGS.cache:
+        prof.begin("save_cache")
+        inc.save_model(
+            ARGS.cache,
+            INFILENAME,
+            set(loc.fpath for loc in LINES_ORIGIN),
+            {
+                "xml_hash": XML_HASH,
+                "ver_id": wb.GLB.VER_ID,
+                "top_name": TOP_NAME,
+                "defines": ex.defines,
+                "comments": ex.comments,
+                "blocks": wb.GLB.blocks,
+                "blackboxes": wb.GLB.blackboxes,
+                "variants": wb.GLB.variants,
+            },
+        )
+        prof.end()
 
-if "masters" in EL_ROOT.attrib:
-    N_MASTERS = ex.exprval(EL_ROOT.attrib["masters"])
-else:
-    N_MASTERS = 1
-# Find constants and feed them into the expressions module
-for el in EL_ROOT.findall("constant"):
-    ex.addval(el.attrib["name"], el.attrib["val"])
 # We prepare the packages with constants for different backends
+prof.begin("constants")
 # For VHDL
 if wb.GLB.VHDL_PATH:
-    with open(wb.GLB.VHDL_PATH + "/agwb_pkg.vhd", "w") as fo:
-        fo.write(
+    write_file(wb.GLB.VHDL_PATH + "/agwb_pkg.vhd",
 """--- This file has been automatically generated
 --- by the agwb (https://github.com/wzab/agwb).
 --- Please don't edit it manually, unless you really have to do it
@@ -185,6 +307,7 @@ package agwb_pkg is
   type t_reps_variants is array (integer range <>) of integer;
   type t_ver_id_variants is array (integer range <>) of std_logic_vector(31 downto 0);
    function agwb_and(a : std_logic_vector; b : std_logic_vector ) return std_logic_vector;
+   function agwb_mwr(a : std_logic_vector; d : std_logic_vector; half : integer ) return std_logic_vector;
 
 end package agwb_pkg;
 
@@ -197,207 +320,279 @@ package body agwb_pkg is
      return res;
   end function;
 
+  -- Masked write: the bits of the selected half of a (0 - bits 15..0,
+  -- 1 - bits 31..16) enabled by d(31 downto 16) are replaced with d(15 downto 0)
+  function agwb_mwr(a:std_logic_vector; d:std_logic_vector; half:integer) return std_logic_vector is
+  variable res : std_logic_vector(a'length-1 downto 0);
+  variable dat : std_logic_vector(31 downto 0);
+  begin
+     res := a;
+     dat := d;
+     for i in 0 to 15 loop
+        if 16 * half + i < a'length then
+           if dat(16 + i) = '1' then
+              res(16 * half + i) := dat(i);
+           end if;
+        end if;
+     end loop;
+     return res;
+  end function;
+
 end agwb_pkg;
 
 """
-        )        
-    with open(wb.GLB.VHDL_PATH + "/" + TOP_NAME + "_const_pkg.vhd", "w") as fo:
-        fo.write(
-            """library ieee;
+        )
+    res = """library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
 library work;
 """
+    res += "package " + TOP_NAME + "_const_pkg is\n"
+    res += (
+            "constant C_" + TOP_NAME + "_system_ver"
+            + " : std_logic_vector(31 downto 0) := "
+            + 'x"' + format(wb.GLB.VER_ID, "08x") + '";\n'
         )
-        fo.write("package " + TOP_NAME + "_const_pkg is\n")
-        fo.write(
-                "constant C_" + TOP_NAME + "_system_ver"
-                + " : std_logic_vector(31 downto 0) := "
-                + 'x"' + format(wb.GLB.VER_ID, "08x") + '";\n'
-            )
-        for cnst in ex.defines:
-            fo.write(
-                "constant C_"
-                + cnst
-                + " : integer := "
-                + str(ex.defines[cnst])
-                + "; -- "
-                + ex.comments[cnst]
-                + "\n"
-            )
-        fo.write("end package;\n")
+    for cnst in ex.defines:
+        res += (
+            "constant C_"
+            + cnst
+            + " : integer := "
+            + str(ex.defines[cnst])
+            + "; -- "
+            + ex.comments[cnst]
+            + "\n"
+        )
+    res += "end package;\n"
+    write_file(wb.GLB.VHDL_PATH + "/" + TOP_NAME + "_const_pkg.vhd", res)
 # For C
 if wb.GLB.C_HEADER_PATH:
-    with open(wb.GLB.C_HEADER_PATH + "/agwb_" + TOP_NAME + "_const.h", "w") as fo:
-        GUARD_NAME = "_agwb_" + TOP_NAME + "_inc_H_"
-        fo.write("#ifndef " + GUARD_NAME + "\n")
-        fo.write("#define " + GUARD_NAME + "\n\n")
-        for cnst in ex.defines:
-            fo.write(
-                "#define "
-                + cnst
-                + " "
-                + str(ex.defines[cnst])
-                + " // "
-                + ex.comments[cnst]
-                + "\n"
-            )
-        fo.write("\n#endif\n")
+    GUARD_NAME = "_agwb_" + TOP_NAME + "_inc_H_"
+    res = "#ifndef " + GUARD_NAME + "\n"
+    res += "#define " + GUARD_NAME + "\n\n"
+    for cnst in ex.defines:
+        res += (
+            "#define "
+            + cnst
+            + " "
+            + str(ex.defines[cnst])
+            + " // "
+            + ex.comments[cnst]
+            + "\n"
+        )
+    res += "\n#endif\n"
+    write_file(wb.GLB.C_HEADER_PATH + "/agwb_" + TOP_NAME + "_const.h", res)
 # For Python
 if wb.GLB.PYTHON_PATH:
     dst_path = wb.GLB.PYTHON_PATH + "/agwb"
     os.makedirs(dst_path, exist_ok=True)
     src_path = os.path.join(os.path.dirname(__file__), wb.GLB.PYTHON_SRC_PATH)
-    shutil.copy(src_path + "__init__.py", dst_path)
-    shutil.copy(src_path + "agwb.py", dst_path)
-    with open(wb.GLB.PYTHON_PATH + "/agwb/" + TOP_NAME + "_const.py", "w") as fo:
-        for cnst in ex.defines:
-            fo.write(
-                cnst + " = " + str(ex.defines[cnst]) + " # " + ex.comments[cnst] + "\n"
-            )
-    with open(wb.GLB.PYTHON_PATH + "/agwb/" + "__init__.py", "a") as f:
-        f.write(
-                "from ." + TOP_NAME + "_const import *\n"
-        )
+    write_file(dst_path + "/agwb.py", inc.read_file(src_path + "agwb.py"))
+    # The flavour independent part of agwb.py
+    write_file(dst_path + "/agwb_common.py", inc.read_file(src_path + "agwb_common.py"))
+    res = ""
+    for cnst in ex.defines:
+        res += cnst + " = " + str(ex.defines[cnst]) + " # " + ex.comments[cnst] + "\n"
+    write_file(wb.GLB.PYTHON_PATH + "/agwb/" + TOP_NAME + "_const.py", res)
+    # The __init__.py is completed after generation of the access code
+    PYTHON_INIT = inc.read_file(src_path + "__init__.py")
+    PYTHON_INIT += "from ." + TOP_NAME + "_const import *\n"
+prof.end()
 # Generation of constants for Forth is added to the generation of
 # the access words
 
-# Now we find the top block definition
-
-# We should evaluate the address space requirements in each block
-# In the first run, we calculate the space occupied by registers,
-# but as blocks may be defined in different order, we also
-# analyze the block dependencies.
-
-# Create the list of blocks
-for el in EL_ROOT.findall("block"):
-    # Here we take each block and count registers inside
-    # We also prepare the list of subblocks (of vectors of
-    # subblocks)
-    bn = el.attrib["name"]
-    if bn in wb.blocks():
-        raise Exception("Duplicate definition of block: " + bn)
-    bl = wb.WbBlock(el)
-    wb.blocks()[bn] = bl
-# Here we have everything, we could get from the first scan.
-BL = wb.blocks()[TOP_NAME]
-# overwite the number of master ports in the top module
-BL.N_MASTERS = N_MASTERS
-BL.analyze()
-
 # Create the list of variants for formats that support it
 variants = [None,]
 if wb.GLB.variants > 1:
     variants += range(0,wb.GLB.variants)
 
+def gen_task(task):
+    """ Runs a single generation task: the backend "kind" for the block
+    (or blackbox) "key" and variant "nvar". The generated text is returned
+    (for backends that don't write the files directly), together with the version
+    ID (for AMAP XML) and the lists of files created by the task.
+    With --jobs > 1 the tasks are run in worker processes forked
+    from the main process, so the lists must be passed back to it.
+    """
+    kind, key, nvar = task
+    n_vhdl = len(wb.created_files["vhdl"])
+    n_written = len(inc.written_files)
+    n_changed = len(inc.changed_files)
+    n_events = len(prof.events)
+    if prof.enabled:
+        prof.begin(kind + ":" + key + ("" if nvar is None else ":v" + str(nvar)), "block")
+    res = None
+    if kind == "amap":
+        BL = wb.blocks()[key]
+        BL.gen_amap_xml(nvar)
+        if nvar is None:
+            res = BL.ver_full
+        else:
+            res = BL.ver_var[nvar]
+    elif kind == "vhdl":
+        wb.blocks()[key].gen_vhdl()
+    elif kind == "python_bb":
+        res = str(wb.blackboxes()[key].gen_python(nvar))
+    elif kind == "python":
+        res = str(wb.blocks()[key].gen_python(nvar))
+    elif kind == "ipbus":
+        wb.blocks()[key].gen_ipbus_xml()
+    elif kind == "c_bb":
+        wb.blackboxes()[key].gen_c_header()
+    elif kind == "c":
+        wb.blocks()[key].gen_c_header()
+    prof.end()
+    return (
+        res,
+        wb.created_files["vhdl"][n_vhdl:],
+        inc.written_files[n_written:],
+        inc.changed_files[n_changed:],
+        prof.events[n_events:],
+    )
+
+def run_tasks(tasks):
+    """ Runs the generation tasks (in parallel if --jobs > 1) and returns
+    their results in the order of tasks. The lists of created files
+    are updated in that order too, so they are deterministic.
+    """
+    if ARGS.jobs <= 1:
+        return [gen_task(task)[0] for task in tasks]
+    # The workers must be forked, to inherit the elaborated model
+    with ProcessPoolExecutor(ARGS.jobs, mp_context=mp.get_context("fork")) as executor:
+        results = list(executor.map(gen_task, tasks, chunksize=max(1, len(tasks) // (4 * ARGS.jobs))))
+    for res, vhdl_files, written, changed, events in results:
+        wb.created_files["vhdl"] += vhdl_files
+        inc.written_files += written
+        inc.changed_files += changed
+        prof.events += events
+    return [res[0] for res in results]
+
+USED_BLOCKS = [key for key, BL in wb.blocks().items() if BL.used]
+
 # Now we generate the AMAPXML address tables for possible variants
 # This target must be run first, as it generates VER ID for blocks
 # The block gen_amap_xml checks if the output path exists.
-for nvar in variants:
-    for key, BL in wb.blocks().items():
-        if BL.used:
-            BL.gen_amap_xml(nvar)
-
-# Now we can generate the VHDL code that implements
-# the system
+prof.begin("amap")
+TASKS = [("amap", key, nvar) for nvar in variants for key in USED_BLOCKS]
+for task, ver in zip(TASKS, run_tasks(TASKS)):
+    if task[2] is None:
+        wb.blocks()[task[1]].ver_full = ver
+    else:
+        wb.blocks()[task[1]].ver_var[task[2]] = ver
+prof.end()
+
+# Now the remaining backends only read the elaborated model,
+# so all blocks and backends may be generated independently.
+prof.begin("backends")
+TASKS = []
+# The VHDL code that implements the system
 if wb.GLB.VHDL_PATH:
-    for key, BL in wb.blocks().items():
-        if BL.used:
-            BL.gen_vhdl()
-# Now we generate the Python access code
+    TASKS += [("vhdl", key, None) for key in USED_BLOCKS]
+# The Python access code
+if wb.GLB.PYTHON_PATH:
+    for nvar in variants:
+        TASKS += [("python_bb", key, nvar) for key in wb.blackboxes()]
+        TASKS += [("python", key, nvar) for key in USED_BLOCKS]
+# The IPbus address tables
+if wb.GLB.IPBUS_PATH:
+    TASKS += [("ipbus", key, None) for key in USED_BLOCKS]
+# The C address tables
+if wb.GLB.C_HEADER_PATH:
+    TASKS += [("c_bb", key, None) for key in wb.blackboxes()]
+    TASKS += [("c", key, None) for key in USED_BLOCKS]
+RESULTS = dict(zip(TASKS, run_tasks(TASKS)))
+# The gen_c_header sorts the areas of the block by address. That order
+# affects the Forth and HTML outputs, so it must be also applied
+# in the main process, when the C headers were generated by the workers.
+if (ARGS.jobs > 1) and wb.GLB.C_HEADER_PATH:
+    for key in USED_BLOCKS:
+        wb.blocks()[key].areas.sort(key=wb.WbArea.sort_adr)
+prof.end()
+
+# Now we assemble the Python access code
 if wb.GLB.PYTHON_PATH:
+    prof.begin("python")
     for nvar in variants:
-        res = """\"\"\"
+        res = Emitter("""\"\"\"
 This file has been automatically generated
 by the agwb (https://github.com/wzab/agwb).
 Do not modify it by hand.
 \"\"\"\n
-"""
+""")
         res += "from . import agwb\n\n"
-        for key, BL in wb.blackboxes().items():
-            res += BL.gen_python(nvar)
-        for key, BL in wb.blocks().items():
-            if BL.used:
-                res += BL.gen_python(nvar)
+        for key in wb.blackboxes():
+            res += RESULTS[("python_bb", key, nvar)]
+        for key in USED_BLOCKS:
+            res += RESULTS[("python", key, nvar)]
         topname = TOP_NAME
         if nvar is not None:
             topname += "_v" + str(nvar)
-        with open(wb.GLB.PYTHON_PATH + "/agwb/" + topname + ".py", "w") as fo:
-            fo.write(res)
-        with open(wb.GLB.PYTHON_PATH + "/agwb/" + "__init__.py", "a") as f:
-            f.write(
-                    "from ." + topname + " import " + TOP_NAME + " as " + topname + "\n"
-            )
-# Now we generate the IPbus address tables
-if wb.GLB.IPBUS_PATH:
-    for key, BL in wb.blocks().items():
-        if BL.used:
-            BL.gen_ipbus_xml()
+        res.write(wb.GLB.PYTHON_PATH + "/agwb/" + topname + ".py")
+        PYTHON_INIT += "from ." + topname + " import " + TOP_NAME + " as " + topname + "\n"
+    write_file(wb.GLB.PYTHON_PATH + "/agwb/" + "__init__.py", PYTHON_INIT)
+    prof.end()
 
-# Now we generate the C address tables
-if wb.GLB.C_HEADER_PATH:
-    for key, BL in wb.blackboxes().items():
-        BL.gen_c_header()
-    for key, BL in wb.blocks().items():
-        if BL.used:
-            BL.gen_c_header()
 # Generate the Forth address table
 BL = wb.blocks()[TOP_NAME]
 if wb.GLB.FORTH_PATH:
-    with open(wb.GLB.FORTH_PATH + "/agwb_" + TOP_NAME + ".fs", "w") as fo:
-        # First generate constants
-        for cnst in ex.defines:
-            fo.write(
-                ": /%"
-                + cnst
-                + " $"
-                + format(ex.defines[cnst], "x")
-                + " ; \\ "
-                + ex.comments[cnst]
-                + "\n"
-            )
-        # Now generate the HW access words
-        ROOT_WORD = "//"
-        # Add empty definition for ROOT_WORD
-        fo.write(": " + ROOT_WORD + " $0 ;\n")
-        fo.write(BL.gen_forth(ROOT_WORD))
+    prof.begin("forth")
+    # First generate constants
+    res = Emitter()
+    for cnst in ex.defines:
+        res += (
+            ": /%"
+            + cnst
+            + " $"
+            + format(ex.defines[cnst], "x")
+            + " ; \\ "
+            + ex.comments[cnst]
+            + "\n"
+        )
+    # Now generate the HW access words
+    ROOT_WORD = "//"
+    # Add empty definition for ROOT_WORD
+    res += ": " + ROOT_WORD + " $0 ;\n"
+    res += BL.gen_forth(ROOT_WORD)
+    res.write(wb.GLB.FORTH_PATH + "/agwb_" + TOP_NAME + ".fs")
+    prof.end()
 
 if wb.GLB.HTML_PATH:
-    with open(wb.GLB.HTML_PATH + "/agwb_address_map.html", "w") as fo:
-        fo.write(BL.gen_html(0, ""))
+    prof.begin("html")
+    BL.gen_html(0, "").write(wb.GLB.HTML_PATH + "/agwb_address_map.html")
+    prof.end()
 
 if ARGS.fusesoc:
-    with open("./agwb_" + TOP_NAME + ".core", "w") as fo:
-        fo.write("CAPI=2:\n")
-
-        coredata = {
-            "name": ARGS.fusesoc_vlnv,
-            "targets": {"default": {}},
-        }
-
-        created_files = wb.created_files["vhdl"]
-        created_files.insert(0,wb.GLB.VHDL_PATH + "/agwb_pkg.vhd")
-        created_files.append(wb.GLB.VHDL_PATH + "/" + TOP_NAME + "_const_pkg.vhd")
-        coredata["filesets"] = {
-            "rtl": {
-                "files": created_files,
-                "file_type": "vhdlSource-93",
-                "logical_name": "agwb",
-            }
+    coredata = {
+        "name": ARGS.fusesoc_vlnv,
+        "targets": {"default": {}},
+    }
+
+    created_files = wb.created_files["vhdl"]
+    created_files.insert(0,wb.GLB.VHDL_PATH + "/agwb_pkg.vhd")
+    created_files.append(wb.GLB.VHDL_PATH + "/" + TOP_NAME + "_const_pkg.vhd")
+    coredata["filesets"] = {
+        "rtl": {
+            "files": created_files,
+            "file_type": "vhdlSource-93",
+            "logical_name": "agwb",
         }
-        coredata["targets"]["default"]["filesets"] = ["rtl"]
+    }
+    coredata["targets"]["default"]["filesets"] = ["rtl"]
 
-        fo.write(yaml.dump(coredata))
+    write_file("./agwb_" + TOP_NAME + ".core", "CAPI=2:\n" + yaml.dump(coredata))
 
 if ARGS.eprj:
-    with open(wb.GLB.VHDL_PATH + "/agwb_" + TOP_NAME + ".eprj", "w") as fo:
-        # Copy the list of created files, but remove the directory
-        created_files = []
-        created_files.append("agwb_pkg.vhd")
-        for file in wb.created_files["vhdl"]:
-            file = file.split("/")[-1]
-            created_files.append(file)
-        created_files.append(TOP_NAME + "_const_pkg.vhd")
-        for file in created_files:
-            fo.write("vhdl agwb " + file + "\n")
-
+    # Copy the list of created files, but remove the directory
+    created_files = []
+    created_files.append("agwb_pkg.vhd")
+    for file in wb.created_files["vhdl"]:
+        file = file.split("/")[-1]
+        created_files.append(file)
+    created_files.append(TOP_NAME + "_const_pkg.vhd")
+    res = ""
+    for file in created_files:
+        res += "vhdl agwb " + file + "\n"
+    write_file(wb.GLB.VHDL_PATH + "/agwb_" + TOP_NAME + ".eprj", res)
+
+if ARGS.manifest:
+    inc.write_manifest(ARGS.manifest, INPUTS_HASH)
@@ -62,11 +62,31 @@ if __name__ == "__main__":
         args += ['--pythondca', files_root + pythondca]
     except:
         pass
+    try:
+        pythonasync = str(config['parameters']['pythonasync'])
+        args += ['--pythonasync', files_root + pythonasync]
+    except:
+        pass
+    try:
+        if config['parameters']['python_props']:
+            args += ['--python_props']
+    except:
+        pass
     try:
         html = str(config['parameters']['html'])
         args += ['--html', files_root + html]
     except:
         pass
+    try:
+        cache = str(config['parameters']['cache'])
+        args += ['--cache', files_root + cache]
+    except:
+        pass
+    try:
+        jobs = str(config['parameters']['jobs'])
+        args += ['--jobs', jobs]
+    except:
+        pass
 
     ret = subprocess.run(args)
     if ret.returncode != 0:
@@ -0,0 +1,58 @@
+"""
+This module implements the emitter collecting the generated code.
+
+Written by Wojciech M. Zabolotny
+(wzab01<at>gmail.com or wzab<at>ise.pw.edu.pl)
+
+The code is published under LGPL V2 license
+
+The generated text is appended to the list of chunks, and joined
+only once, when the result is needed (e.g. written to the file).
+Thanks to that the generation time grows linearly with the size
+of the output (repeated concatenation of the growing strings
+may be quadratic).
+"""
+from incremental import write_file
+
+class Emitter(object):
+    """Collects the generated text.
+
+    The text is added with the "+=" operator (like for strings),
+    so the existing generator code may be used without changes.
+    Another Emitter may be added too.
+    """
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, text=""):
+        self.chunks = []
+        if text:
+            self.chunks.append(text)
+
+    def __iadd__(self, text):
+        if isinstance(text, Emitter):
+            self.chunks.extend(text.chunks)
+        else:
+            self.chunks.append(text)
+        return self
+
+    def add_lines(self, value, indent):
+        """ Adds all lines from value, with the given indentation
+        (lines are separated with "\\n" only).
+        """
+        ind = indent * " "
+        lines = value.split("\n")
+        for l_n in lines[:-1]:
+            self.chunks.append(ind + l_n + "\n")
+        if lines[-1]:
+            self.chunks.append(ind + lines[-1])
+
+    def __str__(self):
+        text = "".join(self.chunks)
+        # Keep the joined text, so that the next join is trivial
+        self.chunks = [text] if text else []
+        return text
+
+    def write(self, path):
+        """ Writes the collected text to the file (only if it changed). """
+        return write_file(path, str(self))
@@ -0,0 +1,154 @@
+"""
+This module supports the incremental generation.
+
+Written by Wojciech M. Zabolotny
+(wzab01<at>gmail.com or wzab<at>ise.pw.edu.pl)
+
+The code is published under LGPL V2 license
+
+All generated files are written with write_file, which does not
+touch the file if its contents has not changed (so its modification
+time is preserved, and the downstream tools do not redo their work).
+The cache stores the elaborated model (blocks with calculated
+addresses, constants and versions) together with the hashes of all
+included XML files and of the generator sources, so that parsing
+and elaboration may be skipped in the next run.
+The manifest stores the hash of the inputs (the concatenated XML,
+the arguments and the generator sources) and the hashes of all
+generated files, so a rerun with identical inputs may be skipped.
+"""
+import glob
+import hashlib
+import json
+import logging as log
+import os
+import pickle
+import zlib
+
+# Paths of all generated files (in the order of generation)
+written_files = []
+# Paths of generated files that were really (re)written
+changed_files = []
+
+def file_crc(path):
+    """ Returns the CRC of the file contents (or None if it can't be read). """
+    try:
+        with open(path, "rb") as f_i:
+            return zlib.crc32(f_i.read())
+    except OSError:
+        return None
+
+def write_file(path, content):
+    """ Writes the content to the file, only if it differs from
+    the current contents of the file.
+    Returns True if the file was written.
+    """
+    written_files.append(path)
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f_i:
+            if f_i.read() == data:
+                log.debug("Unchanged: %s", path)
+                return False
+    except OSError:
+        pass
+    with open(path, "wb") as f_o:
+        f_o.write(data)
+    changed_files.append(path)
+    log.debug("Written: %s", path)
+    return True
+
+def read_file(path):
+    """ Returns the contents of the file (used for copying the files
+    with write_file).
+    """
+    with open(path, "r", encoding="utf-8") as f_i:
+        return f_i.read()
+
+def sources_hash():
+    """ Returns the hash of the generator sources (the generator
+    modules, the DTD and the copied Python runtime files).
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(glob.glob(os.path.join(src_dir, "*.py")))
+    paths.append(os.path.join(src_dir, "agwb.dtd"))
+    paths += sorted(glob.glob(os.path.join(src_dir, "../targets/python/agwb*/*.py")))
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f_i:
+            h.update(f_i.read())
+    return h.hexdigest()
+
+def text_hash(text):
+    """ Returns the hash of the text (e.g. the concatenated XML). """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def inputs_hash(xml_hash, args):
+    """ Returns the hash of all inputs of the generator:
+    the concatenated XML (given by its hash), the arguments
+    and the generator sources.
+    """
+    h = hashlib.sha256()
+    h.update(xml_hash.encode("utf-8"))
+    h.update(json.dumps(args, sort_keys=True).encode("utf-8"))
+    h.update(sources_hash().encode("utf-8"))
+    return h.hexdigest()
+
+def manifest_up_to_date(path, key):
+    """ Checks if the manifest stored in path was created for the same
+    inputs (key) and all files listed in it are present and unchanged.
+    """
+    try:
+        with open(path, "r") as f_i:
+            manifest = json.load(f_i)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("inputs") != key:
+        return False
+    for fpath, crc in manifest["files"].items():
+        if file_crc(fpath) != crc:
+            log.info("Generated file %s is missing or modified", fpath)
+            return False
+    return True
+
+def write_manifest(path, key):
+    """ Stores the manifest describing the current generation. """
+    manifest = {
+        "inputs": key,
+        "files": {fpath: file_crc(fpath) for fpath in written_files},
+    }
+    write_file(path, json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+
+def load_model(path, top_file):
+    """ Returns the elaborated model of the system described in top_file,
+    stored in the cache, or None if the cache is missing or outdated
+    (any of the included XML files or the generator sources have changed).
+    """
+    try:
+        with open(path, "rb") as f_i:
+            cache = pickle.load(f_i)
+    except Exception:
+        return None
+    if (cache.get("top") != top_file) or (cache.get("sources") != sources_hash()):
+        return None
+    for fpath, crc in cache["files"].items():
+        if file_crc(fpath) != crc:
+            log.info("XML file %s changed, the cache is outdated", fpath)
+            return None
+    return cache["model"]
+
+def save_model(path, top_file, xml_files, model):
+    """ Stores the elaborated model in the cache together with
+    the hashes of the included XML files and the generator sources.
+    """
+    cache = {
+        "top": top_file,
+        "sources": sources_hash(),
+        "files": {fpath: file_crc(fpath) for fpath in sorted(xml_files)},
+        "model": model,
+    }
+    # Write to the temporary file first, so that an interrupted run
+    # does not leave the corrupted cache
+    with open(path + ".tmp", "wb") as f_o:
+        pickle.dump(cache, f_o, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,110 @@
+"""
+This module records the profile of the generation.
+
+Written by Wojciech M. Zabolotny
+(wzab01<at>gmail.com or wzab<at>ise.pw.edu.pl)
+
+The code is published under LGPL V2 license
+
+The generation is divided into spans (phases, and generation
+of each block by each backend), started with begin and finished
+with end. For each span the wall time and the peak of the memory
+allocated by Python (traced with tracemalloc) are recorded.
+For phases, also the number of objects tracked by the garbage
+collector is recorded.
+The spans are written as the JSON trace (Chrome trace event format),
+that may be viewed e.g. in Perfetto, chrome://tracing or speedscope.
+When the profiling is not started, begin and end do nothing.
+"""
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+enabled = False
+# Finished spans (trace events)
+events = []
+# Stack of the started spans
+_stack = []
+_t_start = 0.0
+
+class _Span(object):
+    __slots__ = ("name", "cat", "t_begin", "peak", "objects")
+
+    def __init__(self, name, cat):
+        self.name = name
+        self.cat = cat
+        self.objects = None
+        # The peak of the enclosing span must be preserved,
+        # as the peak is reset for the new span
+        cur, peak = tracemalloc.get_traced_memory()
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self.peak = cur
+        if cat == "phase":
+            self.objects = len(gc.get_objects())
+        self.t_begin = time.perf_counter()
+
+def start():
+    """ Starts the profiling. """
+    global enabled, _t_start
+    enabled = True
+    tracemalloc.start()
+    _t_start = time.perf_counter()
+
+def begin(name, cat="phase"):
+    """ Starts the span. The category "phase" is used for the phases of
+    the generation, other categories (e.g. "block") for smaller spans.
+    """
+    if enabled:
+        _stack.append(_Span(name, cat))
+
+def end():
+    """ Finishes the most recently started span. """
+    if enabled:
+        _end()
+
+def end_all():
+    """ Finishes all started spans (e.g. when the generation
+    was interrupted with sys.exit).
+    """
+    while _stack:
+        _end()
+
+def _end():
+    t_end = time.perf_counter()
+    span = _stack.pop()
+    span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+    if _stack:
+        _stack[-1].peak = max(_stack[-1].peak, span.peak)
+    tracemalloc.reset_peak()
+    args = {"peak_mem": span.peak}
+    if span.objects is not None:
+        args["objects"] = len(gc.get_objects())
+        args["objects_delta"] = args["objects"] - span.objects
+    events.append({
+        "name": span.name,
+        "cat": span.cat,
+        "ph": "X",
+        "ts": (span.t_begin - _t_start) * 1e6,
+        "dur": (t_end - span.t_begin) * 1e6,
+        "pid": os.getpid(),
+        "tid": 0,
+        "args": args,
+    })
+
+def write_trace(path):
+    """ Writes the recorded spans as the JSON trace. """
+    with open(path, "w") as f_o:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f_o)
+
+def summary():
+    """ Returns the table with the wall time and memory peak of the phases. """
+    res = "%-20s %10s %12s %10s\n" % ("phase", "time [s]", "peak [kB]", "objects")
+    for ev in events:
+        if ev["cat"] == "phase":
+            res += "%-20s %10.3f %12d %10d\n" % (
+                ev["name"], ev["dur"] / 1e6, ev["args"]["peak_mem"] // 1024, ev["args"]["objects"])
+    return res
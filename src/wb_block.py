@@ -14,10 +14,12 @@ The code is published under LGPL V2 license
 
 This file implements the class handling a Wishbone connected block
 """
+import keyword
 import logging as log
-import re
 import zlib
 import expressions as ex
+from incremental import write_file
+from emitter import Emitter
 
 # Define if "volatile" should be used in C headers (if you use _sync_synchronize()
 # it may be probably avoided with better results!
@@ -254,6 +256,8 @@ class GlobalVars(object):
         self.blackboxes = {}
         self.variants = 0
         self.VER_ID = 0
+        # Generate Python classes with properties (--python_props)
+        self.PYTHON_PROPS = False
 
 
 GLB = GlobalVars()
@@ -928,6 +932,45 @@ class WbReg(WbObject):
         d_t += "    int_regs_wb_m_i.err <= '0';\n"
         d_t += "  end if;\n"
         d_t += "end loop; -- "  + self.size_generic + "\n"
+        # Masked write access via the alias windows (if enabled in the block)
+        if self.regtype == "creg" and not self.mode and parent.mwr_window != 0:
+            for half in (0, 1):
+                d_t += (
+                    'for i in 0 to '
+                    + self.size_generic + ' - 1 loop\n'
+                )
+                d_t += (
+                    '  if int_addr = std_logic_vector(to_unsigned('
+                    + str((half + 1) * parent.mwr_window + self.base) +  ' + i, '  + str(parent.reg_adr_bits)
+                    + ")) then -- masked write of bits " + ("31..16" if half else "15..0") + "\n"
+                )
+                d_t += "    if int_regs_wb_m_o.we = '1' then\n"
+                d_t += (
+                    "      int_"
+                    + self.name
+                    + "_o"
+                    + ind
+                    + " <= "
+                    + iconv_fun
+                    + "(agwb_mwr("
+                    + conv_fun
+                    + "(int_"
+                    + self.name
+                    + sfx
+                    + ind
+                    + "), int_regs_wb_m_o.dat, "
+                    + str(half)
+                    + "));\n"
+                )
+                if self.stb == 1:
+                    d_t += "      if int_regs_wb_m_i.ack = '0' then\n"
+                    d_t += "        int_" + self.name + sfx + "_stb" + ind + " <= '1';\n"
+                    d_t += "      end if;\n"
+                d_t += "      int_regs_wb_m_i.ack <= '1';\n"
+                d_t += "      int_regs_wb_m_i.err <= '0';\n"
+                d_t += "    end if;\n"
+                d_t += "  end if;\n"
+                d_t += "end loop; -- "  + self.size_generic + "\n"
         parent.add_templ("register_access", d_t, 10)
         parent.add_templ("signals_idle", d_i, 8)
         parent.add_templ("trigger_bits_reset", d_tbr, 8)
@@ -1059,7 +1102,7 @@ class WbReg(WbObject):
 
         return res
 
-    def gen_c_header(self, reg_base, block_name):
+    def gen_c_header(self, reg_base, block_name, mwr = 0):
         res = "  " + XVOLATILE + " uint32_t " + self.name
         head = ""
         if self.fields:
@@ -1141,6 +1184,41 @@ class WbReg(WbObject):
                         + ");\n"
                     )
                     head += "};\n"
+                if mwr and self.regtype == "creg" and not self.mode:
+                    # Function setting the value with the masked write
+                    # (a single write for each half of the register touched by the field)
+                    if b_f.type == "signed":
+                        head += (
+                            "static inline void "
+                            + base_name
+                            + "_mwr("
+                            + XVOLATILE
+                            + " uint32_t * ptr, int32_t val) { \n"
+                        )
+                    else:
+                        head += (
+                            "static inline void "
+                            + base_name
+                            + "_mwr("
+                            + XVOLATILE
+                            + " uint32_t * ptr, uint32_t val) { \n"
+                        )
+                    for half in (0, 1):
+                        hmask = ((fmask << fshift) >> (16 * half)) & 0xFFFF
+                        if hmask:
+                            head += (
+                                "  ptr["
+                                + hex((half + 1) * mwr)
+                                + "] = "
+                                + hex(hmask << 16)
+                                + " | ((((uint32_t)val & "
+                                + hex(fmask)
+                                + ") << "
+                                + hex(fshift)
+                                + ")"
+                                + (" >> 16);\n" if half else " & 0xffff);\n")
+                            )
+                    head += "};\n"
         # The generated code depends on the fact it is a single register or the vector of registers
         if self.force_vec:
             res += "[" + str(self.size) + "];\n"
@@ -1148,7 +1226,7 @@ class WbReg(WbObject):
             res += ";\n"
         return res, head
 
-    def gen_forth(self, reg_base, parent):
+    def gen_forth(self, reg_base, parent, mwr = 0):
         # The generated code depends on the fact it is a single register or the vector of registers
         cdefs = ""
         if self.is_ignored("forth"):
@@ -1177,9 +1255,83 @@ class WbReg(WbObject):
                     + format(b_f.lsb, "x")
                     + " ;\n"
                 )
+                # The masked write words (used with bfm!) are generated
+                # for fields not crossing the boundary of the register halves
+                if mwr and self.regtype == "creg" and not self.mode and (b_f.lsb // 16 != b_f.msb // 16):
+                    # bfm! can't split the value between two writes, so the field
+                    # must be written with bf! (read-modify-write)
+                    print(
+                        "WARNING: field "
+                        + node
+                        + "."
+                        + b_f.name
+                        + " crosses the bit 16, no .MWR word is generated for it"
+                    )
+                    cdefs += (
+                        "\\ "
+                        + node
+                        + "."
+                        + b_f.name
+                        + " crosses the bit 16, use bf! (no .MWR word)\n"
+                    )
+                elif mwr and self.regtype == "creg" and not self.mode:
+                    half = b_f.lsb // 16
+                    cdefs += (
+                        ": "
+                        + node
+                        + "."
+                        + b_f.name
+                        + ".MWR "
+                        + node
+                        + " $"
+                        + format((half + 1) * mwr, "x")
+                        + " + $"
+                        + format(maskval >> (16 * half), "x")
+                        + " $"
+                        + format(b_f.lsb - 16 * half, "x")
+                        + " ;\n"
+                    )
         return cdefs
 
-    def gen_python(self, reg_base, nvar = None):
+    def python_class(self):
+        """ Returns the name of the agwb class handling the register """
+        if self.regtype == "sreg":
+            return "agwb.StatusRegister"
+        elif self.regtype == "creg" and self.mode:
+            # The FIFO registers are never cached
+            return "agwb.Register"
+        elif self.regtype == "creg":
+            return "agwb.ControlRegister"
+        raise Exception("Incorrect type of register:" + self.regtype)
+
+    def gen_python_props(self, cname):
+        """ Generates the class cname handling the register with bitfields,
+            used with the --python_props option. The bitfields are class
+            attributes (descriptors), and the x__props dictionary
+            contains all of them. The bitfields named with Python keywords
+            are only available via getattr.
+        """
+        sp4 = 4 * " "
+        res = "\nclass " + cname + "(" + self.python_class() + "):\n"
+        props = ""
+        for f_l in self.fields:
+            args = str(f_l.msb) + "," + str(f_l.lsb) + "," + str(f_l.type == "signed")
+            if f_l.trigger:
+                args += ",True"
+            if keyword.iskeyword(f_l.name):
+                props += "'" + f_l.name + "':agwb.BitField(" + args + "),"
+            else:
+                res += sp4 + f_l.name + " = agwb.BitFieldProperty(" + args + ")\n"
+                props += "'" + f_l.name + "':" + f_l.name + ","
+        res += sp4 + "x__props = {" + props + "}\n\n"
+        return res
+
+    def gen_python(self, reg_base, nvar = None, mwr = 0, cname = None):
+        """ The mwr is the size of the masked write alias window
+            of the block (0 if the masked write is not enabled).
+            If cname is given, the register is handled by the class
+            generated by gen_python_props.
+        """
         sp8 = 8 * " "
         sp12 = 12 * " "
         res = ""
@@ -1200,14 +1352,24 @@ class WbReg(WbObject):
             else:
                 # Single register
                 res += sp8 + "'" + self.name + "':(" + hex(reg_base + self.base) + ",("
-            if self.regtype == "sreg":
-                res += "agwb.StatusRegister,"
-            elif self.regtype == "creg":
-                res += "agwb.ControlRegister,"
-            else:
-                raise Exception("Incorrect type of register:" + self.regtype)
+            # The size of the masked write window and the mask of implemented
+            # bits (if the register is narrower than 32 bits) are passed
+            # to the control register
+            extra = ""
+            if self.regtype != "creg" or self.mode:
+                mwr = 0
+            elif self.width < 32:
+                extra = "," + hex(mwr) + "," + hex((1 << self.width) - 1)
+            if mwr and not extra:
+                extra = "," + hex(mwr)
+            if cname is not None:
+                res += cname + "," + cname + ".x__props" + extra + ")),\n"
+                return res
+            res += self.python_class() + ","
             if not self.fields:
                 # No bitfields
+                if extra:
+                    res += "{}" + extra
                 res += ")),\n"
             else:
                 # Handle bitfields
@@ -1223,12 +1385,41 @@ class WbReg(WbObject):
                         + str(f_l.lsb)
                         + ","
                     )
-                    if self.type == "signed":
+                    if f_l.type == "signed":
                         res += "True"
                     else:
                         res += "False"
+                    if f_l.trigger:
+                        res += ",True"
                     res += "),\\\n"
-                res += sp8 + "})),\n"
+                res += sp8 + "}" + extra + ")),\n"
+        return res
+
+    def gen_regmap(self, reg_base, nvar = None, mwr = 0):
+        """ Function returns the entries of the flat register table
+            (see WbBlock.gen_regmap) describing the register
+            (or all registers in the vector) and its bitfields.
+        """
+        res = []
+        if self.regtype != "creg" or self.mode:
+            mwr = 0
+        if self.regtype == "creg":
+            perms = "rw"
+        elif self.regtype == "sreg":
+            perms = "r"
+        else:
+            raise Exception("Incorrect type of register:" + self.regtype)
+        for r_n in range(0, self.var_reps(nvar)):
+            adr = reg_base + self.base + r_n
+            if self.force_vec:
+                rname = self.name + "[" + str(r_n) + "]"
+            else:
+                rname = self.name
+            res.append((rname, adr, (1 << self.width) - 1, 0, self.type == "signed", perms, False, self.mode, mwr))
+            for b_f in self.fields:
+                maskval = ((1 << (b_f.msb + 1)) - 1) ^ ((1 << b_f.lsb) - 1)
+                res.append((rname + "." + b_f.name, adr, maskval, b_f.lsb, b_f.type == "signed", perms,
+                            bool(b_f.trigger), self.mode, mwr))
         return res
 
     def gen_html(self, base, name):
@@ -1312,15 +1503,14 @@ class WbBlackBox(WbObject):
 
     def gen_c_header(self):
         # Here we need to create a dummy header, that just fills the generated structure
-        log.debug("Creating C header:" + self.name + "\n")
+        log.debug("Creating C header: %s", self.name)
         res = "#ifndef __" + self.name + "__INC_H\n"
         res += "#define __" + self.name + "__INC_H\n"
         res += "typedef struct {\n"
         res += "  " + XVOLATILE + " uint32_t filler[" + str(self.addr_size) + "];\n"
         res += "}  __attribute__((aligned(4))) " + "agwb_" + self.name + ";\n"
         res += "#endif\n"
-        with open(GLB.C_HEADER_PATH + "/agwb_" + self.name + ".h", "w") as f_o:
-            f_o.write(res)
+        write_file(GLB.C_HEADER_PATH + "/agwb_" + self.name + ".h", res)
 
     def gen_python(self, nvar = None):
         """ This function generates the class providing access
@@ -1331,6 +1521,8 @@ class WbBlackBox(WbObject):
         sp4 = 4 * " "
         sp8 = 8 * " "
         res = "\nclass " + self.name + "(agwb.Block):\n"
+        if not GLB.PYTHON_PROPS:
+            res += sp4 + "__slots__ = ()\n"
         res += sp4 + "x__is_blackbox = True\n"
         res += sp4 + "x__size = " + str(self.addr_size) + "\n"
         res += sp4 + "x__fields = {\n"
@@ -1342,7 +1534,10 @@ class WbBlackBox(WbObject):
             + str(self.addr_size)
             + ",(agwb.ControlRegister,))\n"
         )
-        res += sp4 + "}\n\n"
+        res += sp4 + "}\n"
+        if GLB.PYTHON_PROPS:
+            res += sp4 + "reg = agwb.FieldProperty()\n"
+        res += "\n"
         return res
 
     def gen_html(self, base, name):
@@ -1367,6 +1562,7 @@ class WbBlock(WbObject):
         self.testdev_ena = ex.exprval(el.get("testdev_ena", "0"))
         self.ignore = el.get("ignore", "")
         self.reserved = ex.exprval(el.get("reserved", "0"))
+        self.masked_wr = ex.exprval(el.get("masked_wr", "0"))
         # We check if the outputs from the registers should be aggregated
         self.aggregate_outs = el.get("aggr_outs", "0")
         # We check if the inputs to the registers should be aggregated
@@ -1412,10 +1608,29 @@ class WbBlock(WbObject):
         # After that procedure, the field free_reg_addr contains
         # the length of the block of internal registers
         self.reg_adr_bits = (self.free_reg_addr - 1).bit_length()
+        # If the masked write is enabled, the registers are followed by
+        # two alias windows of the same size. A write to the first (second)
+        # window modifies bits 15..0 (31..16) of the control register,
+        # enabled by bits 31..16 of the written word, with bits 15..0 of
+        # the written word.
+        if self.masked_wr != 0:
+            self.mwr_window = 1 << self.reg_adr_bits
+            self.reg_area_size = 3 * self.mwr_window
+            self.reg_adr_bits += 2
+        else:
+            self.mwr_window = 0
+            self.reg_area_size = self.free_reg_addr
+
+    def __getstate__(self):
+        # The XML nodes of subblocks are needed only by analyze,
+        # and they can't be pickled (e.g. to the model cache)
+        state = self.__dict__.copy()
+        state["subblks"] = []
+        return state
 
     def analyze(self):
         # Add the length of the local addresses to the list of areas
-        self.areas.append(WbArea(self.free_reg_addr, "int_regs", None, get_reps(None)))
+        self.areas.append(WbArea(self.reg_area_size, "int_regs", None, get_reps(None)))
         # Scan the subblocks
         for sblk in self.subblks:
             if sblk.tag == "subblock":
@@ -1470,7 +1685,7 @@ class WbBlock(WbObject):
             a_r.total_size = 1 << a_r.adr_bits
             # Now we shift the position of the next block
             cur_size += a_r.total_size
-            log.debug("added size:" + str(a_r.total_size))
+            log.debug("added size: %s", a_r.total_size)
         # We must adjust the address space to the power of two
         self.adr_bits = (cur_size - 1).bit_length()
         self.addr_size = 1 << self.adr_bits
@@ -1486,24 +1701,22 @@ class WbBlock(WbObject):
                 a_r.adr = cur_top
         self.used = True
         # In fact, here we should be able to generate the HDL code
-        log.debug("analyze: " + self.name + " addr_size:" + str(self.addr_size))
+        log.debug("analyze: %s addr_size: %s", self.name, self.addr_size)
 
     def add_templ(self, templ_key, value, indent):
         """ That function adds the new text to the dictionary
             used to fill the templates for code generation.
         """
         if templ_key not in self.templ_dict:
-            self.templ_dict[templ_key] = ""
+            self.templ_dict[templ_key] = Emitter()
         # Now we add all lines from value, providing the appropriate indentation
-        for l_n in re.findall(r".*\n?", value)[:-1]:
-            if l_n != "":
-                self.templ_dict[templ_key] += indent * " " + l_n
+        self.templ_dict[templ_key].add_lines(value, indent)
 
     def set_templ(self, templ_key, value):
         """ That function sets the code template in the dictionary 
             to the given value.
         """
-        self.templ_dict[templ_key] = value
+        self.templ_dict[templ_key] = Emitter(value)
                 
     def create_addr(self,adr):
         return '"' + format(adr, "0" + str(self.reg_adr_bits) + "b") + '"'
@@ -1582,7 +1795,7 @@ end if;
             self.add_templ("testdev_access",d_t,10);
         # If the outputs must be aggregated in a single record,
         # we will generate a type for that record instead of output ports
-        log.debug(self.name)
+        log.debug("gen_vhdl: %s", self.name)
         # Generate the block version id constants
         d_c = 'constant c_'+self.name+'_ver_id : std_logic_vector(31 downto 0) := '
         d_c += 'x"' + format(self.ver_full, "08x") + '";\n'
@@ -1777,13 +1990,12 @@ end if;
             self.set_templ("ack_record","")
         # All template is filled, so we can now generate the files
         wb_vhdl_pkg_file = GLB.VHDL_PATH + "/" + self.name + "_pkg.vhd"
-        with open(wb_vhdl_pkg_file, "w") as f_o:
-            f_o.write(TEMPL_PKG.format(**self.templ_dict))
-            created_files["vhdl"].append(wb_vhdl_pkg_file)
+        templ_dict = {key: str(val) for key, val in self.templ_dict.items()}
+        write_file(wb_vhdl_pkg_file, TEMPL_PKG.format(**templ_dict))
+        created_files["vhdl"].append(wb_vhdl_pkg_file)
         wb_vhdl_file = GLB.VHDL_PATH + "/" + self.name + ".vhd"
-        with open(wb_vhdl_file, "w") as f_o:
-            f_o.write(templ_wb(self.N_MASTERS).format(**self.templ_dict))
-            created_files["vhdl"].append(wb_vhdl_file)
+        write_file(wb_vhdl_file, templ_wb(self.N_MASTERS).format(**templ_dict))
+        created_files["vhdl"].append(wb_vhdl_file)
 
     def amap_xml_hdr(self,ver_hash):
         res = '<module id="' + self.name
@@ -1804,7 +2016,7 @@ end if;
         if nvar is not None:
             var_id = "_v"+str(nvar)
         hdr = self.amap_xml_hdr(0)
-        res = ""
+        res = Emitter()
         # Iterate the areas, generating the addresses
         for a_r in self.areas:
             if a_r.obj is None:
@@ -1892,6 +2104,7 @@ end if;
                     )
         res += "</module>\n"
         # Use the generated AMAP XML description as block version ID.
+        res = str(res)
         desc = hdr+res
         blk_ver_id = zlib.crc32(bytes(desc.encode("utf-8")))
         # Now generate a new header with correct hash
@@ -1902,14 +2115,13 @@ end if;
         else:
             self.ver_var[nvar] =  blk_ver_id
         if GLB.AMAPXML_PATH:
-            with open(GLB.AMAPXML_PATH + "/agwb_" + self.name + "_amap" + var_id + ".xml", "w") as f_o:
-                f_o.write(desc)
+            write_file(GLB.AMAPXML_PATH + "/agwb_" + self.name + "_amap" + var_id + ".xml", desc)
 
     def gen_ipbus_xml(self):
         """ This function generates the address map in the XML format for ipbus
 
         """
-        res = '<node id="' + self.name + '">\n'
+        res = Emitter('<node id="' + self.name + '">\n')
         # Iterate the areas, generating the addresses
         for a_r in self.areas:
             if a_r.obj is None:
@@ -1993,15 +2205,14 @@ end if;
                             + '"/>\n'
                         )
         res += "</node>\n"
-        with open(GLB.IPBUS_PATH + "/agwb_" + self.name + "_address.xml", "w") as f_o:
-            f_o.write(res)
+        res.write(GLB.IPBUS_PATH + "/agwb_" + self.name + "_address.xml")
 
     def gen_forth(self, parent):
         """ This function generates the address map in the Forth format
             The "path" argument informs how the object should be named in the Forth access words
         """
         # Iterate the areas, generating the addresses
-        cdefs = ""
+        cdefs = Emitter()
         if self.is_ignored("forth"):
             return cdefs
         for a_r in self.areas:
@@ -2054,7 +2265,7 @@ end if;
                 )
                 # Now add other registers in a loop
                 for reg in self.regs:
-                    cdefs += reg.gen_forth(adr, parent)
+                    cdefs += reg.gen_forth(adr, parent, self.mwr_window)
             elif not a_r.is_ignored("forth"):
                 # Subblock or vector of subblocks
                 if (a_r.reps == 1) and (a_r.force_vec == False):
@@ -2095,8 +2306,8 @@ end if;
         # Each block is responsible for generation of the structure, that fully
         # fills it's address space.
         #
-        log.debug("Creating C header:" + self.name + "\n")
-        head = "#ifndef __" + self.name + "__INC_H\n"
+        log.debug("Creating C header: %s", self.name)
+        head = Emitter("#ifndef __" + self.name + "__INC_H\n")
         head += "#define __" + self.name + "__INC_H\n"
         # Generate the constants with block ID and with version ID
         head += (
@@ -2109,12 +2320,12 @@ end if;
         # We have to add fillers to ensure proper address allocation
         filler_nr = 1
         cur_addr = 0
-        res = "typedef struct {\n"
+        res = Emitter("typedef struct {\n")
         # The areas must be sorted by increasing address
         self.areas.sort(key=WbArea.sort_adr)
         for a_r in self.areas:
             # Check if it was nessary to add a filler
-            log.debug(a_r.name, a_r.adr, cur_addr)
+            log.debug("area: %s adr: %s cur_addr: %s", a_r.name, a_r.adr, cur_addr)
             if a_r.adr < cur_addr:
                 # That should never happen! It would mean that blocks are not ordered properly
                 raise Exception("Incorrect ordering of blocks!")
@@ -2151,10 +2362,26 @@ end if;
                     cur_addr += 6   
                 # Now add other registers in a loop
                 for reg in self.regs:
-                    r_n, h_n = reg.gen_c_header(adr, self.name)
+                    r_n, h_n = reg.gen_c_header(adr, self.name, self.mwr_window)
                     head += h_n
                     res += r_n
                     cur_addr += reg.size
+                if self.mwr_window != 0:
+                    # The masked write alias windows
+                    if cur_addr < adr + self.mwr_window:
+                        res += (
+                            "  "
+                            + XVOLATILE
+                            + " uint32_t filler"
+                            + str(filler_nr)
+                            + "["
+                            + str(adr + self.mwr_window - cur_addr)
+                            + "];\n"
+                        )
+                        filler_nr += 1
+                    res += "  " + XVOLATILE + " uint32_t mwr_lo[" + str(self.mwr_window) + "];\n"
+                    res += "  " + XVOLATILE + " uint32_t mwr_hi[" + str(self.mwr_window) + "];\n"
+                    cur_addr = adr + 3 * self.mwr_window
             else:
                 # Subblock or vector of subblocks
                 # Add the related header
@@ -2174,14 +2401,8 @@ end if;
                     )
                 cur_addr += a_r.reps * a_r.obj.addr_size
             log.debug(
-                "area: "
-                + a_r.name
-                + " total_size:"
-                + str(a_r.total_size)
-                + " reps="
-                + str(a_r.reps)
-                + " cur_adr:"
-                + str(cur_addr)
+                "area: %s total_size: %s reps=%s cur_adr: %s",
+                a_r.name, a_r.total_size, a_r.reps, cur_addr
             )
         # Add fillers
         if cur_addr < self.addr_size:
@@ -2198,17 +2419,34 @@ end if;
         cur_addr = self.addr_size
         res += "} __attribute__((aligned(4))) agwb_" + self.name + " ;\n"
         res += "#endif\n"
-        log.debug("block: " + self.name + " cur_addr=" + str(cur_addr))
-        with open(GLB.C_HEADER_PATH + "/agwb_" + self.name + ".h", "w") as f_o:
-            f_o.write(head)
-            f_o.write(res)
+        log.debug("block: %s cur_addr=%s", self.name, cur_addr)
+        head += res
+        head.write(GLB.C_HEADER_PATH + "/agwb_" + self.name + ".h")
 
     def gen_python(self,nvar=None):
         """ This function generates the class providing access
-        to the block from the Python code"""
+        to the block from the Python code.
+        With the --python_props option, the subblocks and registers are
+        also available as class attributes (descriptors), and the registers
+        with bitfields are handled by the generated classes.
+        """
         sp4 = 4 * " "
         sp8 = 8 * " "
-        res = "\nclass " + self.name + "(agwb.Block):\n"
+        res = Emitter()
+        # Names of objects available as attributes of the block
+        names = []
+        # Classes of registers with bitfields
+        cnames = {}
+        if GLB.PYTHON_PROPS:
+            for reg in self.regs:
+                if reg.fields and (reg.var_reps(nvar) > 0):
+                    cnames[reg.name] = self.name + "__" + reg.name
+                    res += reg.gen_python_props(cnames[reg.name])
+        res += "\nclass " + self.name + "(agwb.Block):\n"
+        if not GLB.PYTHON_PROPS:
+            # The classes with properties need the instance dictionary,
+            # where the descriptors store the handles
+            res += sp4 + "__slots__ = ()\n"
         res += sp4 + "x__size = " + str(self.addr_size) + "\n"
         res += sp4 + "x__id = " + hex(self.id_val) + "\n"
         if nvar is None:
@@ -2221,19 +2459,25 @@ end if;
                 # Registers area
                 # Add two standard register - ID and VER
                 adr = a_r.adr
+                names += ["ID", "VER"]
                 res += sp8 + "'ID':(" + hex(adr + spec_regs["id"]) + ",(agwb.StatusRegister,)),\\\n"
                 res += sp8 + "'VER':(" + hex(adr + spec_regs["ver"]) + ",(agwb.StatusRegister,)),\\\n"
                 if self.testdev_ena != 0:
                     # Conditionally add test registers. 
                     # They are added as control registers to enable testing of
                     # read and write addresses.
+                    names += ["TEST_RW", "TEST_WO", "TEST_RO", "TEST_TOUT"]
                     res += sp8 + "'TEST_RW':(" + hex(adr + spec_regs["test_rw"]) + ",(agwb.ControlRegister,)),\\\n"
                     res += sp8 + "'TEST_WO':(" + hex(adr + spec_regs["test_wo"]) + ",(agwb.ControlRegister,)),\\\n"
                     res += sp8 + "'TEST_RO':(" + hex(adr + spec_regs["test_ro"]) + ",(agwb.ControlRegister,)),\\\n"
                     res += sp8 + "'TEST_TOUT':(" + hex(adr + spec_regs["test_tout"]) + ",(agwb.ControlRegister,)),\\\n"                    
                 for reg in self.regs:
-                    res += reg.gen_python(adr,nvar)
+                    if reg.var_reps(nvar) > 0:
+                        names.append(reg.name)
+                    res += reg.gen_python(adr,nvar,self.mwr_window,cnames.get(reg.name))
             else:
+                if a_r.var_reps(nvar) >= 1:
+                    names.append(a_r.name)
                 # The format depends on whether this is a block or vector of blocks
                 if (a_r.var_reps(nvar) == 1) and (a_r.force_vec == False):
                     # Single subblock
@@ -2261,12 +2505,71 @@ end if;
                         + a_r.obj.name
                         + ",)),\\\n"
                     )
-        res += sp4 + "}\n\n"
+        res += sp4 + "}\n"
+        # The register table of the block (without subblocks), used to build
+        # the flat register table (agwb.Block.x__regmap) at runtime
+        res += sp4 + "x__local_regmap = {\n"
+        fifo = []
+        for (path, adr, mask, lsb, sign, perms, trigger, mode, mwr) in self.gen_regmap(nvar):
+            if mode and adr not in fifo:
+                fifo.append(adr)
+            res += (
+                sp8
+                + "'"
+                + path
+                + "':("
+                + hex(adr)
+                + ","
+                + hex(mask)
+                + ","
+                + str(lsb)
+                + ","
+                + str(sign)
+                + ",'"
+                + perms
+                + "',"
+                + str(trigger)
+                + ("," + hex(mwr) if mwr else "")
+                + "),\n"
+            )
+        res += sp4 + "}\n"
+        # Addresses of registers with the "mode" attribute (FIFOs),
+        # that must not be merged by agwb.Planner (a set, as it is tested
+        # by lookup)
+        if fifo:
+            res += sp4 + "x__local_fifo = frozenset((" + "".join(hex(adr) + "," for adr in fifo) + "))\n"
+        if GLB.PYTHON_PROPS:
+            for name in names:
+                # The objects named with Python keywords are only available via getattr
+                if not keyword.iskeyword(name):
+                    res += sp4 + name + " = agwb.FieldProperty()\n"
+        res += "\n"
+        return res
+
+    def gen_regmap(self, nvar=None):
+        """ This function returns the register table of the block.
+        Each entry describes a register, an element of the vector of registers,
+        or a bitfield located in the block (the subblocks have their own tables):
+        (path, address, mask, lsb, signed, permission, trigger, mode, masked write window)
+        The address is relative to the base address of the block.
+        """
+        res = []
+        for a_r in self.areas:
+            if a_r.obj is None:
+                # Registers area
+                adr = a_r.adr
+                res.append(("ID", adr + spec_regs["id"], 0xffffffff, 0, False, "r", False, "", 0))
+                res.append(("VER", adr + spec_regs["ver"], 0xffffffff, 0, False, "r", False, "", 0))
+                if self.testdev_ena != 0:
+                    for tname in ("test_rw", "test_wo", "test_ro", "test_tout"):
+                        res.append((tname.upper(), adr + spec_regs[tname], 0xffffffff, 0, False, "rw", False, "", 0))
+                for reg in self.regs:
+                    res += reg.gen_regmap(adr, nvar, self.mwr_window)
         return res
 
     def gen_html(self, base, mname):
         """ This function generates the description of the particular block in a HTML format """
-        res = ""
+        res = Emitter()
         # First write the name and description
         res += (
             "<p><b>Address:</b> "
@@ -38,70 +38,146 @@ rmw(self,address=none,mask=0,value=0) - schedules the read-modify-write
 dispatch() - executes the accumulated list of operations
       (the list may be executed automatically, if it grows
       to its full possible length).
-"""
 
-class BitField(object):
-    """Class delivering an object used to describe the bitfield.
+The interface may also provide methods for block transfers
+used for bulk access to vectors of registers:
 
-    Its fields contain certain precalculated values supporting quick
-    handling of read and write access to the field.
-    That class does not provide any methods.
-    Only fields are used.
-    """
+read_block(self,address,count) - reads count consecutive registers
+      starting from address and returns the list (or array) of values
+write_block(self,address,values) - writes the list of values
+      to consecutive registers starting from address
+read_block_into(self,address,buf) - reads len(buf) consecutive registers
+      starting from address into buf (NumPy uint32 array); if available,
+      it is used by read_all instead of read_block
 
-    def __init__(self, msb:int, lsb:int, is_signed:bool) -> None:
-        self.lsb = lsb
-        self.msb = msb
-        if is_signed:
-            self.sign_mask = 1 << (msb - lsb)
-            self.vmin = -self.sign_mask
-            self.vmax = self.sign_mask - 1
-        else:
-            self.vmin = 0
-            self.vmax = (1 << (msb - lsb + 1)) - 1
-            self.sign_mask = 0
-        self.mask = ((1 << (msb + 1)) - 1) ^ ((1 << lsb) - 1)
+The interface may also provide methods for FIFO transfers
+with buffers (otherwise read_fifo and write_fifo are used):
+
+read_fifo_into(self,address,buf) - reads len(buf) values from
+      the single address into buf (memoryview of 32-bit words)
+write_fifo_from(self,address,buf) - writes the values from buf
+      (memoryview of 32-bit words) to the single address
+
+The control registers may be cached in the shadow cache
+(see Block.enable_shadow).
+
+If the block is generated with the masked_wr attribute, the bitfields
+of its control registers are written with the masked write
+(see _write_masked), without reading the register.
+"""
+import array
+import threading
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from .agwb_common import *
+except ImportError:
+    # agwb.py is run as the script (the demo code below)
+    from agwb_common import *
+
+def _write_masked(write, adr, mwr, mask, value):
+    """Sets the bits of the register at adr selected by mask to value,
+    with writes to the masked write windows located mwr and 2*mwr
+    above the register. Each half of the register touched by the mask
+    is modified with a single write (the mask in bits 31..16,
+    the value in bits 15..0). The write function (e.g. iface.write or
+    iface.writex) is used for the writes.
+    """
+    if mask & 0xffff:
+        write(adr + mwr, ((mask & 0xffff) << 16) | (value & 0xffff))
+    if mask >> 16:
+        write(adr + 2 * mwr, (mask & 0xffff0000) | ((value >> 16) & 0xffff))
+
+def _read_fifo_into(iface, adr, words):
+    """Reads len(words) values from the FIFO register at adr into words.
+    The read_fifo_into method of the interface is used if available.
+    """
+    if hasattr(iface, "read_fifo_into"):
+        iface.read_fifo_into(adr, words)
+    else:
+        words[:] = array.array("I", iface.read_fifo(adr, len(words)))
+
+def _write_fifo_from(iface, adr, words):
+    """Writes the values from words to the FIFO register at adr.
+    The write_fifo_from method of the interface is used if available.
+    """
+    if hasattr(iface, "write_fifo_from"):
+        iface.write_fifo_from(adr, words)
+    else:
+        iface.write_fifo(adr, words.tolist())
 
 class _BitFieldFuture(object):
     """Class enabling delayed access to the value read from the bitfield
     """
+
+    __slots__ = ("rfut", "bf")
+
     def __init__(self, rfut, bf) -> None:
         self.rfut = rfut
         self.bf = bf
 
-    def __getattr__(self,name):
-        try:
-            if name == "val":
-                rval = self.rfut.val & self.bf.mask
-                rval >>= self.bf.lsb
-                if self.bf.sign_mask:
-                    if rval & self.bf.sign_mask:
-                        rval -= self.bf.sign_mask << 1
-                return rval
-            else:
-                raise Exception("Only val field is available")
-        except KeyError as ke:
-            return object.__getattribute__(self,name)
+    @property
+    def val(self):
+        rval = self.rfut.val & self.bf.mask
+        rval >>= self.bf.lsb
+        if self.bf.sign_mask:
+            if rval & self.bf.sign_mask:
+                rval -= self.bf.sign_mask << 1
+        return rval
 
 
+class _ShadowFuture(object):
+    """Future object returned by readx of the register found
+    in the shadow cache.
+    """
+
+    __slots__ = ("val",)
+
+    def __init__(self, val) -> None:
+        self.val = val
+
 class _BitFieldAccess(object):
     """Class providing a versatile object supporting  read/write access to any bitfield.
 
     The details of the particular bitfield are hidden in the
     BitField object passed via bf argument.
+    If cacheable is True (bitfields of control registers), the shadow
+    cache is used (if enabled for the interface).
+    If mwr is not 0, the bitfield is written with the masked write
+    (mwr is the size of the masked write window).
     """
 
-    def __init__(self, iface, base, bf):
+    __slots__ = ("x__iface", "x__base", "x__bf", "x__cacheable", "x__mwr")
+
+    def __init__(self, iface, base, bf, cacheable=False, mwr=0):
         self.x__iface = iface
         self.x__base = base
         self.x__bf = bf
+        self.x__cacheable = cacheable
+        self.x__mwr = mwr
+
+    def _shadow(self):
+        # Returns the shadow cache for the interface (or None)
+        if _shadows and self.x__cacheable:
+            return _shadows.get(self.x__iface)
+        return None
 
     def read(self):
         """ Simple read method. Does not use any access optimization.
             The read is performed immediately, the result is
             masked, shifted and returned as integer.
+            If the register is in the shadow cache, it is not read.
         """
-        rval = self.x__iface.read(self.x__base)
+        shadow = self._shadow()
+        if (shadow is not None) and not self.x__bf.trigger:
+            rval = shadow.get(self.x__base)
+            if rval is None:
+                rval = self.x__iface.read(self.x__base)
+                shadow[self.x__base] = rval
+        else:
+            rval = self.x__iface.read(self.x__base)
         rval &= self.x__bf.mask
         rval >>= self.x__bf.lsb
         if self.x__bf.sign_mask:
@@ -114,6 +190,9 @@ class _BitFieldAccess(object):
             The write is performed immediately.
             Please note, that access to each bitfield generates
             a strobe pulse for the whole register (if strobe is implemented).
+            If the register is in the shadow cache, it is not read
+            before the write.
+            If the masked write is available, the register is not read.
         """
         # Check if the value to be stored is correct
         if (value < self.x__bf.vmin) or (value > self.x__bf.vmax):
@@ -123,15 +202,33 @@ class _BitFieldAccess(object):
             if value < 0:
                 value += self.x__bf.sign_mask << 1
                 print("final value: " + str(value))
+        if self.x__mwr:
+            self._write_masked(self.x__iface.write, value)
+            return
         # Read the whole register
-        rval = self.x__iface.read(self.x__base)
+        shadow = self._shadow()
+        rval = None
+        if shadow is not None:
+            rval = shadow.get(self.x__base)
+        if rval is None:
+            rval = self.x__iface.read(self.x__base)
         # Mask the bitfield
         rval &= ~self.x__bf.mask
         # Shift the new value
         value = value << self.x__bf.lsb
         value &= self.x__bf.mask
-        rval |= value
-        self.x__iface.write(self.x__base, rval)
+        self.x__iface.write(self.x__base, rval | value)
+        if shadow is not None:
+            # The trigger bits are read as zeros
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+
+    def _write_masked(self, write, value):
+        value = (value << self.x__bf.lsb) & self.x__bf.mask
+        _write_masked(write, self.x__base, self.x__mwr, self.x__bf.mask, value)
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
 
     def readx(self):
         """ Optimized read method. Schedules reading of the register.
@@ -140,6 +237,9 @@ class _BitFieldAccess(object):
             The read is performed immediately (if not dispatched yet),
             and the result is masked, shifted and returned.
         """
+        shadow = self._shadow()
+        if (shadow is not None) and not self.x__bf.trigger and (self.x__base in shadow):
+            return _BitFieldFuture(_ShadowFuture(shadow[self.x__base]), self.x__bf)
         rval = self.x__iface.readx(self.x__base)
         return _BitFieldFuture(rval,self.x__bf)
 
@@ -153,6 +253,10 @@ class _BitFieldAccess(object):
             If "now" is True, or another operation than rmw to the same
             register is executed, the write is scheduled with current
             mask and value, resulting from rmws aggregated up to now.
+            If the register is in the shadow cache, only the write
+            is scheduled.
+            If the masked write is available, only the masked write
+            is scheduled (the writes are not aggregated).
         """
         # Check if the value to be stored is correct
         if (value < self.x__bf.vmin) or (value > self.x__bf.vmax):
@@ -162,79 +266,104 @@ class _BitFieldAccess(object):
             if value < 0:
                 value += self.x__bf.sign_mask << 1
                 print("final value: " + str(value))
+        if self.x__mwr:
+            self._write_masked(self.x__iface.writex, value)
+            return
         # Calculate the shifted value
         value = value << self.x__bf.lsb
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            value &= self.x__bf.mask
+            self.x__iface.writex(self.x__base, rval | value)
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+            return
         # Schedule the RMW operation
         self.x__iface.rmw(self.x__base, self.x__bf.mask, value)
         # If now is true, finalize the current RMW
         if now:
             self.x__iface.rmw()
 
-class Vector(object):
-    """Class describing the vector of registers or subblocks.
-
-    It provides only a __getitem__ method that allows to access the particular object
-    in a vector (the object is created on the fly, when it is needed).
+class Vector(_VectorBase):
+    """Class describing the vector of registers or subblocks
+    (see _VectorBase), providing the bulk access to the vectors of registers.
     """
 
-    def __init__(self, iface, base, nitems, margs):
-        self.iface = iface
-        self.base = base
-        self.mclass = margs[0]
-        self.args = None
-        if len(margs) > 1:
-            self.args = margs[1]
-        self.nitems = nitems
-
-    def __getitem__(self, key):
-        if isinstance(key,slice):
-            return [self[i] for i in range(*key.indices(len(self)))]
-        if key < 0:
-            key = self.nitems + key
-        if key >= self.nitems:
-            raise IndexError
-        if self.args != None:
-            return self.mclass(
-                self.iface, self.base + key * self.mclass.x__size, self.args
-            )
-        return self.mclass(self.iface, self.base + key * self.mclass.x__size)
-
-    def __len__(self):
-        return self.nitems
+    __slots__ = ()
 
-class Block(object):
+    def read_all(self, key=slice(None), field=None):
+        """ Reads registers selected by the key slice (by default all registers)
+            and returns their values as the NumPy uint32 array.
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the read_block_into (or read_block) method,
+            a single block transfer is used.
+            If the field name is given, that bitfield is extracted from all
+            read values (signed bitfields are returned as int64 array).
+        """
+        rng = self._reg_range(key)
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "read_block_into"):
+            vals = np.empty(len(rng), dtype=np.uint32)
+            self.iface.read_block_into(self.base + rng.start * self.mclass.x__size, vals)
+        elif (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "read_block"):
+            vals = np.asarray(self.iface.read_block(self.base + rng.start * self.mclass.x__size, len(rng)),
+                              dtype=np.uint32)
+        else:
+            vals = np.fromiter((self.iface.read(self.base + i * self.mclass.x__size) for i in rng),
+                               dtype=np.uint32, count=len(rng))
+        if field is None:
+            return vals
+        bf = self.args[0][field]
+        vals = (vals & bf.mask) >> bf.lsb
+        if bf.sign_mask:
+            vals = vals.astype(np.int64)
+            vals -= (vals & bf.sign_mask) << 1
+        return vals
+
+    def write_all(self, values, key=slice(None)):
+        """ Writes values to registers selected by the key slice
+            (by default all registers).
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the write_block method, a single block
+            transfer is used.
+        """
+        rng = self._reg_range(key)
+        if issubclass(self.mclass, StatusRegister):
+            raise Exception("Status registers at " + hex(self.base) + " can't be written")
+        vals = np.asarray(values, dtype=np.uint32)
+        if len(vals) != len(rng):
+            raise Exception("Number of values (" + str(len(vals)) + ") doesn't match number of registers ("
+                            + str(len(rng)) + ")")
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "write_block"):
+            self.iface.write_block(self.base + rng.start * self.mclass.x__size, vals.tolist())
+        else:
+            for i, val in zip(rng, vals.tolist()):
+                self.iface.write(self.base + i * self.mclass.x__size, val)
+        if _shadows and (self.iface in _shadows):
+            shadow = _shadows[self.iface]
+            for i in rng:
+                shadow.pop(self.base + i * self.mclass.x__size, None)
+
+class Block(_BlockBase):
     """Class describing the blocks handled by addr_gen_wb-generated code.
 
     The Python backend generates derived classes, with class fields
     corresponding to subblocks or registers.
+    The flat register table (x__regmap), the lookup method and the shadow
+    cache control are provided by _BlockBase.
     """
 
-    x__is_blackbox:bool = False
-    x__size:int = 1
-    x__fields:dict = {}
+    __slots__ = ("x__base", "x__iface", "x__variant", "x__handles")
+    x__regmap = _FlatTable()
+    x__fifo = _FlatTable()
+    x__vector = Vector
+    x__bf_access = _BitFieldAccess
 
     def __init__(self, iface, base, variant = None):
         """base is the base address for the given block. """
         self.x__base = base
         self.x__iface = iface
         self.x__variant = variant
-
-    def __dir__(self):
-        return self.x__fields.keys()
-
-    def __getattr__(self, name):
-        try:
-            f_i = self.x__fields[name]
-            if len(f_i) == 3:
-                return Vector(self.x__iface, self.x__base + f_i[0], f_i[1], f_i[2])
-            elif len(f_i) == 2:
-                if len(f_i[1]) == 1:
-                    return f_i[1][0](self.x__iface, self.x__base + f_i[0])
-                # pass addititional argument to the constructor
-                return f_i[1][0](self.x__iface, self.x__base + f_i[0], f_i[1][1])
-        except KeyError as ke:
-            return object.__getattribute__(self,name)
-
+        self.x__handles = {}
 
     def _verify_id(self):
         id = self.ID.read()
@@ -250,36 +379,74 @@ class Block(object):
                 self.__class__.__name__ + " has VER " + hex(self.x__ver) + ", read VER " + hex(ver)
             )
 
-    def verify_id_and_version(self):
+    def verify_id_and_version(self, batched=False, vectors=False):
         """Read and verify id (ID) and version (VER) registers values.
 
         This function reads and verifies ID and VER register values
         in a recursive way for all non black box blocks.
         It raises the exception if read values differ as it indicates,
         that software and firmware versions differ.
+        If batched is True, the addresses of all ID and VER registers
+        are calculated from the generated tables, all reads are
+        scheduled with readx and executed with a single dispatch
+        (with Planner the contiguous reads are merged into block reads),
+        and the raised exception reports all mismatches.
+        The vectors of subblocks are verified only if vectors is True.
         """
-        for k in self.x__fields.keys():
-            subblock = getattr(self, k)
-            if not issubclass(type(subblock), Block):
-                continue
-            subblock.verify_id_and_version()
+        if batched:
+            self._verify_id_and_version_batched(vectors)
+            return
+        for k, f_i in self.x__fields.items():
+            # Registers are skipped without creating their handles
+            if len(f_i) == 3:
+                if not (vectors and issubclass(f_i[2][0], Block)):
+                    continue
+                for subblock in getattr(self, k)[:]:
+                    subblock.verify_id_and_version(vectors=vectors)
+            elif issubclass(f_i[1][0], Block):
+                getattr(self, k).verify_id_and_version(vectors=vectors)
 
         if self.x__is_blackbox == False:
             self._verify_id()
             self._verify_ver()
 
+    def _verify_id_and_version_batched(self, vectors):
+        regs = []
+        self._id_ver_regs(self.x__base, "", regs, vectors)
+        if hasattr(self.x__iface, "dispatch"):
+            futs = [self.x__iface.readx(reg[2]) for reg in regs]
+            self.x__iface.dispatch()
+            vals = [fut.val for fut in futs]
+        else:
+            vals = [self.x__iface.read(reg[2]) for reg in regs]
+        errors = []
+        for (path, cls, adr, exp, name), val in zip(regs, vals):
+            if val != exp:
+                errors.append(
+                    cls.__name__ + " at " + (path[:-1] or "top") + " has " + name + " " + hex(exp)
+                    + ", read " + name + " " + hex(val)
+                )
+        if errors:
+            raise Exception("ID/VER mismatch in " + str(len(errors)) + " registers:\n" + "\n".join(errors))
+
     def dispatch(self):
         self.x__iface.dispatch()
 
 class _Register(object):
     """Base class supporting access to the register."""
 
+    __slots__ = ("x__iface", "x__base", "x__bfields", "x__bf_handles")
+
     x__size = 1
+    x__cacheable = False
+    x__mwr = 0
+    x__bf_access = _BitFieldAccess
 
     def __init__(self, iface, base, bfields={}):
         self.x__iface = iface
         self.x__base = base
         self.x__bfields = bfields
+        self.x__bf_handles = {}
 
     def __dir__(self):
         return self.x__bfields.keys()
@@ -303,6 +470,36 @@ class _Register(object):
     def read_fifo(self, count):
         return self.x__iface.read_fifo(self.x__base, count)
 
+    def read_fifo_into(self, buf, count=None, chunk=None):
+        """ Reads count values (by default as many as fit in buf)
+            from the FIFO register into the preallocated buffer buf
+            (any object supporting the buffer protocol, e.g. bytearray,
+            array.array or NumPy array), without creating intermediate lists
+            (if the interface provides read_fifo_into).
+            If chunk is given, the values are read in transfers
+            of at most chunk values. Returns the number of read values.
+        """
+        words = _words(buf)
+        rng = _fifo_range(words, count, chunk)
+        for start, end in rng:
+            _read_fifo_into(self.x__iface, self.x__base, words[start:end])
+        return rng[-1][1] if rng else 0
+
+    def stream_fifo(self, count, chunk, buf=None):
+        """ Generator reading count values from the FIFO register
+            in transfers of at most chunk values. All transfers are read
+            into the same buffer (buf, or allocated array of chunk words),
+            and the memoryview of the read words is yielded, so it must
+            be processed before the next transfer is read.
+        """
+        if buf is None:
+            buf = array.array("I", bytes(4 * chunk))
+        words = _words(buf)
+        for start in range(0, count, chunk):
+            view = words[:min(chunk, count - start)]
+            _read_fifo_into(self.x__iface, self.x__base, view)
+            yield view
+
     def write(self, value):
         """ Simple write method. Does not use any access optimization.
             The write is performed immediately.
@@ -320,7 +517,19 @@ class _Register(object):
         self.x__iface.writex(self.x__base, value)
 
     def write_fifo(self, values):
-        self.x__iface.write(self.x__base, values)
+        self.x__iface.write_fifo(self.x__base, values)
+
+    def write_fifo_from(self, buf, count=None, chunk=None):
+        """ Writes count values (by default all values) from the buffer buf
+            (any object supporting the buffer protocol) to the FIFO register,
+            without creating intermediate lists (if the interface provides
+            write_fifo_from).
+            If chunk is given, the values are written in transfers
+            of at most chunk values.
+        """
+        words = _words(buf)
+        for start, end in _fifo_range(words, count, chunk):
+            _write_fifo_from(self.x__iface, self.x__base, words[start:end])
 
     def rmw(self, mask, value, now=True):
         """ Optimized read-modify-write method. Multiple rmw commands
@@ -340,14 +549,113 @@ class _Register(object):
         self.x__iface.dispatch()
 
     def __getattr__(self, name):
+        # The created bitfield handles are cached
+        bf_handles = object.__getattribute__(self, "x__bf_handles")
+        try:
+            return bf_handles[name]
+        except KeyError:
+            pass
         try:
-            return _BitFieldAccess(self.x__iface, self.x__base, self.x__bfields[name])
+            handle = _BitFieldAccess(self.x__iface, self.x__base, self.x__bfields[name], self.x__cacheable,
+                                     self.x__mwr)
         except KeyError as ke:
             return object.__getattribute__(self,name)
+        bf_handles[name] = handle
+        return handle
+
+
+Register = _Register  # The generic register (never cached)
+
 
+class ControlRegister(_Register):
+    """Class supporting access to the control register.
 
+    If the shadow cache is enabled for the interface (see Block.enable_shadow),
+    the value of the register is stored after the first read or write,
+    and the next reads are served from the cache. Writes are always
+    performed (write-through).
+    The trigger bits are stored as zeros (as they are read).
+
+    The mask describes the bits implemented in the register (for registers
+    narrower than 32 bits), so the cache returns the values read
+    from the hardware.
+
+    If mwr is not 0 (the block is generated with the masked_wr attribute),
+    the bitfields are written, and rmw is performed with the masked write
+    (mwr is the size of the masked write window).
+    """
 
-ControlRegister = _Register  # The control register is just the generic register
+    __slots__ = ("x__keep", "x__mwr")
+
+    x__cacheable = True
+
+    def __init__(self, iface, base, bfields={}, mwr=0, mask=0xffffffff):
+        super().__init__(iface, base, bfields)
+        self.x__mwr = mwr
+        # Bits stored in the shadow cache (the bits implemented
+        # in the register, without the trigger bits)
+        self.x__keep = mask
+        if bfields:
+            self.x__keep = 0
+            for bf in bfields.values():
+                if not bf.trigger:
+                    self.x__keep |= bf.mask
+            self.x__keep &= mask
+
+    def read(self):
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if shadow is not None:
+                val = shadow.get(self.x__base)
+                if val is None:
+                    val = self.x__iface.read(self.x__base)
+                    shadow[self.x__base] = val
+                return val
+        return self.x__iface.read(self.x__base)
+
+    def readx(self):
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if (shadow is not None) and (self.x__base in shadow):
+                return _ShadowFuture(shadow[self.x__base])
+        return self.x__iface.readx(self.x__base)
+
+    def write(self, value):
+        self.x__iface.write(self.x__base, value)
+        if _shadows and (self.x__iface in _shadows):
+            _shadows[self.x__iface][self.x__base] = value & self.x__keep
+
+    def writex(self, value):
+        self.x__iface.writex(self.x__base, value)
+        if _shadows and (self.x__iface in _shadows):
+            _shadows[self.x__iface][self.x__base] = value & self.x__keep
+
+    def _shadow_masked(self, mask, value):
+        # Returns the new value of the register calculated from the cached one
+        # (and updates the cache), or None if the register is not cached
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if (shadow is not None) and (self.x__base in shadow):
+                value = (shadow[self.x__base] & ~mask) | (value & mask)
+                shadow[self.x__base] = value & self.x__keep
+                return value
+        return None
+
+    def rmw(self, mask, value, now=True):
+        """ If the masked write is available, only the masked write is scheduled.
+            If the register is in the shadow cache, the new value
+            is calculated from the cached one, and only the write is scheduled.
+            Otherwise the rmw is scheduled (see Register.rmw).
+        """
+        if self.x__mwr:
+            _write_masked(self.x__iface.writex, self.x__base, self.x__mwr, mask & 0xffffffff, value)
+            self._shadow_masked(mask, value)
+            return
+        nval = self._shadow_masked(mask, value)
+        if nval is None:
+            super().rmw(mask, value, now)
+        else:
+            self.x__iface.writex(self.x__base, nval)
 
 
 class StatusRegister(_Register):
@@ -356,6 +664,8 @@ class StatusRegister(_Register):
     The write methods throws an exception.
     """
 
+    __slots__ = ()
+
     def write(self, value):
         raise Exception("Status register at " + hex(self.x__base) + " can't be written")
 
@@ -365,6 +675,468 @@ class StatusRegister(_Register):
     def rmw(self, mask, value, now=True):
         raise Exception("Status register at " + hex(self.x__base) + " can't be written")
 
+# Register classes used by Block.lookup
+Block.x__status_register = StatusRegister
+Block.x__register = Register
+Block.x__control_register = ControlRegister
+
+
+class _PlannerFuture(object):
+    """Future object returned by Planner.readx.
+
+    Reading its "val" field triggers the dispatch of the planned
+    operations if the value is not available yet.
+    """
+
+    __slots__ = ("planner", "done", "_val")
+
+    def __init__(self, planner):
+        self.planner = planner
+        self.done = False
+        self._val = None
+
+    @property
+    def val(self):
+        if not self.done:
+            self.planner.dispatch()
+            if not self.done:
+                raise Exception("val not set after dispatch!")
+        return self._val
+
+    def set(self, val):
+        self.done = True
+        self._val = val
+
+
+def _lower_api(iface):
+    """Returns the extended interface of the lower interface used
+    by Planner and Multiplexer: "x" (readx, writex, rmw and dispatch),
+    "b" (readb, writeb, writeb_masked and dispatch), or None (the operations
+    are executed immediately with read and write).
+    """
+    if not (hasattr(iface, "read") and hasattr(iface, "write")):
+        raise TypeError("The interface " + type(iface).__name__ + " must provide read and write methods")
+    if hasattr(iface, "dispatch"):
+        if hasattr(iface, "readx") and hasattr(iface, "writex") and hasattr(iface, "rmw"):
+            return "x"
+        if hasattr(iface, "readb") and hasattr(iface, "writeb") and hasattr(iface, "writeb_masked"):
+            return "b"
+    return None
+
+class Planner(object):
+    """Class implementing the transaction planner.
+
+    The planner is placed between the generated classes and the interface.
+    It provides the extended interface, but the readx, writex and rmw
+    operations are only queued. At dispatch() the queued operations
+    are passed to the lower interface in the original order, but:
+
+    - consecutive reads of contiguous increasing addresses
+      are merged into block reads,
+    - consecutive writes to contiguous increasing addresses
+      are merged into block writes.
+
+    The operations are never reordered, and each read is performed,
+    as reads of some registers have side effects (e.g. the "ack"
+    strobes or the status cleared on read).
+    Reads and writes of the FIFO registers (registers with the "mode"
+    attribute, listed in the "x__fifo" field of the generated class)
+    are never merged.
+
+    The lower interface must provide read and write methods.
+    If it provides the dispatch method and readx, writex, rmw
+    (the agwb extended interface) or readb, writeb, writeb_masked
+    (the agwb_dca extended interface), the single operations are queued
+    in it. If it provides read_block and write_block methods,
+    they are used for merged accesses (the operations queued before
+    in the lower interface are dispatched first, to keep the order).
+    Usage:
+        top = MAIN(Planner(iface, MAIN.x__fifo, base), base)
+    """
+
+    def __init__(self, iface, fifo=(), base=0):
+        self.iface = iface
+        self.fifo = frozenset(base + adr for adr in fifo)
+        self.extended = _lower_api(iface)
+        self.pending = False  # Operations queued in the lower interface
+        self.block_read = hasattr(iface, "read_block")
+        self.block_write = hasattr(iface, "write_block")
+        self.opers = []  # List of queued operations
+        self.rmw_addr = None  # RMW address for aggregated RMW commands
+        self.rmw_mask = 0  # Mask for the aggregated RMW commands
+        self.rmw_nval = 0  # Value for the aggregated RMW commands
+
+    def read(self, addr):
+        self.dispatch()
+        return self.iface.read(addr)
+
+    def write(self, addr, val):
+        self.dispatch()
+        self.iface.write(addr, val)
+
+    def read_block(self, addr, count):
+        self.dispatch()
+        if self.block_read:
+            return self.iface.read_block(addr, count)
+        return [self.iface.read(addr + i) for i in range(count)]
+
+    def write_block(self, addr, values):
+        self.dispatch()
+        if self.block_write:
+            self.iface.write_block(addr, values)
+        else:
+            for i, val in enumerate(values):
+                self.iface.write(addr + i, val)
+
+    def read_fifo(self, addr, count):
+        self.dispatch()
+        return self.iface.read_fifo(addr, count)
+
+    def write_fifo(self, addr, values):
+        self.dispatch()
+        self.iface.write_fifo(addr, values)
+
+    def read_fifo_into(self, addr, buf):
+        self.dispatch()
+        _read_fifo_into(self.iface, addr, buf)
+
+    def write_fifo_from(self, addr, buf):
+        self.dispatch()
+        _write_fifo_from(self.iface, addr, buf)
+
+    def readx(self, addr):
+        self.rmw()  # Finalize any pending RMW
+        fut = _PlannerFuture(self)
+        self.opers.append(("r", addr, fut))
+        return fut
+
+    def writex(self, addr, val):
+        self.rmw()  # Finalize any pending RMW
+        self.opers.append(("w", addr, val))
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # Call to RMW without arguments simply finalizes the last RMW
+        if (self.rmw_addr is not None) and (addr != self.rmw_addr):
+            self.opers.append(("m", self.rmw_addr, self.rmw_mask, self.rmw_nval))
+            self.rmw_addr = None
+        if addr is not None:
+            if self.rmw_addr is None:
+                self.rmw_addr = addr
+                self.rmw_mask = 0
+                self.rmw_nval = 0
+            # Now aggregate the current operation
+            self.rmw_mask |= mask
+            self.rmw_nval &= ~mask
+            self.rmw_nval |= val & mask
+
+    def _readx(self, addr):
+        # Returns the function delivering the value after the lower dispatch
+        if self.extended == "x":
+            self.pending = True
+            fut = self.iface.readx(addr)
+            return lambda: fut.val
+        if self.extended == "b":
+            self.pending = True
+            return self.iface.readb(addr)
+        val = self.iface.read(addr)
+        return lambda: val
+
+    def _writex(self, addr, val):
+        if self.extended == "x":
+            self.pending = True
+            self.iface.writex(addr, val)
+        elif self.extended == "b":
+            self.pending = True
+            self.iface.writeb(addr, val)
+        else:
+            self.iface.write(addr, val)
+
+    def _rmw(self, addr, mask, nval):
+        if self.extended == "x":
+            self.pending = True
+            self.iface.rmw(addr, mask, nval)
+            self.iface.rmw()
+        elif self.extended == "b":
+            self.pending = True
+            self.iface.writeb_masked(addr, mask, nval)
+        else:
+            self.iface.write(addr, (self.iface.read(addr) & ~mask) | nval)
+
+    def _execute(self, op, results):
+        # Passes the single operation to the lower interface
+        if op[0] == "r":
+            results.append((op[2], self._readx(op[1])))
+        elif op[0] == "w":
+            self._writex(op[1], op[2])
+        else:
+            self._rmw(op[1], op[2], op[3])
+
+    def _flush(self):
+        # Dispatches the operations queued in the lower interface,
+        # so that they are not overtaken by the immediate block transfer
+        if self.pending:
+            self.pending = False
+            self.iface.dispatch()
+
+    def _run_end(self, opers, start):
+        # Returns the end of the run of operations that may be merged:
+        # reads (or writes) of contiguous increasing addresses (not FIFOs)
+        op = opers[start]
+        end = start + 1
+        if op[0] in "rw" and op[1] not in self.fifo:
+            while (end < len(opers) and opers[end][0] == op[0]
+                   and opers[end][1] == opers[end - 1][1] + 1 and opers[end][1] not in self.fifo):
+                end += 1
+        return end
+
+    def dispatch(self):
+        self.rmw()  # Finalize any pending RMW
+        if not self.opers:
+            return
+        opers = self.opers
+        self.opers = []
+        results = []  # Pairs (future, function delivering its value)
+        start = 0
+        while start < len(opers):
+            op = opers[start]
+            end = self._run_end(opers, start)
+            if end - start > 1 and op[0] == "r" and self.block_read:
+                self._flush()
+                block = self.iface.read_block(op[1], end - start)
+                for rop, val in zip(opers[start:end], block):
+                    results.append((rop[2], lambda val=val: val))
+            elif end - start > 1 and op[0] == "w" and self.block_write:
+                self._flush()
+                self.iface.write_block(op[1], [wop[2] for wop in opers[start:end]])
+            else:
+                for op in opers[start:end]:
+                    self._execute(op, results)
+            start = end
+        self._flush()
+        for fut, getval in results:
+            fut.set(getval())
+
+class _MuxContext(object):
+    """Transaction context of a single thread using the Multiplexer."""
+
+    __slots__ = ("opers", "rmw_addr", "rmw_mask", "rmw_nval")
+
+    def __init__(self):
+        self.opers = []  # List of queued operations
+        self.rmw_addr = None  # RMW address for aggregated RMW commands
+        self.rmw_mask = 0  # Mask for the aggregated RMW commands
+        self.rmw_nval = 0  # Value for the aggregated RMW commands
+
+class _MuxBatch(object):
+    """Operations of a single context, submitted for the dispatch."""
+
+    __slots__ = ("opers", "done", "error")
+
+    def __init__(self, opers):
+        self.opers = opers
+        self.done = False
+        self.error = None
+
+class Multiplexer(object):
+    """Thread-safe multiplexer of the interface, used by multiple threads.
+
+    Each thread has its own transaction context: its own list of queued
+    operations (readx, writex, rmw) and its own aggregated RMW,
+    so the operations of different threads are never mixed.
+    The aggregated RMW of the context is passed to the lower interface
+    as a single rmw operation (or a read and a write done while
+    no other thread accesses the lower interface), so it is atomic
+    with respect to the other threads.
+
+    When a thread dispatches its operations, they are submitted
+    to the shared list. The first thread that finds the lower interface
+    free becomes the combiner: it takes the operations submitted by all
+    threads, passes them to the lower interface (operations of each
+    context in order), calls its dispatch once, and delivers the results
+    to all threads. The other threads wait for their results, so
+    the lower interface is used by a single thread at a time, without
+    serializing the threads on a global lock for the whole transaction.
+    If the lower dispatch fails, the exception is raised in all threads
+    whose operations were combined.
+
+    The direct accesses (read, write, block and FIFO transfers) are
+    passed the same way, so they are ordered with the queued operations
+    of the same thread.
+    The futures returned by readx must be used in the thread that
+    created them.
+
+    The lower interface must provide read and write methods.
+    If it provides the dispatch method and readx, writex, rmw
+    (the agwb extended interface) or readb, writeb, writeb_masked
+    (the agwb_dca extended interface), the single operations are queued
+    in it. If it provides read_block and write_block methods,
+    they are used for block transfers. The operations queued
+    in the lower interface are dispatched before each direct access,
+    to keep the order.
+    Usage:
+        mux = Multiplexer(iface)
+        # In each thread
+        top = MAIN(mux, base)
+    """
+
+    def __init__(self, iface):
+        self.iface = iface
+        self.extended = _lower_api(iface)
+        self.pending = False  # Operations queued in the lower interface
+        self.block_read = hasattr(iface, "read_block")
+        self.block_write = hasattr(iface, "write_block")
+        self.local = threading.local()
+        self.cond = threading.Condition()
+        self.submitted = []  # Batches waiting for the combiner
+        self.combining = False
+
+    def _context(self):
+        ctx = getattr(self.local, "ctx", None)
+        if ctx is None:
+            ctx = self.local.ctx = _MuxContext()
+        return ctx
+
+    @staticmethod
+    def _finish_rmw(ctx):
+        if ctx.rmw_addr is not None:
+            ctx.opers.append(("m", ctx.rmw_addr, ctx.rmw_mask, ctx.rmw_nval))
+            ctx.rmw_addr = None
+
+    def readx(self, addr):
+        ctx = self._context()
+        self._finish_rmw(ctx)
+        fut = _PlannerFuture(self)
+        ctx.opers.append(("r", addr, fut))
+        return fut
+
+    def writex(self, addr, val):
+        ctx = self._context()
+        self._finish_rmw(ctx)
+        ctx.opers.append(("w", addr, val))
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # Call to RMW without arguments simply finalizes the last RMW
+        ctx = self._context()
+        if (ctx.rmw_addr is not None) and (addr != ctx.rmw_addr):
+            self._finish_rmw(ctx)
+        if addr is not None:
+            if ctx.rmw_addr is None:
+                ctx.rmw_addr = addr
+                ctx.rmw_mask = 0
+                ctx.rmw_nval = 0
+            # Now aggregate the current operation
+            ctx.rmw_mask |= mask
+            ctx.rmw_nval &= ~mask
+            ctx.rmw_nval |= val & mask
+
+    def _call(self, func, *args):
+        # Passes the direct access to the lower interface in order
+        # with the queued operations, and returns its result
+        ctx = self._context()
+        self._finish_rmw(ctx)
+        fut = _PlannerFuture(self)
+        ctx.opers.append(("c", func, args, fut))
+        self.dispatch()
+        return fut.val
+
+    def read(self, addr):
+        fut = self.readx(addr)
+        self.dispatch()
+        return fut.val
+
+    def write(self, addr, val):
+        self.writex(addr, val)
+        self.dispatch()
+
+    def _read_block(self, addr, count):
+        if self.block_read:
+            return self.iface.read_block(addr, count)
+        return [self.iface.read(addr + i) for i in range(count)]
+
+    def _write_block(self, addr, values):
+        if self.block_write:
+            self.iface.write_block(addr, values)
+        else:
+            for i, val in enumerate(values):
+                self.iface.write(addr + i, val)
+
+    def read_block(self, addr, count):
+        return self._call(self._read_block, addr, count)
+
+    def write_block(self, addr, values):
+        self._call(self._write_block, addr, values)
+
+    def read_fifo(self, addr, count):
+        return self._call(self.iface.read_fifo, addr, count)
+
+    def write_fifo(self, addr, values):
+        self._call(self.iface.write_fifo, addr, values)
+
+    def read_fifo_into(self, addr, buf):
+        self._call(_read_fifo_into, self.iface, addr, buf)
+
+    def write_fifo_from(self, addr, buf):
+        self._call(_write_fifo_from, self.iface, addr, buf)
+
+    # The operations are passed to the lower interface like in the Planner
+    _readx = Planner._readx
+    _writex = Planner._writex
+    _rmw = Planner._rmw
+    _execute = Planner._execute
+    _flush = Planner._flush
+
+    def _combine(self, batches):
+        # Executes the operations of the batches with the lower interface
+        results = []  # Pairs (future, function delivering its value)
+        try:
+            for batch in batches:
+                for op in batch.opers:
+                    if op[0] == "c":
+                        # The direct access is executed immediately
+                        self._flush()
+                        val = op[1](*op[2])
+                        results.append((op[3], lambda val=val: val))
+                    else:
+                        self._execute(op, results)
+            self._flush()
+            for fut, getval in results:
+                fut.set(getval())
+        except Exception as exc:
+            self.pending = False
+            for batch in batches:
+                batch.error = exc
+        finally:
+            for batch in batches:
+                batch.done = True
+
+    def dispatch(self):
+        ctx = self._context()
+        self._finish_rmw(ctx)
+        if not ctx.opers:
+            return
+        batch = _MuxBatch(ctx.opers)
+        ctx.opers = []
+        combiner = False
+        with self.cond:
+            self.submitted.append(batch)
+            # Wait until another combiner executes the batch,
+            # or the lower interface is free
+            while self.combining and not batch.done:
+                self.cond.wait()
+            if not batch.done:
+                combiner = self.combining = True
+                batches = self.submitted
+                self.submitted = []
+        if combiner:
+            try:
+                self._combine(batches)
+            finally:
+                with self.cond:
+                    self.combining = False
+                    self.cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
+
 """
 Below is the demo code, showing an example how we may access the registers
 via an emulated interface.
@@ -487,6 +1259,7 @@ if __name__ == "__main__":
 
 
     class c2(Block):
+        __slots__ = ()
         x__size = 3
         x__fields = {
             "r1": (
@@ -499,6 +1272,7 @@ if __name__ == "__main__":
         }
 
     class regs(Block):
+        __slots__ = ()
         x__size:int = 4
         x__fields:dict = {
            "rv" : (
@@ -510,6 +1284,7 @@ if __name__ == "__main__":
         }
 
     class c1(Block):
+        __slots__ = ()
         x__size = 100
         x__fields = {"f1": (0, 10, (c2,)), "f2": (11, (c2,)), "size": (32, (c2,)),"x1":(40,5,(regs,))}
 
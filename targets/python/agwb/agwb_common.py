@@ -0,0 +1 @@
+../common/agwb_common.py
\ No newline at end of file
@@ -0,0 +1 @@
+from .agwb import *
@@ -0,0 +1,571 @@
+#!/usr/bin/python3
+"""@package docstring
+Documentation for agwb.py module (asyncio version)
+
+The agwb.py module is a helper that provides
+access to hierarchy of blocks/registers/bitfields
+generated by addr_gen_wb environment, from
+the asyncio-based Python code, via a simple interface.
+All access methods are coroutines, so accesses to many
+registers (or many boards) may be in flight concurrently:
+
+    vals = await asyncio.gather(*(top.LINKS[i].STATUS.read() for i in range(8)))
+
+The interface must provide two coroutines:
+
+async read(self,address) that returns 32-bit value
+async write(self,address,value) that writes such a value
+
+The interface may also provide the following coroutines:
+
+async rmw(self,address,mask,value) - performs the read-modify-write
+      operation defined as follows
+      X:= (X and ~mask) | (value and mask)
+      If it is not provided, the bitfield writes are done
+      as separate read and write (which is not atomic with respect
+      to other coroutines accessing the same register).
+async read_block(self,address,count) - reads count consecutive registers
+      starting from address and returns the list (or array) of values
+async write_block(self,address,values) - writes the list of values
+      to consecutive registers starting from address
+async read_fifo(self,address,count) - reads count values from
+      the single address
+async write_fifo(self,address,values) - writes the list of values
+      to the single address
+
+The interface may also provide methods for FIFO transfers
+with buffers (otherwise read_fifo and write_fifo are used):
+
+async read_fifo_into(self,address,buf) - reads len(buf) values from
+      the single address into buf (memoryview of 32-bit words)
+async write_fifo_from(self,address,buf) - writes the values from buf
+      (memoryview of 32-bit words) to the single address
+
+The control registers may be cached in the shadow cache
+(see Block.enable_shadow).
+
+If the block is generated with the masked_wr attribute, the bitfields
+of its control registers are written with the masked write
+(see _write_masked), without reading the register.
+"""
+import asyncio
+import array
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from .agwb_common import *
+except ImportError:
+    # agwb.py is run as the script (the demo code below)
+    from agwb_common import *
+
+async def _write_masked(iface, adr, mwr, mask, value):
+    """Sets the bits of the register at adr selected by mask to value,
+    with writes to the masked write windows located mwr and 2*mwr
+    above the register. Each half of the register touched by the mask
+    is modified with a single write (the mask in bits 31..16,
+    the value in bits 15..0).
+    """
+    if mask & 0xffff:
+        await iface.write(adr + mwr, ((mask & 0xffff) << 16) | (value & 0xffff))
+    if mask >> 16:
+        await iface.write(adr + 2 * mwr, (mask & 0xffff0000) | ((value >> 16) & 0xffff))
+
+async def _read_fifo_into(iface, adr, words):
+    """Reads len(words) values from the FIFO register at adr into words.
+    The read_fifo_into method of the interface is used if available.
+    """
+    if hasattr(iface, "read_fifo_into"):
+        await iface.read_fifo_into(adr, words)
+    else:
+        words[:] = array.array("I", await iface.read_fifo(adr, len(words)))
+
+async def _write_fifo_from(iface, adr, words):
+    """Writes the values from words to the FIFO register at adr.
+    The write_fifo_from method of the interface is used if available.
+    """
+    if hasattr(iface, "write_fifo_from"):
+        await iface.write_fifo_from(adr, words)
+    else:
+        await iface.write_fifo(adr, words.tolist())
+
+class _BitFieldAccess(object):
+    """Class providing a versatile object supporting  read/write access to any bitfield.
+
+    The details of the particular bitfield are hidden in the
+    BitField object passed via bf argument.
+    If cacheable is True (bitfields of control registers), the shadow
+    cache is used (if enabled for the interface).
+    If mwr is not 0, the bitfield is written with the masked write
+    (mwr is the size of the masked write window).
+    """
+
+    __slots__ = ("x__iface", "x__base", "x__bf", "x__cacheable", "x__mwr")
+
+    def __init__(self, iface, base, bf, cacheable=False, mwr=0):
+        self.x__iface = iface
+        self.x__base = base
+        self.x__bf = bf
+        self.x__cacheable = cacheable
+        self.x__mwr = mwr
+
+    def _shadow(self):
+        # Returns the shadow cache for the interface (or None)
+        if _shadows and self.x__cacheable:
+            return _shadows.get(self.x__iface)
+        return None
+
+    async def read(self):
+        """ The register is read, the result is
+            masked, shifted and returned as integer.
+            If the register is in the shadow cache, it is not read.
+        """
+        shadow = self._shadow()
+        if (shadow is not None) and not self.x__bf.trigger:
+            rval = shadow.get(self.x__base)
+            if rval is None:
+                rval = await self.x__iface.read(self.x__base)
+                shadow[self.x__base] = rval
+        else:
+            rval = await self.x__iface.read(self.x__base)
+        rval &= self.x__bf.mask
+        rval >>= self.x__bf.lsb
+        if self.x__bf.sign_mask:
+            if rval & self.x__bf.sign_mask:
+                rval -= self.x__bf.sign_mask << 1
+        return rval
+
+    async def write(self, value):
+        """ The write is performed with the rmw coroutine of the interface
+            (if available) or with separate read and write.
+            Please note, that access to each bitfield generates
+            a strobe pulse for the whole register (if strobe is implemented).
+            If the register is in the shadow cache, the new value of
+            the register is calculated from the cached one, and written.
+            If the masked write is available, it is used instead.
+        """
+        # Check if the value to be stored is correct
+        if (value < self.x__bf.vmin) or (value > self.x__bf.vmax):
+            raise Exception("Value doesn't fit in the bitfield")
+        # If the bitfield is signed, convert the negative values
+        if self.x__bf.sign_mask:
+            if value < 0:
+                value += self.x__bf.sign_mask << 1
+        # Shift the new value
+        value = value << self.x__bf.lsb
+        value &= self.x__bf.mask
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            # The cache is updated before the write, so concurrent writes
+            # to other bitfields of the register see the new value
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            # The trigger bits are read as zeros
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+            if self.x__mwr:
+                await _write_masked(self.x__iface, self.x__base, self.x__mwr, self.x__bf.mask, value)
+            else:
+                await self.x__iface.write(self.x__base, rval | value)
+            return
+        if self.x__mwr:
+            await _write_masked(self.x__iface, self.x__base, self.x__mwr, self.x__bf.mask, value)
+            return
+        if hasattr(self.x__iface, "rmw"):
+            await self.x__iface.rmw(self.x__base, self.x__bf.mask, value)
+            return
+        # Read the whole register
+        rval = await self.x__iface.read(self.x__base)
+        # Mask the bitfield
+        rval &= ~self.x__bf.mask
+        rval |= value
+        await self.x__iface.write(self.x__base, rval)
+
+class Vector(_VectorBase):
+    """Class describing the vector of registers or subblocks
+    (see _VectorBase), providing the bulk access to the vectors of registers.
+    """
+
+    __slots__ = ()
+
+    async def read_all(self, key=slice(None), field=None):
+        """ Reads registers selected by the key slice (by default all registers)
+            and returns their values as the NumPy uint32 array.
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the read_block coroutine, a single block
+            transfer is used. Otherwise all reads are issued concurrently.
+            If the field name is given, that bitfield is extracted from all
+            read values (signed bitfields are returned as int64 array).
+        """
+        rng = self._reg_range(key)
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "read_block"):
+            vals = await self.iface.read_block(self.base + rng.start * self.mclass.x__size, len(rng))
+        else:
+            vals = await asyncio.gather(*(self.iface.read(self.base + i * self.mclass.x__size) for i in rng))
+        vals = np.asarray(vals, dtype=np.uint32)
+        if field is None:
+            return vals
+        bf = self.args[0][field]
+        vals = (vals & bf.mask) >> bf.lsb
+        if bf.sign_mask:
+            vals = vals.astype(np.int64)
+            vals -= (vals & bf.sign_mask) << 1
+        return vals
+
+    async def write_all(self, values, key=slice(None)):
+        """ Writes values to registers selected by the key slice
+            (by default all registers).
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the write_block coroutine, a single block
+            transfer is used. Otherwise all writes are issued concurrently.
+        """
+        rng = self._reg_range(key)
+        if issubclass(self.mclass, StatusRegister):
+            raise Exception("Status registers at " + hex(self.base) + " can't be written")
+        vals = np.asarray(values, dtype=np.uint32)
+        if len(vals) != len(rng):
+            raise Exception("Number of values (" + str(len(vals)) + ") doesn't match number of registers ("
+                            + str(len(rng)) + ")")
+        if _shadows and (self.iface in _shadows):
+            shadow = _shadows[self.iface]
+            for i in rng:
+                shadow.pop(self.base + i * self.mclass.x__size, None)
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "write_block"):
+            await self.iface.write_block(self.base + rng.start * self.mclass.x__size, vals.tolist())
+        else:
+            await asyncio.gather(*(self.iface.write(self.base + i * self.mclass.x__size, val)
+                                   for i, val in zip(rng, vals.tolist())))
+
+class Block(_BlockBase):
+    """Class describing the blocks handled by addr_gen_wb-generated code.
+
+    The Python backend generates derived classes, with class fields
+    corresponding to subblocks or registers.
+    The flat register table (x__regmap), the lookup method and the shadow
+    cache control are provided by _BlockBase.
+    """
+
+    __slots__ = ("x__base", "x__iface", "x__variant", "x__handles")
+    x__regmap = _FlatTable()
+    x__fifo = _FlatTable()
+    x__vector = Vector
+    x__bf_access = _BitFieldAccess
+
+    def __init__(self, iface, base, variant = None):
+        """base is the base address for the given block. """
+        self.x__base = base
+        self.x__iface = iface
+        self.x__variant = variant
+        self.x__handles = {}
+
+    async def _verify_id(self):
+        id = await self.ID.read()
+        if id != self.x__id:
+            raise Exception(
+                self.__class__.__name__ + " has ID " + hex(self.x__id) + ", read ID " + hex(id)
+            )
+
+    async def _verify_ver(self):
+        ver = await self.VER.read()
+        if ver != self.x__ver:
+            raise Exception(
+                self.__class__.__name__ + " has VER " + hex(self.x__ver) + ", read VER " + hex(ver)
+            )
+
+    async def verify_id_and_version(self, batched=False, vectors=False):
+        """Read and verify id (ID) and version (VER) registers values.
+
+        This function reads and verifies ID and VER register values
+        in a recursive way for all non black box blocks.
+        All reads are issued concurrently.
+        It raises the exception if read values differ as it indicates,
+        that software and firmware versions differ.
+        If batched is True, the addresses of all ID and VER registers
+        are calculated from the generated tables, all reads are
+        issued at once, and the raised exception reports all mismatches.
+        The vectors of subblocks are verified only if vectors is True.
+        """
+        if batched:
+            await self._verify_id_and_version_batched(vectors)
+            return
+        checks = []
+        for k, f_i in self.x__fields.items():
+            if len(f_i) == 3:
+                if not (vectors and issubclass(f_i[2][0], Block)):
+                    continue
+                checks += [subblock.verify_id_and_version(vectors=vectors) for subblock in getattr(self, k)[:]]
+            elif issubclass(f_i[1][0], Block):
+                checks.append(getattr(self, k).verify_id_and_version(vectors=vectors))
+
+        if self.x__is_blackbox == False:
+            checks.append(self._verify_id())
+            checks.append(self._verify_ver())
+        await asyncio.gather(*checks)
+
+    async def _verify_id_and_version_batched(self, vectors):
+        regs = []
+        self._id_ver_regs(self.x__base, "", regs, vectors)
+        vals = await asyncio.gather(*(self.x__iface.read(reg[2]) for reg in regs))
+        errors = []
+        for (path, cls, adr, exp, name), val in zip(regs, vals):
+            if val != exp:
+                errors.append(
+                    cls.__name__ + " at " + (path[:-1] or "top") + " has " + name + " " + hex(exp)
+                    + ", read " + name + " " + hex(val)
+                )
+        if errors:
+            raise Exception("ID/VER mismatch in " + str(len(errors)) + " registers:\n" + "\n".join(errors))
+
+class _Register(object):
+    """Base class supporting access to the register."""
+
+    __slots__ = ("x__iface", "x__base", "x__bfields", "x__bf_handles")
+
+    x__size = 1
+    x__cacheable = False
+    x__mwr = 0
+    x__bf_access = _BitFieldAccess
+
+    def __init__(self, iface, base, bfields={}):
+        self.x__iface = iface
+        self.x__base = base
+        self.x__bfields = bfields
+        self.x__bf_handles = {}
+
+    def __dir__(self):
+        return self.x__bfields.keys()
+
+    async def read(self):
+        """ The register is read and the result is returned as integer.
+        """
+        return await self.x__iface.read(self.x__base)
+
+    async def read_fifo(self, count):
+        return await self.x__iface.read_fifo(self.x__base, count)
+
+    async def read_fifo_into(self, buf, count=None, chunk=None):
+        """ Reads count values (by default as many as fit in buf)
+            from the FIFO register into the preallocated buffer buf
+            (any object supporting the buffer protocol, e.g. bytearray,
+            array.array or NumPy array), without creating intermediate lists
+            (if the interface provides read_fifo_into).
+            If chunk is given, the values are read in transfers
+            of at most chunk values. Returns the number of read values.
+        """
+        words = _words(buf)
+        rng = _fifo_range(words, count, chunk)
+        for start, end in rng:
+            await _read_fifo_into(self.x__iface, self.x__base, words[start:end])
+        return rng[-1][1] if rng else 0
+
+    async def stream_fifo(self, count, chunk, buf=None):
+        """ Asynchronous generator reading count values from the FIFO
+            register in transfers of at most chunk values. All transfers
+            are read into the same buffer (buf, or allocated array of chunk
+            words), and the memoryview of the read words is yielded, so it
+            must be processed before the next transfer is read.
+        """
+        if buf is None:
+            buf = array.array("I", bytes(4 * chunk))
+        words = _words(buf)
+        for start in range(0, count, chunk):
+            view = words[:min(chunk, count - start)]
+            await _read_fifo_into(self.x__iface, self.x__base, view)
+            yield view
+
+    async def write(self, value):
+        """ The value is written to the register.
+            Please note, that access to each bitfield generates
+            a strobe pulse for the whole register (if strobe is implemented).
+        """
+        await self.x__iface.write(self.x__base, value)
+
+    async def write_fifo(self, values):
+        await self.x__iface.write_fifo(self.x__base, values)
+
+    async def write_fifo_from(self, buf, count=None, chunk=None):
+        """ Writes count values (by default all values) from the buffer buf
+            (any object supporting the buffer protocol) to the FIFO register,
+            without creating intermediate lists (if the interface provides
+            write_fifo_from).
+            If chunk is given, the values are written in transfers
+            of at most chunk values.
+        """
+        words = _words(buf)
+        for start, end in _fifo_range(words, count, chunk):
+            await _write_fifo_from(self.x__iface, self.x__base, words[start:end])
+
+    async def rmw(self, mask, value):
+        """ Read-modify-write method. Uses the rmw coroutine of the interface
+            (if available) or separate read and write.
+        """
+        if hasattr(self.x__iface, "rmw"):
+            await self.x__iface.rmw(self.x__base, mask, value & mask)
+            return
+        rval = await self.x__iface.read(self.x__base)
+        await self.x__iface.write(self.x__base, (rval & ~mask) | (value & mask))
+
+    def __getattr__(self, name):
+        # The created bitfield handles are cached
+        bf_handles = object.__getattribute__(self, "x__bf_handles")
+        try:
+            return bf_handles[name]
+        except KeyError:
+            pass
+        try:
+            handle = _BitFieldAccess(self.x__iface, self.x__base, self.x__bfields[name], self.x__cacheable,
+                                     self.x__mwr)
+        except KeyError as ke:
+            return object.__getattribute__(self,name)
+        bf_handles[name] = handle
+        return handle
+
+
+
+Register = _Register  # The generic register (never cached)
+
+
+class ControlRegister(_Register):
+    """Class supporting access to the control register.
+
+    If the shadow cache is enabled for the interface (see Block.enable_shadow),
+    the value of the register is stored after the first read or write,
+    and the next reads are served from the cache. Writes are always
+    performed (write-through).
+    The trigger bits are stored as zeros (as they are read).
+
+    The mask describes the bits implemented in the register (for registers
+    narrower than 32 bits), so the cache returns the values read
+    from the hardware.
+
+    If mwr is not 0 (the block is generated with the masked_wr attribute),
+    the bitfields are written, and rmw is performed with the masked write
+    (mwr is the size of the masked write window).
+    """
+
+    __slots__ = ("x__keep", "x__mwr")
+
+    x__cacheable = True
+
+    def __init__(self, iface, base, bfields={}, mwr=0, mask=0xffffffff):
+        super().__init__(iface, base, bfields)
+        self.x__mwr = mwr
+        # Bits stored in the shadow cache (the bits implemented
+        # in the register, without the trigger bits)
+        self.x__keep = mask
+        if bfields:
+            self.x__keep = 0
+            for bf in bfields.values():
+                if not bf.trigger:
+                    self.x__keep |= bf.mask
+            self.x__keep &= mask
+
+    async def read(self):
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if shadow is not None:
+                val = shadow.get(self.x__base)
+                if val is None:
+                    val = await self.x__iface.read(self.x__base)
+                    shadow[self.x__base] = val
+                return val
+        return await self.x__iface.read(self.x__base)
+
+    async def write(self, value):
+        if _shadows and (self.x__iface in _shadows):
+            _shadows[self.x__iface][self.x__base] = value & self.x__keep
+        await self.x__iface.write(self.x__base, value)
+
+    async def rmw(self, mask, value):
+        """ If the register is in the shadow cache, the new value
+            is calculated from the cached one, and written.
+            If the masked write is available, it is used instead.
+        """
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if (shadow is not None) and (self.x__base in shadow):
+                nval = (shadow[self.x__base] & ~mask) | (value & mask)
+                shadow[self.x__base] = nval & self.x__keep
+                if not self.x__mwr:
+                    await self.x__iface.write(self.x__base, nval)
+                    return
+        if self.x__mwr:
+            await _write_masked(self.x__iface, self.x__base, self.x__mwr, mask & 0xffffffff, value)
+            return
+        await super().rmw(mask, value)
+
+
+class StatusRegister(_Register):
+    """Class supporting access to the read-only (status) register.
+
+    The write methods throws an exception.
+    """
+
+    __slots__ = ()
+
+    async def write(self, value):
+        raise Exception("Status register at " + hex(self.x__base) + " can't be written")
+
+    async def rmw(self, mask, value):
+        raise Exception("Status register at " + hex(self.x__base) + " can't be written")
+
+# Register classes used by Block.lookup
+Block.x__status_register = StatusRegister
+Block.x__register = Register
+Block.x__control_register = ControlRegister
+
+"""
+Below is the demo code, showing an example how we may access the registers
+via an emulated interface.
+Many boards are accessed concurrently.
+"""
+if __name__ == "__main__":
+
+    # The class iface provides two coroutines
+    # read(address) and write(address,value)
+    # Each access takes some time, emulating the bus round trip.
+    class DemoIface(object):
+        def __init__(self, name):
+            self.name = name
+            self.rf = 1024 * [
+                int(0),
+            ]
+
+        async def read(self, addr):
+            await asyncio.sleep(0.01)
+            print(self.name + " reading from address:" + hex(addr) + " val=" + hex(self.rf[addr]))
+            return self.rf[addr]
+
+        async def write(self, addr, val):
+            await asyncio.sleep(0.01)
+            print(self.name + " writing " + hex(val) + " to address " + hex(addr))
+            self.rf[addr] = val
+
+    class c2(Block):
+        __slots__ = ()
+        x__size = 3
+        x__fields = {
+            "r1": (
+                1,
+                (
+                    ControlRegister,
+                    {"t1": BitField(3, 1, False), "t2": BitField(9, 4, True),},
+                ),
+            )
+        }
+
+    class c1(Block):
+        __slots__ = ()
+        x__size = 100
+        x__fields = {"f1": (0, 10, (c2,)), "f2": (11, (c2,))}
+
+    async def demo(board):
+        await board.f1[2].r1.t1.write(5)
+        await board.f1[2].r1.t2.write(-3)
+        print(board.x__iface.name + " t1=" + str(await board.f1[2].r1.t1.read())
+              + " t2=" + str(await board.f1[2].r1.t2.read()))
+
+    async def main():
+        boards = [c1(DemoIface("board" + str(i)), 12) for i in range(3)]
+        await asyncio.gather(*(demo(b) for b in boards))
+
+    asyncio.run(main())
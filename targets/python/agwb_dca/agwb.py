@@ -43,33 +43,82 @@ writeb_masked(self,address,mask,value, more=False)
 dispatch(self) - executes the accumulated list of operations
       (the list may be executed automatically, if it grows
       to its full possible length).
+
+The interface may also provide methods for block transfers
+used for bulk access to vectors of registers:
+
+read_block(self,address,count) - reads count consecutive registers
+      starting from address and returns the list (or array) of values
+write_block(self,address,values) - writes the list of values
+      to consecutive registers starting from address
+read_block_into(self,address,buf) - reads len(buf) consecutive registers
+      starting from address into buf (NumPy uint32 array); if available,
+      it is used by read_all instead of read_block
+
+The interface may also provide methods for FIFO transfers
+with buffers (otherwise read_fifo and write_fifo are used):
+
+read_fifo_into(self,address,buf) - reads len(buf) values from
+      the single address into buf (memoryview of 32-bit words)
+write_fifo_from(self,address,buf) - writes the values from buf
+      (memoryview of 32-bit words) to the single address
+
+The control registers may be cached in the shadow cache
+(see Block.enable_shadow).
+
+If the block is generated with the masked_wr attribute, the bitfields
+of its control registers are written with the masked write
+(see _write_masked), without reading the register.
 """
+import array
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from .agwb_common import *
+except ImportError:
+    # agwb.py is run as the script (the demo code below)
+    from agwb_common import *
 from typing import Callable, Any
-class BitField(object):
-    """Class delivering an object used to describe the bitfield.
 
-    Its fields contain certain precalculated values supporting quick
-    handling of read and write access to the field.
-    That class does not provide any methods.
-    Only fields are used.
+def _write_masked(write, adr:int, mwr:int, mask:int, value:int) -> None:
+    """Sets the bits of the register at adr selected by mask to value,
+    with writes to the masked write windows located mwr and 2*mwr
+    above the register. Each half of the register touched by the mask
+    is modified with a single write (the mask in bits 31..16,
+    the value in bits 15..0). The write function (e.g. iface.write or
+    iface.writeb) is used for the writes.
     """
-
-    def __init__(self, msb:int, lsb:int, is_signed:bool) -> None:
-        self.lsb = lsb
-        self.msb = msb
-        if is_signed:
-            self.sign_mask = 1 << (msb - lsb)
-            self.vmin = -self.sign_mask
-            self.vmax = self.sign_mask - 1
-        else:
-            self.vmin = 0
-            self.vmax = (1 << (msb - lsb + 1)) - 1
-            self.sign_mask = 0
-        self.mask = ((1 << (msb + 1)) - 1) ^ ((1 << lsb) - 1)
+    if mask & 0xffff:
+        write(adr + mwr, ((mask & 0xffff) << 16) | (value & 0xffff))
+    if mask >> 16:
+        write(adr + 2 * mwr, (mask & 0xffff0000) | ((value >> 16) & 0xffff))
+
+def _read_fifo_into(iface, adr, words):
+    """Reads len(words) values from the FIFO register at adr into words.
+    The read_fifo_into method of the interface is used if available.
+    """
+    if hasattr(iface, "read_fifo_into"):
+        iface.read_fifo_into(adr, words)
+    else:
+        words[:] = array.array("I", iface.read_fifo(adr, len(words)))
+
+def _write_fifo_from(iface, adr, words):
+    """Writes the values from words to the FIFO register at adr.
+    The write_fifo_from method of the interface is used if available.
+    """
+    if hasattr(iface, "write_fifo_from"):
+        iface.write_fifo_from(adr, words)
+    else:
+        iface.write_fifo(adr, words.tolist())
 
 class _BitFieldFuture(object):
     """Class enabling delayed access to the value read from the bitfield
     """
+
+    __slots__ = ("rfut", "bf")
+
     def __init__(self, rfut, bf):
         self.rfut = rfut
         self.bf = bf
@@ -87,19 +136,41 @@ class _BitFieldAccess(object):
 
     The details of the particular bitfield are hidden in the
     BitField object passed via bf argument.
+    If cacheable is True (bitfields of control registers), the shadow
+    cache is used (if enabled for the interface).
+    If mwr is not 0, the bitfield is written with the masked write
+    (mwr is the size of the masked write window).
     """
 
-    def __init__(self, iface, base, bf):
+    __slots__ = ("x__iface", "x__base", "x__bf", "x__cacheable", "x__mwr")
+
+    def __init__(self, iface, base, bf, cacheable=False, mwr=0):
         self.x__iface = iface
         self.x__base = base
         self.x__bf = bf
+        self.x__cacheable = cacheable
+        self.x__mwr = mwr
+
+    def _shadow(self):
+        # Returns the shadow cache for the interface (or None)
+        if _shadows and self.x__cacheable:
+            return _shadows.get(self.x__iface)
+        return None
 
     def readf(self) -> int:
         """ Simple read method. Does not use any access optimization.
             The read is performed immediately, the result is
             masked, shifted and returned as integer.
+            If the register is in the shadow cache, it is not read.
         """
-        rval = self.x__iface.read(self.x__base)
+        shadow = self._shadow()
+        if (shadow is not None) and not self.x__bf.trigger:
+            rval = shadow.get(self.x__base)
+            if rval is None:
+                rval = self.x__iface.read(self.x__base)
+                shadow[self.x__base] = rval
+        else:
+            rval = self.x__iface.read(self.x__base)
         rval &= self.x__bf.mask
         rval >>= self.x__bf.lsb
         if self.x__bf.sign_mask:
@@ -112,6 +183,9 @@ class _BitFieldAccess(object):
             The write is performed immediately.
             Please note, that access to each bitfield generates
             a strobe pulse for the whole register (if strobe is implemented).
+            If the register is in the shadow cache, the new value of
+            the register is calculated from the cached one, and written.
+            If the masked write is available, the masked write is used.
         """
         # Check if the value to be stored is correct
         if (value < self.x__bf.vmin) or (value > self.x__bf.vmax):
@@ -121,9 +195,28 @@ class _BitFieldAccess(object):
             if value < 0:
                 value += self.x__bf.sign_mask << 1
                 #print("final value: " + str(value))
+        if self.x__mwr:
+            self._write_masked(self.x__iface.write, value)
+            return
         value = value << self.x__bf.lsb
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            value &= self.x__bf.mask
+            self.x__iface.write(self.x__base, rval | value)
+            # The trigger bits are read as zeros
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+            return
         self.x__iface.write_masked(self.x__base, self.x__bf.mask, value)
 
+    def _write_masked(self, write, value:int) -> None:
+        value = (value << self.x__bf.lsb) & self.x__bf.mask
+        _write_masked(write, self.x__base, self.x__mwr, self.x__bf.mask, value)
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+
     def readfb(self) -> Callable[[],int]:
         """ Optimized read method. Schedules reading of the register.
             The "Callable" object is returned.
@@ -131,6 +224,10 @@ class _BitFieldAccess(object):
             The read is performed immediately (if not dispatched yet),
             and the result is masked, shifted and returned.
         """
+        shadow = self._shadow()
+        if (shadow is not None) and not self.x__bf.trigger and (self.x__base in shadow):
+            val = shadow[self.x__base]
+            return _BitFieldFuture(lambda: val, self.x__bf).val
         rval = self.x__iface.readb(self.x__base)
         return _BitFieldFuture(rval,self.x__bf).val
 
@@ -145,7 +242,8 @@ class _BitFieldAccess(object):
             is scheduled with the aggregated masks and values.
             As long as writefb is not complete, other operations
             on the interface raise the exception.
-
+            If the masked write is available, only the masked write
+            is scheduled (the writes are not aggregated).
         """
         # Check if the value to be stored is correct
         if (value < self.x__bf.vmin) or (value > self.x__bf.vmax):
@@ -155,74 +253,101 @@ class _BitFieldAccess(object):
             if value < 0:
                 value += self.x__bf.sign_mask << 1
                 #print("final value: " + str(value))
+        if self.x__mwr:
+            self._write_masked(self.x__iface.writeb, value)
+            return
         # Calculate the shifted value
         value = value << self.x__bf.lsb
+        shadow = self._shadow()
+        if (shadow is not None) and (self.x__base in shadow):
+            # Only the write is scheduled
+            rval = shadow[self.x__base] & ~self.x__bf.mask
+            value &= self.x__bf.mask
+            self.x__iface.writeb(self.x__base, rval | value)
+            shadow[self.x__base] = rval if self.x__bf.trigger else rval | value
+            return
         # Schedule the masked write operation
         self.x__iface.writeb_masked(self.x__base, self.x__bf.mask, value, more)
 
-class Vector(object):
-    """Class describing the vector of registers or subblocks.
-
-    It provides only a __getitem__ method that allows to access the particular object
-    in a vector (the object is created on the fly, when it is needed).
+class Vector(_VectorBase):
+    """Class describing the vector of registers or subblocks
+    (see _VectorBase), providing the bulk access to the vectors of registers.
     """
 
-    def __init__(self, iface, base, nitems, margs):
-        self.iface = iface
-        self.base = base
-        self.mclass = margs[0]
-        self.args = None
-        if len(margs) > 1:
-            self.args = margs[1]
-        self.nitems = nitems
-
-    def __getitem__(self, key):
-        if isinstance(key,slice):
-            return [self[i] for i in range(*key.indices(len(self)))]
-        if key < 0:
-            key = self.nitems + key
-        if key >= self.nitems:
-            raise IndexError
-        if self.args != None:
-            return self.mclass(
-                self.iface, self.base + key * self.mclass.x__size, self.args
-            )
-        return self.mclass(self.iface, self.base + key * self.mclass.x__size)
-
-    def __len__(self):
-        return self.nitems
+    __slots__ = ()
 
-class Block(object):
+    def read_all(self, key=slice(None), field=None):
+        """ Reads registers selected by the key slice (by default all registers)
+            and returns their values as the NumPy uint32 array.
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the read_block_into (or read_block) method,
+            a single block transfer is used.
+            If the field name is given, that bitfield is extracted from all
+            read values (signed bitfields are returned as int64 array).
+        """
+        rng = self._reg_range(key)
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "read_block_into"):
+            vals = np.empty(len(rng), dtype=np.uint32)
+            self.iface.read_block_into(self.base + rng.start * self.mclass.x__size, vals)
+        elif (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "read_block"):
+            vals = np.asarray(self.iface.read_block(self.base + rng.start * self.mclass.x__size, len(rng)),
+                              dtype=np.uint32)
+        else:
+            vals = np.fromiter((self.iface.read(self.base + i * self.mclass.x__size) for i in rng),
+                               dtype=np.uint32, count=len(rng))
+        if field is None:
+            return vals
+        bf = self.args[0][field]
+        vals = (vals & bf.mask) >> bf.lsb
+        if bf.sign_mask:
+            vals = vals.astype(np.int64)
+            vals -= (vals & bf.sign_mask) << 1
+        return vals
+
+    def write_all(self, values, key=slice(None)):
+        """ Writes values to registers selected by the key slice
+            (by default all registers).
+            If the registers are contiguous (step of the slice is 1) and
+            the interface provides the write_block method, a single block
+            transfer is used.
+        """
+        rng = self._reg_range(key)
+        if issubclass(self.mclass, StatusRegister):
+            raise Exception("Status registers at " + hex(self.base) + " can't be written")
+        vals = np.asarray(values, dtype=np.uint32)
+        if len(vals) != len(rng):
+            raise Exception("Number of values (" + str(len(vals)) + ") doesn't match number of registers ("
+                            + str(len(rng)) + ")")
+        if (len(rng) > 1) and (rng.step == 1) and hasattr(self.iface, "write_block"):
+            self.iface.write_block(self.base + rng.start * self.mclass.x__size, vals.tolist())
+        else:
+            for i, val in zip(rng, vals.tolist()):
+                self.iface.write(self.base + i * self.mclass.x__size, val)
+        if _shadows and (self.iface in _shadows):
+            shadow = _shadows[self.iface]
+            for i in rng:
+                shadow.pop(self.base + i * self.mclass.x__size, None)
+
+class Block(_BlockBase):
     """Class describing the blocks handled by addr_gen_wb-generated code.
 
     The Python backend generates derived classes, with class fields
     corresponding to subblocks or registers.
+    The flat register table (x__regmap), the lookup method and the shadow
+    cache control are provided by _BlockBase.
     """
 
-    x__is_blackbox:bool = False
-    x__size:int = 1
-    x__fields:dict = {}
+    __slots__ = ("x__base", "x__iface", "x__handles")
+    x__regmap = _FlatTable()
+    x__fifo = _FlatTable()
+    x__vector = Vector
+    x__bf_access = _BitFieldAccess
 
     def __init__(self, iface, base):
         """base is the base address for the given block. """
         self.x__base = base
         self.x__iface = iface
-
-    def __dir__(self):
-        return self.x__fields.keys()
-
-    def __getattr__(self, name):
-        try:
-            f_i = self.x__fields[name]
-            if len(f_i) == 3:
-                return Vector(self.x__iface, self.x__base + f_i[0], f_i[1], f_i[2])
-            elif len(f_i) == 2:
-                if len(f_i[1]) == 1:
-                    return f_i[1][0](self.x__iface, self.x__base + f_i[0])
-                # pass addititional argument to the constructor
-                return f_i[1][0](self.x__iface, self.x__base + f_i[0], f_i[1][1])
-        except KeyError as ke:
-            return object.__getattribute__(self,name)
+        self.x__handles = {}
 
     def _verify_id(self):
         id = self.ID.read()
@@ -238,36 +363,73 @@ class Block(object):
                 self.__class__.__name__ + " has VER " + hex(self.x__ver) + ", read VER " + hex(ver)
             )
 
-    def verify_id_and_version(self):
+    def verify_id_and_version(self, batched=False, vectors=False):
         """Read and verify id (ID) and version (VER) registers values.
 
         This function reads and verifies ID and VER register values
         in a recursive way for all non black box blocks.
         It raises the exception if read values differ as it indicates,
         that software and firmware versions differ.
+        If batched is True, the addresses of all ID and VER registers
+        are calculated from the generated tables, all reads are
+        scheduled with readb and executed with a single dispatch,
+        and the raised exception reports all mismatches.
+        The vectors of subblocks are verified only if vectors is True.
         """
-        for k in self.x__fields.keys():
-            subblock = getattr(self, k)
-            if not issubclass(type(subblock), Block):
-                continue
-            subblock.verify_id_and_version()
+        if batched:
+            self._verify_id_and_version_batched(vectors)
+            return
+        for k, f_i in self.x__fields.items():
+            # Registers are skipped without creating their handles
+            if len(f_i) == 3:
+                if not (vectors and issubclass(f_i[2][0], Block)):
+                    continue
+                for subblock in getattr(self, k)[:]:
+                    subblock.verify_id_and_version(vectors=vectors)
+            elif issubclass(f_i[1][0], Block):
+                getattr(self, k).verify_id_and_version(vectors=vectors)
 
         if self.x__is_blackbox == False:
             self._verify_id()
             self._verify_ver()
 
+    def _verify_id_and_version_batched(self, vectors):
+        regs = []
+        self._id_ver_regs(self.x__base, "", regs, vectors)
+        if hasattr(self.x__iface, "dispatch"):
+            futs = [self.x__iface.readb(reg[2]) for reg in regs]
+            self.x__iface.dispatch()
+            vals = [fut() for fut in futs]
+        else:
+            vals = [self.x__iface.read(reg[2]) for reg in regs]
+        errors = []
+        for (path, cls, adr, exp, name), val in zip(regs, vals):
+            if val != exp:
+                errors.append(
+                    cls.__name__ + " at " + (path[:-1] or "top") + " has " + name + " " + hex(exp)
+                    + ", read " + name + " " + hex(val)
+                )
+        if errors:
+            raise Exception("ID/VER mismatch in " + str(len(errors)) + " registers:\n" + "\n".join(errors))
+
     def dispatch(self):
         self.x__iface.dispatch()
 
 class _Register(object):
     """Base class supporting access to the register."""
 
+    __slots__ = ("x__iface", "x__base", "x__bfields", "x__bf_handles")
+
     x__size = 1
+    x__cacheable = False
+    x__mwr = 0
+    x__bf_access = _BitFieldAccess
 
     def __init__(self, iface, base, bfields={}):
         self.x__iface = iface
         self.x__base = base
         self.x__bfields = bfields
+        self.x__bf_handles = {}
 
     def __dir__(self):
         return self.x__bfields.keys()
@@ -291,6 +453,36 @@ class _Register(object):
     def read_fifo(self, count:int):
         return self.x__iface.read_fifo(self.x__base, count)
 
+    def read_fifo_into(self, buf, count=None, chunk=None):
+        """ Reads count values (by default as many as fit in buf)
+            from the FIFO register into the preallocated buffer buf
+            (any object supporting the buffer protocol, e.g. bytearray,
+            array.array or NumPy array), without creating intermediate lists
+            (if the interface provides read_fifo_into).
+            If chunk is given, the values are read in transfers
+            of at most chunk values. Returns the number of read values.
+        """
+        words = _words(buf)
+        rng = _fifo_range(words, count, chunk)
+        for start, end in rng:
+            _read_fifo_into(self.x__iface, self.x__base, words[start:end])
+        return rng[-1][1] if rng else 0
+
+    def stream_fifo(self, count, chunk, buf=None):
+        """ Generator reading count values from the FIFO register
+            in transfers of at most chunk values. All transfers are read
+            into the same buffer (buf, or allocated array of chunk words),
+            and the memoryview of the read words is yielded, so it must
+            be processed before the next transfer is read.
+        """
+        if buf is None:
+            buf = array.array("I", bytes(4 * chunk))
+        words = _words(buf)
+        for start in range(0, count, chunk):
+            view = words[:min(chunk, count - start)]
+            _read_fifo_into(self.x__iface, self.x__base, view)
+            yield view
+
     def write(self, value:int) -> None:
         """ Simple write method. Does not use any access optimization.
             The write is performed immediately.
@@ -308,7 +500,19 @@ class _Register(object):
         self.x__iface.writeb(self.x__base, value)
 
     def write_fifo(self, values):
-        self.x__iface.write(self.x__base, values)
+        self.x__iface.write_fifo(self.x__base, values)
+
+    def write_fifo_from(self, buf, count=None, chunk=None):
+        """ Writes count values (by default all values) from the buffer buf
+            (any object supporting the buffer protocol) to the FIFO register,
+            without creating intermediate lists (if the interface provides
+            write_fifo_from).
+            If chunk is given, the values are written in transfers
+            of at most chunk values.
+        """
+        words = _words(buf)
+        for start, end in _fifo_range(words, count, chunk):
+            _write_fifo_from(self.x__iface, self.x__base, words[start:end])
 
     def write_masked(self, mask:int, value:int) -> None:
         """ Executes the read-modify-write method.
@@ -330,13 +534,128 @@ class _Register(object):
         self.x__iface.dispatch()
 
     def __getattr__(self, name:str) -> Any:
+        # The created bitfield handles are cached
+        bf_handles = object.__getattribute__(self, "x__bf_handles")
+        try:
+            return bf_handles[name]
+        except KeyError:
+            pass
         try:
-            return _BitFieldAccess(self.x__iface, self.x__base, self.x__bfields[name])
+            handle = _BitFieldAccess(self.x__iface, self.x__base, self.x__bfields[name], self.x__cacheable,
+                                     self.x__mwr)
         except KeyError as ke:
             return object.__getattribute__(self,name)
+        bf_handles[name] = handle
+        return handle
+
+
+Register = _Register  # The generic register (never cached)
+
+
+class ControlRegister(_Register):
+    """Class supporting access to the control register.
+
+    If the shadow cache is enabled for the interface (see Block.enable_shadow),
+    the value of the register is stored after the first read or write,
+    and the next reads are served from the cache. Writes are always
+    performed (write-through).
+    The trigger bits are stored as zeros (as they are read).
+
+    The mask describes the bits implemented in the register (for registers
+    narrower than 32 bits), so the cache returns the values read
+    from the hardware.
+
+    If mwr is not 0 (the block is generated with the masked_wr attribute),
+    the bitfields are written, and write_masked and writeb_masked are
+    performed with the masked write (mwr is the size of the masked write window).
+    """
+
+    __slots__ = ("x__keep", "x__mwr")
+
+    x__cacheable = True
+
+    def __init__(self, iface, base, bfields={}, mwr=0, mask=0xffffffff):
+        super().__init__(iface, base, bfields)
+        self.x__mwr = mwr
+        # Bits stored in the shadow cache (the bits implemented
+        # in the register, without the trigger bits)
+        self.x__keep = mask
+        if bfields:
+            self.x__keep = 0
+            for bf in bfields.values():
+                if not bf.trigger:
+                    self.x__keep |= bf.mask
+            self.x__keep &= mask
+
+    def read(self) -> int:
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if shadow is not None:
+                val = shadow.get(self.x__base)
+                if val is None:
+                    val = self.x__iface.read(self.x__base)
+                    shadow[self.x__base] = val
+                return val
+        return self.x__iface.read(self.x__base)
+
+    def readb(self) -> Callable[[],int]:
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if (shadow is not None) and (self.x__base in shadow):
+                val = shadow[self.x__base]
+                return lambda: val
+        return self.x__iface.readb(self.x__base)
+
+    def write(self, value:int) -> None:
+        self.x__iface.write(self.x__base, value)
+        if _shadows and (self.x__iface in _shadows):
+            _shadows[self.x__iface][self.x__base] = value & self.x__keep
+
+    def writeb(self, value:int) -> None:
+        self.x__iface.writeb(self.x__base, value)
+        if _shadows and (self.x__iface in _shadows):
+            _shadows[self.x__iface][self.x__base] = value & self.x__keep
+
+    def _shadow_masked(self, mask:int, value:int):
+        # Returns the new value of the register calculated from the cached one
+        # (and updates the cache), or None if the register is not cached
+        if _shadows:
+            shadow = _shadows.get(self.x__iface)
+            if (shadow is not None) and (self.x__base in shadow):
+                value = (shadow[self.x__base] & ~mask) | (value & mask)
+                shadow[self.x__base] = value & self.x__keep
+                return value
+        return None
 
+    def write_masked(self, mask:int, value:int) -> None:
+        """ If the masked write is available, it is used.
+            If the register is in the shadow cache, the new value
+            is calculated from the cached one, and written.
+        """
+        if self.x__mwr:
+            _write_masked(self.x__iface.write, self.x__base, self.x__mwr, mask & 0xffffffff, value)
+            self._shadow_masked(mask, value)
+            return
+        nval = self._shadow_masked(mask, value)
+        if nval is None:
+            self.x__iface.write_masked(self.x__base, mask, value)
+        else:
+            self.x__iface.write(self.x__base, nval)
 
-ControlRegister = _Register  # The control register is just the generic register
+    def writeb_masked(self, mask:int, value:int, more:bool=False) -> None:
+        """ If the masked write is available, only the masked write is scheduled.
+            If the register is in the shadow cache, the new value
+            is calculated from the cached one, and only the write is scheduled.
+        """
+        if self.x__mwr:
+            _write_masked(self.x__iface.writeb, self.x__base, self.x__mwr, mask & 0xffffffff, value)
+            self._shadow_masked(mask, value)
+            return
+        nval = self._shadow_masked(mask, value)
+        if nval is None:
+            self.x__iface.writeb_masked(self.x__base, mask, value, more)
+        else:
+            self.x__iface.writeb(self.x__base, nval)
 
 
 class StatusRegister(_Register):
@@ -345,6 +664,8 @@ class StatusRegister(_Register):
     The write methods throws an exception.
     """
 
+    __slots__ = ()
+
     def write(self, value:int) -> None:
         raise Exception("Status register at " + hex(self.x__base) + " can't be written")
 
@@ -354,6 +675,11 @@ class StatusRegister(_Register):
     def write_masked(self, mask:int, value:int) -> None:
         raise Exception("Status register at " + hex(self.x__base) + " can't be written")
 
+# Register classes used by Block.lookup
+Block.x__status_register = StatusRegister
+Block.x__register = Register
+Block.x__control_register = ControlRegister
+
 """
 Below is the demo code, showing an example how we may access the registers
 via an emulated interface.
@@ -478,6 +804,7 @@ if __name__ == "__main__":
 
 
     class c2(Block):
+        __slots__ = ()
         x__size = 3
         x__fields = {
             "r1": (
@@ -490,6 +817,7 @@ if __name__ == "__main__":
         }
 
     class regs(Block):
+        __slots__ = ()
         x__size:int = 4
         x__fields:dict = {
            "rv" : (
@@ -501,6 +829,7 @@ if __name__ == "__main__":
         }
 
     class c1(Block):
+        __slots__ = ()
         x__size = 100
         x__fields = {
             "f1": (0, 10, (c2,)),
@@ -0,0 +1,106 @@
+"""
+In-memory emulator of the interface for the asyncio version
+of the agwb package (generated with --pythonasync).
+It may be used for testing the software without the hardware.
+Each access may be delayed to emulate the bus round trip.
+"""
+import asyncio
+
+class AsyncEmulInterface:
+    """Class emulating the register file accessed via the asyncio interface."""
+
+    def __init__(self, latency=0.0, verbose=False):
+        """
+        Parameters
+        ----------
+        latency
+            Delay of each access in seconds (0 - only yields to the event loop).
+        verbose
+            If True, each access is printed.
+        """
+        self.latency = latency
+        self.verbose = verbose
+        self.rf = {}  # Emulated register file (unwritten registers read as 0)
+        self.mwr = {}  # Masked write addresses {address: (register address, half)}
+
+    async def read(self, addr):
+        await asyncio.sleep(self.latency)
+        val = self.rf.get(addr, 0)
+        if self.verbose:
+            print("reading from address:" + hex(addr) + " val=" + hex(val))
+        return val
+
+    async def write(self, addr, val):
+        await asyncio.sleep(self.latency)
+        if self.verbose:
+            print("writing " + hex(val) + " to address " + hex(addr))
+        if self.mwr and (addr in self.mwr):
+            addr, half = self.mwr[addr]
+            mask = (val >> 16) << (16 * half)
+            val = (val & 0xffff) << (16 * half)
+            self.rf[addr] = (self.rf.get(addr, 0) & ~mask) | (val & mask)
+            return
+        self.rf[addr] = val
+
+    async def rmw(self, addr, mask, val):
+        # The read and write are done without yielding, so the operation is atomic
+        await asyncio.sleep(self.latency)
+        self.rf[addr] = (self.rf.get(addr, 0) & ~mask) | (val & mask)
+
+    async def read_block(self, addr, count):
+        await asyncio.sleep(self.latency)
+        return [self.rf.get(addr + i, 0) for i in range(count)]
+
+    async def write_block(self, addr, values):
+        await asyncio.sleep(self.latency)
+        for i, val in enumerate(values):
+            self.rf[addr + i] = val
+
+    async def read_fifo(self, addr, count):
+        await asyncio.sleep(self.latency)
+        return count * [self.rf.get(addr, 0)]
+
+    async def write_fifo(self, addr, values):
+        await asyncio.sleep(self.latency)
+        for val in values:
+            self.rf[addr] = val
+
+    async def read_fifo_into(self, addr, buf):
+        await asyncio.sleep(self.latency)
+        val = self.rf.get(addr, 0)
+        for i in range(len(buf)):
+            buf[i] = val
+
+    async def write_fifo_from(self, addr, buf):
+        await asyncio.sleep(self.latency)
+        if len(buf):
+            self.rf[addr] = buf[-1]
+
+    def add_masked_wr(self, blk):
+        """Enables emulation of the masked write windows of the control
+        registers of the block blk and its subblocks (generated with
+        the masked_wr attribute), found in its flat register table.
+        """
+        for f_i in blk.x__regmap.values():
+            if len(f_i) > 6:
+                addr = blk.x__base + f_i[0]
+                self.mwr[addr + f_i[6]] = (addr, 0)
+                self.mwr[addr + 2 * f_i[6]] = (addr, 1)
+
+    def preset_id_and_version(self, blk):
+        """Stores the expected ID and VER values of the block blk
+        and all its subblocks in the emulated register file, so that
+        verify_id_and_version succeeds.
+        """
+        if not blk.x__is_blackbox:
+            self.rf[blk.ID.x__base] = blk.x__id
+            self.rf[blk.VER.x__base] = blk.x__ver
+        for name in blk.x__fields:
+            sub = getattr(blk, name)
+            if hasattr(sub, "nitems"):
+                # Vector - only vectors of blocks are checked
+                if hasattr(sub.mclass, "x__fields"):
+                    for item in sub[:]:
+                        self.preset_id_and_version(item)
+            elif hasattr(sub, "x__fields"):
+                self.preset_id_and_version(sub)
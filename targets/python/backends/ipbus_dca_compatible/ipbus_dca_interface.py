@@ -42,6 +42,17 @@ class IPbusInterface:
         self.client.write(addr, val)
         self.client.dispatch()
 
+    def read_block(self, addr, count):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        val = self.client.readBlock(addr,count,uhal.BlockReadWriteMode.INCREMENTAL)
+        self.client.dispatch()
+        return val.value()
+
+    def write_block(self, addr, values):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self.client.writeBlock(addr,values,uhal.BlockReadWriteMode.INCREMENTAL)
+        self.client.dispatch()
+
     def writeb(self, addr, val):
         self._check_wbm() # Test for uncompleted writeb_masked
         self.client.write(addr, val)
@@ -0,0 +1,324 @@
+"""
+Pipelined IPbus interface, and the pool of such interfaces
+for multiple devices.
+
+The IPbusInterface calls dispatch after each read and write,
+so each access is a separate round trip. The PipelinedIPbusInterface
+only queues the operations in the uhal client. They are dispatched
+together, when:
+ * the value of a read is needed (read, read_block, read_fifo,
+   or the result of readb/readx is used),
+ * the number of queued operations or words reaches the limit,
+ * the oldest queued operation waits longer than max_delay
+   (checked when the next operation is queued),
+ * dispatch (or barrier) is called.
+With posted=False, the writes are dispatched immediately
+(like in IPbusInterface), but the queued operations are still
+dispatched together with them.
+The block and FIFO transfers are split into transactions
+of at most 255 words (the limit of the IPbus transaction).
+
+The interface provides the methods expected by both the agwb_dca
+(readb, writeb, write_masked, writeb_masked) and the agwb (readx, writex,
+rmw) packages. The results of readb/readx may be called, or read
+via the val field.
+
+Any object providing the API of uhal.HwInterface (getClient) and
+of its client (read, write, readBlock, writeBlock, rmw_bits, dispatch)
+may be used instead of the uhal device (e.g. a stand-in for testing
+without the hardware). Then uhal is not needed.
+
+Example:
+    pool = IPbusPool(uhal.ConnectionManager("file://connections.xml"))
+    tops = [agwb.MAIN(pool.get(dev), 0) for dev in devices]
+    ...
+    # Each function is run in a separate thread, for its own device
+    pool.map(lambda iface: configure(agwb.MAIN(iface, 0)))
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import uhal
+    _INCREMENTAL = uhal.BlockReadWriteMode.INCREMENTAL
+    _NON_INCREMENTAL = uhal.BlockReadWriteMode.NON_INCREMENTAL
+except ImportError:
+    uhal = None
+    _INCREMENTAL = "INCREMENTAL"
+    _NON_INCREMENTAL = "NON_INCREMENTAL"
+
+# Maximum number of words transferred by a single IPbus transaction
+MAX_TRANSACTION_WORDS = 255
+
+class _Result(object):
+    """Result of the queued read. The read values are returned
+    by calling the object (agwb_dca) or via the val field (agwb).
+    If the read is not dispatched yet, it is dispatched first.
+    """
+
+    __slots__ = ("iface", "batch", "parts", "block")
+
+    def __init__(self, iface, parts, block=False):
+        self.iface = iface
+        self.batch = iface.batch
+        self.parts = parts
+        self.block = block
+
+    def __call__(self):
+        if self.batch == self.iface.batch:
+            self.iface.dispatch()
+        if not self.block:
+            return self.parts[0].value()
+        res = []
+        for part in self.parts:
+            res += part.value()
+        return res
+
+    @property
+    def val(self):
+        return self()
+
+class PipelinedIPbusInterface:
+    """Class representing the IPbus interface, that dispatches the operations
+    in batches.
+    """
+
+    def __init__(self, connection_manager, device, posted=True, max_ops=1024, max_words=16384,
+                 max_delay=None, clock=time.monotonic):
+        """
+        Parameters
+        ----------
+        connection_manager
+            Connection manager returned by the uhal.ConnectionManager()
+            (or None, if device is the device object).
+        device
+            Name of the device (or the device object).
+        posted
+            If True, the writes are queued, and dispatched with the next batch.
+        max_ops
+            Maximum number of queued transactions.
+        max_words
+            Maximum number of queued words (read or written).
+        max_delay
+            Maximum time in seconds, that the queued operation may wait
+            for dispatch (None - no limit).
+        clock
+            Function returning the current time in seconds.
+        """
+        if connection_manager is not None:
+            device = connection_manager.getDevice(device)
+        self.device = device
+        self.client = device.getClient()
+        self.posted = posted
+        self.max_ops = max_ops
+        self.max_words = max_words
+        self.max_delay = max_delay
+        self.clock = clock
+        # Number of the current batch (incremented by dispatch)
+        self.batch = 0
+        self.nops = 0
+        self.nwords = 0
+        self.t_first = 0.0
+        self.rmw_addr = None
+        self.rmw_mask = 0
+        self.rmw_nval = 0
+
+    def _queued(self, nwords):
+        # Accounts the operation queued in the client
+        if self.nops == 0:
+            self.t_first = self.clock()
+        self.nops += 1
+        self.nwords += nwords
+
+    def _check(self):
+        # Dispatches the queued operations if any limit is reached
+        if (self.nops >= self.max_ops) or (self.nwords >= self.max_words):
+            self.dispatch()
+        elif (self.max_delay is not None) and (self.nops > 0) and \
+                (self.clock() - self.t_first >= self.max_delay):
+            self.dispatch()
+
+    def _posted(self):
+        # Finishes queuing of the write
+        if self.posted:
+            self._check()
+        else:
+            self.dispatch()
+
+    def _check_wbm(self):
+        if (self.rmw_addr is not None):
+            raise Exception("Another operation can't be done when writeb_masked is not completed")
+
+    def _read_chunks(self, addr, count, mode):
+        # Queues the block read split into transactions
+        parts = []
+        for start in range(0, count, MAX_TRANSACTION_WORDS):
+            n = min(MAX_TRANSACTION_WORDS, count - start)
+            if mode == _INCREMENTAL:
+                parts.append(self.client.readBlock(addr + start, n, mode))
+            else:
+                parts.append(self.client.readBlock(addr, n, mode))
+            self._queued(n)
+        return _Result(self, parts, True)
+
+    def _write_chunks(self, addr, values, mode):
+        # Queues the block write split into transactions
+        values = list(values)
+        for start in range(0, len(values), MAX_TRANSACTION_WORDS):
+            chunk = values[start:start + MAX_TRANSACTION_WORDS]
+            if mode == _INCREMENTAL:
+                self.client.writeBlock(addr + start, chunk, mode)
+            else:
+                self.client.writeBlock(addr, chunk, mode)
+            self._queued(len(chunk))
+
+    def read(self, addr):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        ret = self.client.read(addr)
+        self._queued(1)
+        self.dispatch()
+        return ret.value()
+
+    def write(self, addr, val):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self.client.write(addr, val)
+        self._queued(1)
+        self._posted()
+
+    def readb(self, addr):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        res = _Result(self, [self.client.read(addr)])
+        self._queued(1)
+        self._check()
+        return res
+
+    def writeb(self, addr, val):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self.client.write(addr, val)
+        self._queued(1)
+        self._check()
+
+    readx = readb
+    writex = writeb
+
+    def read_block(self, addr, count):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        return self._read_chunks(addr, count, _INCREMENTAL)()
+
+    def write_block(self, addr, values):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self._write_chunks(addr, values, _INCREMENTAL)
+        self._posted()
+
+    def read_fifo(self, addr, count):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        return self._read_chunks(addr, count, _NON_INCREMENTAL)()
+
+    def write_fifo(self, addr, values):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self._write_chunks(addr, values, _NON_INCREMENTAL)
+        self._posted()
+
+    def write_masked(self, address, mask, value):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self.client.rmw_bits(address, 0xffffffff ^ mask, value & mask)
+        self._queued(1)
+        self._posted()
+
+    def writeb_masked(self, address, mask, value, more=False):
+        # Check if another RMW was not completed
+        if (self.rmw_addr is not None) and (address != self.rmw_addr):
+            raise Exception("aggregated writeb_masked must use the same address")
+        if self.rmw_addr is None:
+            self.rmw_addr = address
+            self.rmw_mask = mask
+            self.rmw_nval = value
+        else:
+            self.rmw_mask |= mask
+            self.rmw_nval &= ~mask
+            self.rmw_nval |= (value & mask)
+        if not more:
+            self.client.rmw_bits(address, 0xffffffff ^ self.rmw_mask, self.rmw_nval & self.rmw_mask)
+            self.rmw_addr = None
+            self._queued(1)
+            self._check()
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # The rmw_bits is executed in the hardware, so the aggregation
+        # of consecutive rmw operations is not needed
+        if addr is not None:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self.client.rmw_bits(addr, 0xffffffff ^ mask, val & mask)
+            self._queued(1)
+            self._check()
+
+    def dispatch(self):
+        """Dispatches all queued operations (it may be used as the barrier)."""
+        if self.nops == 0:
+            return
+        try:
+            self.client.dispatch()
+        finally:
+            self.nops = 0
+            self.nwords = 0
+            self.batch += 1
+
+    barrier = dispatch
+
+class IPbusPool:
+    """Pool of the pipelined interfaces of multiple devices.
+
+    The interfaces (and their uhal clients) are created on the first use,
+    and reused later. Each interface should be used by a single thread
+    at a time, but different devices may be driven concurrently
+    (see map and dispatch_all).
+    """
+
+    def __init__(self, connection_manager, workers=None, **options):
+        """
+        Parameters
+        ----------
+        connection_manager
+            Connection manager returned by the uhal.ConnectionManager().
+        workers
+            Maximum number of threads driving the devices concurrently
+            (by default as chosen by ThreadPoolExecutor).
+        options
+            Options passed to the created PipelinedIPbusInterface objects.
+        """
+        self.connection_manager = connection_manager
+        self.options = options
+        self.ifaces = {}
+        self.executor = ThreadPoolExecutor(workers)
+
+    def get(self, device):
+        """Returns the interface of the device (the name of the device)."""
+        iface = self.ifaces.get(device)
+        if iface is None:
+            iface = PipelinedIPbusInterface(self.connection_manager, device, **self.options)
+            self.ifaces[device] = iface
+        return iface
+
+    def map(self, func, devices=None):
+        """Calls func(iface) for the interfaces of devices (by default
+        all already created interfaces), each in a separate thread.
+        The operations queued by func are dispatched, and the list
+        of the returned values is returned.
+        """
+        if devices is None:
+            ifaces = list(self.ifaces.values())
+        else:
+            ifaces = [self.get(device) for device in devices]
+
+        def run(iface):
+            res = func(iface)
+            iface.dispatch()
+            return res
+        return list(self.executor.map(run, ifaces))
+
+    def dispatch_all(self):
+        """Dispatches the operations queued in all interfaces concurrently."""
+        self.map(lambda iface: None)
+
+    def close(self):
+        """Stops the worker threads."""
+        self.executor.shutdown()
@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+"""
+Emulated IPbus 2.0 endpoint (UDP) with the register file in memory.
+
+It may be used for testing and benchmarking the software
+without the hardware (e.g. with IPbusUDPInterface or uhal).
+The endpoint handles the control packets (read, write,
+non-incrementing read and write, RMW-bits and RMW-sum transactions),
+the status requests and the re-send requests.
+The non-incrementing read returns the value of the register,
+the non-incrementing write leaves the last written value in the register.
+Access outside of the register file ends with the bus error.
+Loss of the packets may be emulated with the drop function.
+
+The endpoint may be run in the background thread:
+    with IPbusEndpoint(size=0x20000) as ep:
+        iface = IPbusUDPInterface("127.0.0.1", ep.port)
+        ...
+or as a separate process:
+    ipbus_endpoint.py [--host 127.0.0.1] [--port 50001] [--size 65536] [--nbuffers 16]
+"""
+import argparse
+import array
+import socket
+import struct
+import threading
+from collections import OrderedDict
+
+from ipbus_udp_interface import (PROTOCOL_VERSION, CONTROL, STATUS, RESEND, READ, WRITE,
+                                 NI_READ, NI_WRITE, RMW_BITS, RMW_SUM, REQUEST, STATUS_WORDS,
+                                 packet_header, next_packet_id)
+
+class IPbusEndpoint:
+    """Class emulating the IPbus 2.0 endpoint."""
+
+    def __init__(self, size=0x10000, host="127.0.0.1", port=0, nbuffers=16, mtu=1500, drop=None):
+        """
+        Parameters
+        ----------
+        size
+            Number of registers.
+        host
+            Address of the endpoint.
+        port
+            UDP port of the endpoint (0 - any free port, see the port field).
+        nbuffers
+            Number of response buffers (kept for re-send requests).
+        mtu
+            MTU reported in the status.
+        drop
+            Function drop(kind, packet_id) returning True if the packet
+            should be lost. The kind is "request" or "response".
+        """
+        self.rf = array.array("I", bytes(4 * size))
+        self.nbuffers = nbuffers
+        self.mtu = mtu
+        self.drop = drop
+        self.next_id = 1
+        # Responses to the last control packets {packet ID: response}
+        self.responses = OrderedDict()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.running = False
+        self.thread = None
+
+    def handle(self, data):
+        """Handles the received packet, and returns the response
+        (or None, if the packet should not be responded).
+        """
+        if len(data) < 4:
+            return None
+        words = array.array("I")
+        words.frombytes(data[:len(data) & ~3])
+        # The byte order is recognized from the packet header
+        hdr = words[0]
+        swap = ((hdr >> 28) != PROTOCOL_VERSION) or ((hdr & 0xf0) != 0xf0)
+        if swap:
+            words.byteswap()
+        hdr = words[0]
+        if ((hdr >> 28) != PROTOCOL_VERSION) or ((hdr & 0xf0) != 0xf0):
+            return None
+        pid = (hdr >> 8) & 0xffff
+        ptype = hdr & 0xf
+        if ptype == STATUS:
+            resp = array.array("I", [hdr, self.mtu, self.nbuffers, packet_header(self.next_id, CONTROL)])
+            resp.extend((STATUS_WORDS - len(resp)) * [0])
+        elif ptype == RESEND:
+            return self.responses.get(pid)
+        elif ptype == CONTROL:
+            # The control packets out of order are dropped
+            if (pid != 0) and (pid != self.next_id):
+                return None
+            resp = self._control(words)
+        else:
+            return None
+        if swap:
+            resp.byteswap()
+        resp = resp.tobytes()
+        if (ptype == CONTROL) and (pid != 0):
+            self.next_id = next_packet_id(pid)
+            self.responses[pid] = resp
+            if len(self.responses) > self.nbuffers:
+                self.responses.popitem(last=False)
+        return resp
+
+    def _control(self, words):
+        """Executes the transactions of the control packet, and returns
+        the response. The processing stops at the first failed transaction.
+        """
+        rf = self.rf
+        resp = array.array("I", [words[0]])
+        pos = 1
+        while pos + 1 < len(words):
+            thdr = words[pos]
+            nwords = (thdr >> 8) & 0xff
+            ttype = (thdr >> 4) & 0xf
+            ok = thdr & 0xfffffff0
+            addr = words[pos + 1]
+            if ((thdr >> 28) != PROTOCOL_VERSION) or ((thdr & 0xf) != REQUEST):
+                resp.append(ok | 0x1)
+                break
+            if ttype in (READ, NI_READ):
+                end = addr + (nwords if ttype == READ else 1)
+                if end > len(rf):
+                    resp.append(ok | 0x4)
+                    break
+                resp.append(ok)
+                if ttype == READ:
+                    resp.extend(rf[addr:end])
+                else:
+                    resp.extend(nwords * [rf[addr]])
+                pos += 2
+            elif ttype in (WRITE, NI_WRITE):
+                end = addr + (nwords if ttype == WRITE else 1)
+                if (end > len(rf)) or (pos + 2 + nwords > len(words)):
+                    resp.append(ok | 0x5)
+                    break
+                if ttype == WRITE:
+                    rf[addr:end] = words[pos + 2:pos + 2 + nwords]
+                elif nwords:
+                    rf[addr] = words[pos + 1 + nwords]
+                resp.append(ok)
+                pos += 2 + nwords
+            elif ttype in (RMW_BITS, RMW_SUM):
+                nargs = 2 if ttype == RMW_BITS else 1
+                if (addr >= len(rf)) or (pos + 2 + nargs > len(words)):
+                    resp.append(ok | 0x4)
+                    break
+                old = rf[addr]
+                if ttype == RMW_BITS:
+                    rf[addr] = (old & words[pos + 2]) | words[pos + 3]
+                else:
+                    rf[addr] = (old + words[pos + 2]) & 0xffffffff
+                resp.append(ok)
+                resp.append(old)
+                pos += 2 + nargs
+            else:
+                resp.append(ok | 0x1)
+                break
+        return resp
+
+    def serve_forever(self):
+        """Handles the packets until stop is called."""
+        self.running = True
+        self.sock.settimeout(0.1)
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            hdr = struct.unpack_from(">I", data)[0] if len(data) >= 4 else 0
+            pid = (hdr >> 8) & 0xffff
+            if self.drop and self.drop("request", pid):
+                continue
+            resp = self.handle(data)
+            if resp is None:
+                continue
+            if self.drop and self.drop("response", pid):
+                continue
+            self.sock.sendto(resp, addr)
+
+    def start(self):
+        """Starts the endpoint in the background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("--host", help="Address of the endpoint", default="127.0.0.1")
+    PARSER.add_argument("--port", help="UDP port of the endpoint", type=int, default=50001)
+    PARSER.add_argument("--size", help="Number of registers", type=lambda x: int(x, 0), default=0x10000)
+    PARSER.add_argument("--nbuffers", help="Number of response buffers", type=int, default=16)
+    ARGS = PARSER.parse_args()
+    EP = IPbusEndpoint(ARGS.size, ARGS.host, ARGS.port, ARGS.nbuffers)
+    print("IPbus endpoint listening on " + ARGS.host + ":" + str(EP.port))
+    try:
+        EP.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,421 @@
+"""
+Pure Python implementation of the IPbus 2.0 client over UDP
+(uhal is not needed).
+
+The interface provides the methods expected by the agwb_dca package
+(read, write, readb, writeb, write_masked, writeb_masked, read_block,
+write_block, read_fifo, write_fifo, dispatch), by the agwb package
+(readx, writex, rmw), and read_fifo_into/write_fifo_from used
+for FIFO access with buffers.
+The rmw_sum method executes the RMW-sum transaction.
+
+The scheduled operations are split into transactions (of at most
+255 words), and packed into packets fitting in the MTU of the endpoint.
+Up to the number of response buffers of the endpoint packets
+are sent before waiting for the responses. If the response is not
+received in time, the status of the endpoint is read, and either
+the lost requests are sent again, or the lost response is requested
+with the re-send request.
+
+The IPbusEndpoint class in ipbus_endpoint.py is a local emulated
+endpoint, that may be used for testing.
+
+Example:
+    iface = IPbusUDPInterface("192.168.0.10", 50001)
+    top = agwb.MAIN(iface, 0)
+"""
+import array
+import socket
+import struct
+import sys
+import threading
+
+PROTOCOL_VERSION = 2
+# Packet types
+CONTROL = 0x0
+STATUS = 0x1
+RESEND = 0x2
+# Transaction types
+READ = 0x0
+WRITE = 0x1
+NI_READ = 0x2
+NI_WRITE = 0x3
+RMW_BITS = 0x4
+RMW_SUM = 0x5
+# Info code of the request
+REQUEST = 0xf
+INFO_CODES = {
+    0x1: "bad header",
+    0x4: "bus error on read",
+    0x5: "bus error on write",
+    0x6: "bus timeout on read",
+    0x7: "bus timeout on write",
+}
+# Maximum number of words transferred by a single transaction
+MAX_TRANSACTION_WORDS = 255
+# Number of words of the status packet
+STATUS_WORDS = 16
+# Size of the IP and UDP headers in bytes
+IP_UDP_HEADERS = 28
+# The words are sent in the network (big endian) byte order
+SWAP = sys.byteorder == "little"
+
+def packet_header(pid, ptype):
+    return (PROTOCOL_VERSION << 28) | (pid << 8) | 0xf0 | ptype
+
+def transaction_header(tid, nwords, ttype, info=REQUEST):
+    return (PROTOCOL_VERSION << 28) | ((tid & 0xfff) << 16) | (nwords << 8) | (ttype << 4) | info
+
+def next_packet_id(pid):
+    """Returns the ID of the next packet (the ID 0 is not used
+    for the control packets).
+    """
+    return 1 if pid >= 0xffff else pid + 1
+
+def to_bytes(words):
+    """Converts the array of words to bytes sent in the packet."""
+    if SWAP:
+        words.byteswap()
+    return words.tobytes()
+
+def from_bytes(data):
+    """Converts the bytes received in the packet to the array of words."""
+    words = array.array("I")
+    words.frombytes(data)
+    if SWAP:
+        words.byteswap()
+    return words
+
+class _Result(object):
+    """Result of the scheduled read (or RMW). The read values are returned
+    by calling the object (agwb_dca) or via the val field (agwb).
+    If the read is not dispatched yet, it is dispatched first.
+    """
+
+    __slots__ = ("iface", "words", "left", "single")
+
+    def __init__(self, iface, words, single=False):
+        self.iface = iface
+        # List (or memoryview) filled with the read words
+        self.words = words
+        # Number of words not received yet
+        self.left = len(words)
+        self.single = single
+
+    def __call__(self):
+        if self.left:
+            self.iface.dispatch()
+        if self.single:
+            return self.words[0]
+        return self.words
+
+    @property
+    def val(self):
+        return self()
+
+class IPbusUDPInterface:
+    """Class representing the IPbus 2.0 endpoint accessed via UDP."""
+
+    def __init__(self, host, port=50001, timeout=0.2, retries=5, window=None, max_ops=1024):
+        """
+        Parameters
+        ----------
+        host
+            Address of the endpoint.
+        port
+            UDP port of the endpoint.
+        timeout
+            Time in seconds after which the response is considered lost.
+        retries
+            Maximum number of attempts to recover each lost packet.
+        window
+            Maximum number of packets in flight (by default the number
+            of response buffers reported by the endpoint).
+        max_ops
+            Maximum number of scheduled operations (if it is reached,
+            the operations are dispatched).
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((host, port))
+        self.sock.settimeout(timeout)
+        self.retries = retries
+        self.window = window
+        self.max_ops = max_ops
+        self.rbuf = bytearray(65536)
+        self.lock = threading.RLock()
+        # Scheduled operations: (type, address, count or data, result)
+        self.queue = []
+        self.tid = 0
+        # Set after the status of the endpoint is read
+        self.pid = None
+        self.max_words = None
+        self.rmw_addr = None
+        self.rmw_mask = 0
+        self.rmw_nval = 0
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _status(self, in_flight=None):
+        """Reads the status of the endpoint. Returns the tuple
+        (MTU, number of response buffers, next expected packet ID).
+        The responses to control packets received in the meantime
+        are handled.
+        """
+        request = to_bytes(array.array("I", [packet_header(0, STATUS)] + (STATUS_WORDS - 1) * [0]))
+        for i in range(self.retries + 1):
+            self.sock.send(request)
+            while True:
+                try:
+                    nbytes = self.sock.recv_into(self.rbuf)
+                except socket.timeout:
+                    break
+                hdr = struct.unpack_from(">I", self.rbuf)[0]
+                if (hdr & 0xf) == STATUS and nbytes >= 16:
+                    mtu, nbuf, next_hdr = struct.unpack_from(">3I", self.rbuf, 4)
+                    return mtu, nbuf, (next_hdr >> 8) & 0xffff
+                if (in_flight is not None) and ((hdr & 0xf) == CONTROL):
+                    self._received(memoryview(self.rbuf)[:nbytes], in_flight)
+        raise Exception("No status response from the IPbus endpoint")
+
+    def _connect(self):
+        mtu, nbuf, pid = self._status()
+        self.pid = pid
+        self.max_words = (min(mtu, 1500) - IP_UDP_HEADERS) // 4
+        self.window = min(self.window or nbuf, nbuf) or 1
+
+    def _schedule(self, ttype, addr, arg, result=None):
+        self.queue.append((ttype, addr, arg, result))
+        if len(self.queue) >= self.max_ops:
+            self.dispatch()
+        return result
+
+    def _pack(self):
+        """Splits the scheduled operations into transactions, and packs
+        them into packets. Returns the list of packets (request words,
+        list of transactions). Each transaction is described by the
+        tuple (transaction ID, number of read words, result, offset).
+        """
+        limit = self.max_words
+        chunk = min(MAX_TRANSACTION_WORDS, limit - 3)
+        packets = []
+        state = [None, None, 0]
+
+        def add(ttype, nwords, body, nread, result=None, ofs=0):
+            # Adds the transaction to the current packet (or to the new one)
+            req, trans, nresp = state
+            if (req is None) or (len(req) + 1 + len(body) > limit) or (nresp + 1 + nread > limit):
+                req = array.array("I", [0])
+                trans = []
+                nresp = 1
+                packets.append((req, trans))
+            self.tid = (self.tid + 1) & 0xfff
+            req.append(transaction_header(self.tid, nwords, ttype))
+            req.extend(body)
+            trans.append((self.tid, nread, result, ofs))
+            state[:] = [req, trans, nresp + 1 + nread]
+
+        for ttype, addr, arg, result in self.queue:
+            if ttype in (READ, NI_READ):
+                for start in range(0, arg, chunk):
+                    n = min(chunk, arg - start)
+                    add(ttype, n, [addr + start if ttype == READ else addr], n, result, start)
+            elif ttype in (WRITE, NI_WRITE):
+                for start in range(0, len(arg), chunk):
+                    vals = arg[start:start + chunk]
+                    body = array.array("I", [addr + start if ttype == WRITE else addr])
+                    body.extend(vals)
+                    add(ttype, len(vals), body, 0)
+            elif ttype == RMW_BITS:
+                add(ttype, 1, [addr, arg[0], arg[1]], 1, result)
+            else:
+                add(ttype, 1, [addr, arg[0]], 1, result)
+        self.queue = []
+        return packets
+
+    def _received(self, data, in_flight):
+        """Handles the response to the control packet."""
+        pid = (struct.unpack_from(">I", data)[0] >> 8) & 0xffff
+        entry = in_flight.pop(pid, None)
+        if entry is None:
+            # Duplicated or unexpected response
+            return
+        words = from_bytes(data[4:])
+        pos = 0
+        for tid, nread, result, ofs in entry[1]:
+            if pos >= len(words):
+                raise Exception("Truncated IPbus response in packet " + str(pid))
+            thdr = words[pos]
+            info = thdr & 0xf
+            if info != 0:
+                raise Exception("IPbus transaction " + hex(tid) + " failed: "
+                                + INFO_CODES.get(info, "info code " + hex(info)))
+            if ((thdr >> 16) & 0xfff) != tid:
+                raise Exception("Unexpected IPbus transaction ID " + hex((thdr >> 16) & 0xfff)
+                                + " (expected " + hex(tid) + ")")
+            pos += 1
+            if nread:
+                result.words[ofs:ofs + nread] = words[pos:pos + nread]
+                result.left -= nread
+                pos += nread
+
+    def _recover(self, in_flight):
+        """Recovers the packets, that were not responded in time.
+        The packets already processed by the endpoint (their responses
+        were lost) are re-sent by the endpoint. The packets starting from
+        the one expected by the endpoint (the requests were lost, or
+        dropped as out of order) are sent again.
+        """
+        pid, entry = next(iter(in_flight.items()))
+        entry[2] += 1
+        if entry[2] > self.retries:
+            raise Exception("No response from the IPbus endpoint to packet " + str(pid))
+        expected = self._status(in_flight)[2]
+        processed = expected not in in_flight
+        for pid, (request, trans, tries, idx) in in_flight.items():
+            if pid == expected:
+                processed = False
+            if processed:
+                self.sock.send(struct.pack(">I", packet_header(pid, RESEND)))
+            else:
+                self.sock.send(request)
+
+    def _transfer(self, packets):
+        """Sends the packets (with at most window packets in flight),
+        and handles the responses.
+        """
+        in_flight = {}
+        nsent = 0
+        while (nsent < len(packets)) or in_flight:
+            # The packets are sent only if the response to the oldest
+            # packet in flight stays in the buffers of the endpoint
+            while (nsent < len(packets)) and \
+                    ((not in_flight) or (nsent - next(iter(in_flight.values()))[3] < self.window)):
+                req, trans = packets[nsent]
+                req[0] = packet_header(self.pid, CONTROL)
+                request = to_bytes(req)
+                self.sock.send(request)
+                in_flight[self.pid] = [request, trans, 0, nsent]
+                self.pid = next_packet_id(self.pid)
+                nsent += 1
+            try:
+                nbytes = self.sock.recv_into(self.rbuf)
+            except socket.timeout:
+                self._recover(in_flight)
+                continue
+            if (struct.unpack_from(">I", self.rbuf)[0] & 0xf) == CONTROL:
+                self._received(memoryview(self.rbuf)[:nbytes], in_flight)
+
+    def dispatch(self):
+        with self.lock:
+            if not self.queue:
+                return
+            if self.pid is None:
+                self._connect()
+            self._transfer(self._pack())
+
+    def _check_wbm(self):
+        if (self.rmw_addr is not None):
+            raise Exception("Another operation can't be done when writeb_masked is not completed")
+
+    def read(self, addr):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            return self._schedule(READ, addr, 1, _Result(self, [0], True))()
+
+    def write(self, addr, val):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(WRITE, addr, [val])
+            self.dispatch()
+
+    def readb(self, addr):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            return self._schedule(READ, addr, 1, _Result(self, [0], True))
+
+    def writeb(self, addr, val):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(WRITE, addr, [val])
+
+    readx = readb
+    writex = writeb
+
+    def read_block(self, addr, count):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            return self._schedule(READ, addr, count, _Result(self, count * [0]))()
+
+    def write_block(self, addr, values):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(WRITE, addr, values)
+            self.dispatch()
+
+    def read_fifo(self, addr, count):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            return self._schedule(NI_READ, addr, count, _Result(self, count * [0]))()
+
+    def write_fifo(self, addr, values):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(NI_WRITE, addr, values)
+            self.dispatch()
+
+    def read_fifo_into(self, addr, buf):
+        # The read words are stored directly in buf (memoryview of 32-bit words)
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(NI_READ, addr, len(buf), _Result(self, buf))
+            self.dispatch()
+
+    def write_fifo_from(self, addr, buf):
+        self.write_fifo(addr, buf)
+
+    def write_masked(self, address, mask, value):
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            self._schedule(RMW_BITS, address, (0xffffffff ^ mask, value & mask), _Result(self, [0], True))
+            self.dispatch()
+
+    def writeb_masked(self, address, mask, value, more=False):
+        with self.lock:
+            # Check if another RMW was not completed
+            if (self.rmw_addr is not None) and (address != self.rmw_addr):
+                raise Exception("aggregated writeb_masked must use the same address")
+            if self.rmw_addr is None:
+                self.rmw_addr = address
+                self.rmw_mask = mask
+                self.rmw_nval = value
+            else:
+                self.rmw_mask |= mask
+                self.rmw_nval &= ~mask
+                self.rmw_nval |= (value & mask)
+            if not more:
+                self.rmw_addr = None
+                self._schedule(RMW_BITS, address, (0xffffffff ^ self.rmw_mask, self.rmw_nval & self.rmw_mask),
+                               _Result(self, [0], True))
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # The RMW-bits transaction is executed by the endpoint, so the aggregation
+        # of consecutive rmw operations is not needed
+        if addr is not None:
+            with self.lock:
+                self._check_wbm() # Test for uncompleted writeb_masked
+                self._schedule(RMW_BITS, addr, (0xffffffff ^ mask, val & mask), _Result(self, [0], True))
+
+    def rmw_sum(self, addr, addend):
+        """Adds addend to the register (modulo 2**32), and returns
+        the value of the register before the modification.
+        """
+        with self.lock:
+            self._check_wbm() # Test for uncompleted writeb_masked
+            return self._schedule(RMW_SUM, addr, (addend & 0xffffffff,), _Result(self, [0], True))()
@@ -0,0 +1,185 @@
+"""
+Interface accessing the registers via the memory mapped window
+(e.g. the UIO device, the PCIe BAR resource file, or /dev/mem).
+
+The window is mapped with mmap, and the registers are accessed
+via the memoryview of 32-bit words, so each single read or write
+is a single 32-bit load or store. The address used by agwb is the index
+of the 32-bit word in the window (the byte offset is 4 * address).
+The block transfers (read_block, write_block, read_block_into) copy
+the whole range at once, so they may be done with wider accesses.
+
+All accesses are executed immediately, so the scheduled operations
+(readb, writeb, readx, writex, rmw, writeb_masked) are executed
+in order, and dispatch only finishes the pending writeb_masked.
+The interface provides the methods expected by both the agwb_dca
+and the agwb packages. The results of readb/readx may be called,
+or read via the val field.
+
+The read_block_into method reads the block directly into the buffer
+(e.g. the NumPy uint32 array), and is used by read_all.
+
+A regular file (e.g. in /dev/shm) may be used instead of the device
+for testing.
+
+Example:
+    iface = MmapInterface("/dev/uio0", 0x10000)
+    top = agwb.MAIN(iface, 0)
+    vals = top.LINKS.read_all()
+"""
+import array
+import mmap
+import os
+
+class _Value(object):
+    """Result of the read. The read value is returned
+    by calling the object (agwb_dca) or via the val field (agwb).
+    """
+
+    __slots__ = ("val",)
+
+    def __init__(self, val):
+        self.val = val
+
+    def __call__(self):
+        return self.val
+
+def _words(buf):
+    # Returns the memoryview of buf as the sequence of 32-bit words
+    words = memoryview(buf)
+    if words.format != "I":
+        words = words.cast("B").cast("I")
+    return words
+
+class MmapInterface:
+    """Class representing the memory mapped window with the registers."""
+
+    def __init__(self, path, size=None, offset=0):
+        """
+        Parameters
+        ----------
+        path
+            Path to the device (or file) to be mapped.
+        size
+            Size of the window in bytes (by default the size of the file).
+        offset
+            Offset of the window in the device in bytes (it must be
+            a multiple of mmap.ALLOCATIONGRANULARITY; for the UIO
+            devices it selects the map: N * page size for mapN).
+        """
+        self.fd = os.open(path, os.O_RDWR | os.O_SYNC)
+        try:
+            if size is None:
+                size = os.fstat(self.fd).st_size - offset
+            self.mem = mmap.mmap(self.fd, size, mmap.MAP_SHARED,
+                                 mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+        except Exception:
+            os.close(self.fd)
+            raise
+        self.words = memoryview(self.mem).cast("I")
+        self.rmw_addr = None
+        self.rmw_mask = 0
+        self.rmw_nval = 0
+
+    def close(self):
+        self.words.release()
+        self.mem.close()
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _check_wbm(self):
+        if (self.rmw_addr is not None):
+            raise Exception("Another operation can't be done when writeb_masked is not completed")
+
+    def read(self, addr):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        return self.words[addr]
+
+    def write(self, addr, val):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        self.words[addr] = val
+
+    def readb(self, addr):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        return _Value(self.words[addr])
+
+    writeb = write
+    readx = readb
+    writex = write
+
+    def read_block(self, addr, count):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        return self.words[addr:addr + count].tolist()
+
+    def read_block_into(self, addr, buf):
+        """Reads len(buf) consecutive registers starting from addr into buf
+        (any object supporting the buffer protocol, e.g. the NumPy uint32 array).
+        """
+        self._check_wbm() # Test for uncompleted writeb_masked
+        words = _words(buf)
+        words[:] = self.words[addr:addr + len(words)]
+
+    def write_block(self, addr, values):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        try:
+            words = memoryview(values)
+        except TypeError:
+            words = None
+        if (words is None) or (words.format != "I"):
+            words = memoryview(array.array("I", values))
+        self.words[addr:addr + len(words)] = words
+
+    def read_fifo(self, addr, count):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        words = self.words
+        return [words[addr] for _ in range(count)]
+
+    def write_fifo(self, addr, values):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        words = self.words
+        for val in values:
+            words[addr] = val
+
+    def read_fifo_into(self, addr, buf):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        words = self.words
+        for i in range(len(buf)):
+            buf[i] = words[addr]
+
+    def write_fifo_from(self, addr, buf):
+        self.write_fifo(addr, buf)
+
+    def write_masked(self, address, mask, value):
+        self._check_wbm() # Test for uncompleted writeb_masked
+        words = self.words
+        words[address] = (words[address] & ~mask) | (value & mask)
+
+    def writeb_masked(self, address, mask, value, more=False):
+        # Check if another RMW was not completed
+        if (self.rmw_addr is not None) and (address != self.rmw_addr):
+            raise Exception("aggregated writeb_masked must use the same address")
+        if self.rmw_addr is None:
+            self.rmw_addr = address
+            self.rmw_mask = mask
+            self.rmw_nval = value
+        else:
+            self.rmw_mask |= mask
+            self.rmw_nval &= ~mask
+            self.rmw_nval |= (value & mask)
+        if not more:
+            self.rmw_addr = None
+            self.write_masked(address, self.rmw_mask, self.rmw_nval)
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # The accesses are executed immediately, so the aggregation
+        # of consecutive rmw operations is not needed
+        if addr is not None:
+            self.write_masked(addr, mask, val)
+
+    def dispatch(self):
+        pass
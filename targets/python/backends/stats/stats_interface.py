@@ -0,0 +1,216 @@
+"""
+Interface collecting the statistics of the bus traffic.
+
+It is placed between the classes generated by the agwb
+and any interface (e.g. IPbusInterface, cbus_iface, or custom ones).
+All accesses are passed to the wrapped interface, and for each
+register (address) and operation the number of accesses,
+the total and the maximum latency are recorded.
+The latencies of each operation are also collected in the histogram
+(with bins growing by powers of two).
+The addresses are mapped to register paths with the flat register
+tables (x__regmap) of the generated blocks.
+
+The scheduled operations (readx, writex, rmw, readb, writeb, writeb_masked)
+are only counted, their latency is included in the latency of dispatch.
+
+Example:
+    iface = StatsInterface(IPbusInterface(manager, "dev"))
+    top = agwb.MAIN(iface, 0)
+    iface.add_regmap(top)
+    ...
+    print(iface.summary())
+"""
+import json
+import time
+import types
+
+# Methods of the interface that are optional. The wrapper provides
+# only the methods provided by the wrapped interface, so the agwb
+# code can check if they are available.
+_OPTIONAL = ("readx", "writex", "rmw", "readb", "writeb", "write_masked", "writeb_masked",
+             "read_block", "write_block", "read_block_into", "read_fifo", "write_fifo", "read_fifo_into",
+             "write_fifo_from", "dispatch")
+
+class StatsInterface:
+    """Class collecting the statistics of accesses done via the wrapped interface."""
+
+    def __init__(self, iface, clock=time.perf_counter):
+        """
+        Parameters
+        ----------
+        iface
+            The wrapped interface.
+        clock
+            Function returning the current time in seconds.
+        """
+        self.iface = iface
+        self.clock = clock
+        self.paths = {}
+        self.reset()
+        for name in _OPTIONAL:
+            if hasattr(iface, name):
+                setattr(self, name, types.MethodType(getattr(StatsInterface, "_" + name), self))
+
+    def reset(self):
+        """Clears the collected statistics."""
+        # (operation, address) : [count, total latency, maximum latency]
+        self.stats = {}
+        # operation : {bin: count}
+        self.hist = {}
+        # Number of scheduled operations (not dispatched yet, and dispatched)
+        self.pending = 0
+        self.dispatched = 0
+
+    def add_regmap(self, block, base=None):
+        """Adds the register paths from the flat register table
+        of the block (its instance or class). For the class, the base
+        address must be given.
+        The path of the register (not of its bitfields) is used.
+        """
+        if base is None:
+            base = block.x__base
+        for path, f_i in block.x__regmap.items():
+            addr = base + f_i[0]
+            old = self.paths.get(addr)
+            if (old is None) or (len(path) < len(old)):
+                self.paths[addr] = path
+
+    def path(self, addr):
+        """Returns the path of the register at addr (or its address in hex)."""
+        if addr is None:
+            return "-"
+        return self.paths.get(addr, hex(addr))
+
+    def _count(self, oper, addr, latency=None):
+        st = self.stats.get((oper, addr))
+        if st is None:
+            st = self.stats[(oper, addr)] = [0, 0.0, 0.0]
+        st[0] += 1
+        if latency is not None:
+            st[1] += latency
+            if latency > st[2]:
+                st[2] = latency
+            # Bin n contains latencies from 2**(n-1) to 2**n-1 microseconds
+            hbin = int(latency * 1e6).bit_length()
+            hist = self.hist.setdefault(oper, {})
+            hist[hbin] = hist.get(hbin, 0) + 1
+
+    def _timed(self, oper, addr, func, *args):
+        t_start = self.clock()
+        res = func(*args)
+        self._count(oper, addr, self.clock() - t_start)
+        return res
+
+    def _scheduled(self, oper, addr):
+        self._count(oper, addr)
+        self.pending += 1
+
+    def read(self, addr):
+        return self._timed("read", addr, self.iface.read, addr)
+
+    def write(self, addr, val):
+        return self._timed("write", addr, self.iface.write, addr, val)
+
+    def _read_block(self, addr, count):
+        return self._timed("read_block", addr, self.iface.read_block, addr, count)
+
+    def _write_block(self, addr, values):
+        return self._timed("write_block", addr, self.iface.write_block, addr, values)
+
+    def _read_block_into(self, addr, buf):
+        return self._timed("read_block_into", addr, self.iface.read_block_into, addr, buf)
+
+    def _read_fifo(self, addr, count):
+        return self._timed("read_fifo", addr, self.iface.read_fifo, addr, count)
+
+    def _write_fifo(self, addr, values):
+        return self._timed("write_fifo", addr, self.iface.write_fifo, addr, values)
+
+    def _read_fifo_into(self, addr, buf):
+        return self._timed("read_fifo_into", addr, self.iface.read_fifo_into, addr, buf)
+
+    def _write_fifo_from(self, addr, buf):
+        return self._timed("write_fifo_from", addr, self.iface.write_fifo_from, addr, buf)
+
+    def _write_masked(self, addr, mask, val):
+        return self._timed("write_masked", addr, self.iface.write_masked, addr, mask, val)
+
+    def _readx(self, addr):
+        self._scheduled("readx", addr)
+        return self.iface.readx(addr)
+
+    def _writex(self, addr, val):
+        self._scheduled("writex", addr)
+        return self.iface.writex(addr, val)
+
+    def _rmw(self, addr=None, mask=0, val=0):
+        # rmw without arguments only finalizes the pending rmw
+        if addr is not None:
+            self._scheduled("rmw", addr)
+        return self.iface.rmw(addr, mask, val)
+
+    def _readb(self, addr):
+        self._scheduled("readb", addr)
+        return self.iface.readb(addr)
+
+    def _writeb(self, addr, val):
+        self._scheduled("writeb", addr)
+        return self.iface.writeb(addr, val)
+
+    def _writeb_masked(self, addr, mask, val, more=False):
+        self._scheduled("writeb_masked", addr)
+        return self.iface.writeb_masked(addr, mask, val, more)
+
+    def _dispatch(self):
+        self.dispatched += self.pending
+        self.pending = 0
+        return self._timed("dispatch", None, self.iface.dispatch)
+
+    def top(self, n=10, key="count"):
+        """Returns the list of n (path, operation, count, total latency,
+        maximum latency) tuples with the highest count (key="count"),
+        total latency (key="total") or maximum latency (key="max").
+        """
+        idx = {"count": 0, "total": 1, "max": 2}[key]
+        items = sorted(self.stats.items(), key=lambda item: item[1][idx], reverse=True)
+        return [(self.path(addr), oper, st[0], st[1], st[2]) for (oper, addr), st in items[:n]]
+
+    def per_register(self):
+        """Returns the dictionary {path: {operation: count}}."""
+        res = {}
+        for (oper, addr), st in self.stats.items():
+            res.setdefault(self.path(addr), {})[oper] = st[0]
+        return res
+
+    def summary(self, n=20):
+        """Returns the summary of the statistics as text."""
+        res = "%-40s %-14s %10s %12s %12s\n" % ("register", "operation", "count", "total [ms]", "max [us]")
+        for path, oper, count, total, tmax in self.top(n):
+            res += "%-40s %-14s %10d %12.3f %12.1f\n" % (path, oper, count, total * 1e3, tmax * 1e6)
+        if self.dispatched:
+            ndisp = sum(st[0] for (oper, addr), st in self.stats.items() if oper == "dispatch")
+            res += "\n%d scheduled operations in %d dispatches\n" % (self.dispatched, ndisp)
+        res += "\nLatency histograms (us):\n"
+        for oper, hist in sorted(self.hist.items()):
+            res += oper + ":"
+            for hbin in sorted(hist):
+                lo = 0 if hbin == 0 else 1 << (hbin - 1)
+                res += " [%d-%d):%d" % (lo, 1 << hbin, hist[hbin])
+            res += "\n"
+        return res
+
+    def dump(self, path):
+        """Writes the collected statistics to the JSON file."""
+        data = {
+            "stats": [
+                {"path": self.path(addr), "address": addr, "operation": oper,
+                 "count": st[0], "total": st[1], "max": st[2]}
+                for (oper, addr), st in self.stats.items()
+            ],
+            "histograms": {oper: {str(hbin): cnt for hbin, cnt in hist.items()}
+                           for oper, hist in self.hist.items()},
+            "dispatched": self.dispatched,
+        }
+        with open(path, "w") as f_o:
+            json.dump(data, f_o, indent=1)
@@ -0,0 +1,422 @@
+"""@package docstring
+Documentation for agwb_common.py module
+
+The agwb_common.py module contains the parts of the agwb.py module
+that don't depend on the flavour of the access methods (agwb, agwb_dca
+or agwb_async): the shadow cache, the bitfield descriptions, the base
+classes of vectors and blocks (caching of the created objects, flat
+register tables and lookup), and the descriptors used by the classes
+generated with the --python_props option.
+The generator copies it to the generated package together with
+the agwb.py module of the selected flavour, which imports it.
+
+The classes of the flavour used to create the handles are given
+by the x__vector and x__bf_access class fields of the Block
+and register classes, and by the register class fields of the Block
+class (see _BlockBase).
+"""
+import re
+from collections import OrderedDict
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Names imported by the agwb.py module of each flavour
+__all__ = ["_shadows", "invalidate_shadow", "_words", "_fifo_range", "BitField", "_VectorBase",
+           "FieldProperty", "BitFieldProperty", "_PATH_ITEM", "_FlatTable", "_BlockBase"]
+
+# Shadow copies of the control registers, for the interfaces
+# with enabled shadow cache {iface: {address: value}}
+_shadows = {}
+
+def invalidate_shadow(iface=None):
+    """Invalidates the shadow copies of all registers accessed
+    via iface (or via all interfaces, if iface is None).
+    """
+    if iface is None:
+        for shadow in _shadows.values():
+            shadow.clear()
+    elif iface in _shadows:
+        _shadows[iface].clear()
+
+def _words(buf):
+    """Returns the memoryview of buf (any object supporting the buffer
+    protocol, e.g. bytearray, array.array or NumPy array) as the sequence
+    of 32-bit words.
+    """
+    words = memoryview(buf)
+    if words.format != "I":
+        words = words.cast("B").cast("I")
+    return words
+
+def _fifo_range(words, count, chunk):
+    """Returns the ranges of words (start, end) transferred in each
+    transfer of count values (at most chunk values per transfer).
+    """
+    if count is None:
+        count = len(words)
+    elif count > len(words):
+        raise Exception("Buffer too small: " + str(len(words)) + " words for " + str(count) + " values")
+    step = chunk or count or 1
+    return [(start, min(start + step, count)) for start in range(0, count, step)]
+
+class BitField(object):
+    """Class delivering an object used to describe the bitfield.
+
+    Its fields contain certain precalculated values supporting quick
+    handling of read and write access to the field.
+    That class does not provide any methods.
+    Only fields are used.
+    The trigger fields are always read as zero (they are never
+    taken from the shadow cache).
+    """
+
+    __slots__ = ("lsb", "msb", "sign_mask", "vmin", "vmax", "mask", "trigger")
+
+    def __init__(self, msb:int, lsb:int, is_signed:bool, trigger:bool=False) -> None:
+        self.lsb = lsb
+        self.trigger = trigger
+        self.msb = msb
+        if is_signed:
+            self.sign_mask = 1 << (msb - lsb)
+            self.vmin = -self.sign_mask
+            self.vmax = self.sign_mask - 1
+        else:
+            self.vmin = 0
+            self.vmax = (1 << (msb - lsb + 1)) - 1
+            self.sign_mask = 0
+        self.mask = ((1 << (msb + 1)) - 1) ^ ((1 << lsb) - 1)
+
+class _VectorBase(object):
+    """Class describing the vector of registers or subblocks.
+
+    It provides only a __getitem__ method that allows to access the particular object
+    in a vector (the object is created on the fly, when it is needed).
+    The created objects are cached, so the next access to the same item
+    returns the same object. If the cache size of the vector is not None,
+    only that number of recently used items is kept (that may be needed
+    for huge vectors). The cache size is taken from the cache_size class
+    attribute when the vector is created, and may be changed for the particular
+    vector with set_cache_size.
+    """
+
+    __slots__ = ("iface", "base", "mclass", "args", "nitems", "cache", "limit")
+
+    # Default cache size of the created vectors
+    cache_size = None
+
+    def __init__(self, iface, base, nitems, margs):
+        self.iface = iface
+        self.base = base
+        self.mclass = margs[0]
+        # Additional arguments of the constructor
+        self.args = margs[1:]
+        self.nitems = nitems
+        self.cache = {}
+        self.set_cache_size(self.cache_size)
+
+    def set_cache_size(self, size):
+        """ Sets the maximum number of cached items of the vector
+            (None means no limit).
+        """
+        self.limit = size
+        if size is None:
+            self.cache = dict(self.cache)
+        else:
+            self.cache = OrderedDict(self.cache)
+            while len(self.cache) > size:
+                # Drop the least recently used item
+                self.cache.popitem(last=False)
+
+    def __getitem__(self, key):
+        if isinstance(key,slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key = self.nitems + key
+        if key >= self.nitems:
+            raise IndexError
+        try:
+            item = self.cache[key]
+            if self.limit is not None:
+                self.cache.move_to_end(key)
+            return item
+        except KeyError:
+            pass
+        item = self.mclass(self.iface, self.base + key * self.mclass.x__size, *self.args)
+        self.cache[key] = item
+        if (self.limit is not None) and (len(self.cache) > self.limit):
+            # Drop the least recently used item
+            self.cache.popitem(last=False)
+        return item
+
+    def __len__(self):
+        return self.nitems
+
+    def _reg_range(self, key):
+        # Check if bulk access is possible, and return the range of selected items
+        if np is None:
+            raise Exception("Bulk access to the vector requires NumPy")
+        if issubclass(self.mclass, _BlockBase):
+            raise Exception("Bulk access is possible only for vectors of registers")
+        return range(*key.indices(self.nitems))
+
+def _inherited(owner, name):
+    """Returns True if name is defined in any base class of owner."""
+    return any(name in vars(base) for base in owner.__mro__[1:])
+
+class FieldProperty(object):
+    """Descriptor providing access to the subblock, vector or register
+    of the block, used in the classes generated with the --python_props
+    option. The object is described by the x__fields entry of the block,
+    that is unpacked once, when the class is created.
+    The created handle is also stored in the instance dictionary,
+    so the next accesses are plain attribute accesses.
+    """
+
+    __slots__ = ("name", "ofs", "nitems", "margs")
+
+    def __set_name__(self, owner, name):
+        if _inherited(owner, name):
+            # The methods of the base class can't be hidden
+            # (the object is available via lookup, like in the default classes)
+            delattr(owner, name)
+            return
+        self.name = name
+        f_i = owner.x__fields[name]
+        if len(f_i) == 3:
+            self.ofs, self.nitems, self.margs = f_i
+        else:
+            self.ofs, self.margs = f_i
+            self.nitems = None
+
+    def __get__(self, block, cls=None):
+        if block is None:
+            return self
+        handles = block.x__handles
+        handle = handles.get(self.name)
+        if handle is None:
+            if self.nitems is not None:
+                handle = block.x__vector(block.x__iface, block.x__base + self.ofs, self.nitems, self.margs)
+            else:
+                handle = self.margs[0](block.x__iface, block.x__base + self.ofs, *self.margs[1:])
+            handles[self.name] = handle
+        block.__dict__[self.name] = handle
+        return handle
+
+class BitFieldProperty(BitField):
+    """BitField used as the descriptor in the register classes generated
+    with the --python_props option. The created bitfield handle is stored
+    in the instance dictionary of the register.
+    """
+
+    __slots__ = ("name",)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if _inherited(owner, name):
+            delattr(owner, name)
+
+    def __get__(self, reg, cls=None):
+        if reg is None:
+            return self
+        handle = reg.x__bf_handles.get(self.name)
+        if handle is None:
+            handle = reg.x__bf_access(reg.x__iface, reg.x__base, self, reg.x__cacheable, reg.x__mwr)
+            reg.x__bf_handles[self.name] = handle
+        reg.__dict__[self.name] = handle
+        return handle
+
+# Regular expression splitting the path into names and indices
+_PATH_ITEM = re.compile(r"([^.\[\]]+)|\[(-?[0-9]+)\]")
+
+class _FlatTable(object):
+    """Descriptor of the flat tables of the block class: the register
+    table (x__regmap) and the addresses of the FIFO registers (x__fifo).
+    The generated classes contain only the tables of their own registers
+    (x__local_regmap, x__local_fifo). The flat tables are built from them
+    and from the flat tables of the subblocks on the first access,
+    and stored in the class.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner):
+        regmap = dict(owner.x__local_regmap)
+        fifo = set(owner.x__local_fifo)
+        for name, f_i in owner.x__fields.items():
+            if len(f_i) == 3:
+                names = [name + "[" + str(i) + "]" for i in range(f_i[1])]
+            else:
+                names = [name]
+            sub = f_i[-1][0]
+            # Blackboxes have no register tables
+            if not issubclass(sub, _BlockBase) or sub.x__is_blackbox:
+                continue
+            for i, prefix in enumerate(names):
+                base = f_i[0] + i * sub.x__size
+                for path, f_r in sub.x__regmap.items():
+                    regmap[prefix + "." + path] = (base + f_r[0],) + f_r[1:]
+                fifo.update(base + adr for adr in sub.x__fifo)
+        tables = {"x__regmap": regmap, "x__fifo": frozenset(fifo)}
+        # The tables are not stored in the Block class, and don't replace
+        # the tables defined explicitly in the class
+        for name, table in tables.items():
+            if name not in vars(owner):
+                setattr(owner, name, table)
+        return tables[self.name]
+
+class _BlockBase(object):
+    """Base class of the blocks handled by addr_gen_wb-generated code
+    (of the Block class of each flavour).
+
+    The Python backend generates derived classes, with class fields
+    corresponding to subblocks or registers.
+    The x__regmap class field contains the flat register table
+    of the block and its subblocks:
+    'path':(address, mask, lsb, signed, permission, trigger)
+    used by the lookup method. For control registers of blocks
+    with the masked write, the size of the masked write window
+    is appended to the entry.
+    The x__fifo class field contains the set of relative addresses of
+    the FIFO registers (never cached, and not merged by Planner).
+    Both are built on the first access from the tables of the block
+    (x__local_regmap, x__local_fifo) and of its subblocks.
+    """
+
+    __slots__ = ()
+
+    x__is_blackbox:bool = False
+    x__size:int = 1
+    x__fields:dict = {}
+    x__local_regmap:dict = {}
+    x__local_fifo:frozenset = frozenset()
+    # The flat tables (_FlatTable descriptors) and the classes
+    # of the flavour used to create the handles are set in the Block class
+    # of the agwb.py module
+    x__vector = None
+    x__bf_access = None
+    x__status_register = None
+    x__register = None
+    x__control_register = None
+
+    def __dir__(self):
+        return self.x__fields.keys()
+
+    def __getattr__(self, name):
+        # The created subblocks, vectors and registers are cached
+        # (together with the handles created by lookup)
+        handles = object.__getattribute__(self, "x__handles")
+        try:
+            return handles[name]
+        except KeyError:
+            pass
+        try:
+            f_i = self.x__fields[name]
+        except KeyError as ke:
+            return object.__getattribute__(self,name)
+        if len(f_i) == 3:
+            handle = self.x__vector(self.x__iface, self.x__base + f_i[0], f_i[1], f_i[2])
+        elif len(f_i[1]) == 1:
+            handle = f_i[1][0](self.x__iface, self.x__base + f_i[0])
+        else:
+            # pass addititional arguments to the constructor
+            handle = f_i[1][0](self.x__iface, self.x__base + f_i[0], *f_i[1][1:])
+        handles[name] = handle
+        return handle
+
+    @classmethod
+    def _regmap_bfields(cls):
+        """Returns the bitfields from the flat register table grouped
+        by the path of their register. They are created once per class.
+        """
+        bfs = cls.__dict__.get("x__regmap_bf")
+        if bfs is None:
+            bfs = {}
+            for path, f_i in cls.x__regmap.items():
+                rpath, _, name = path.rpartition(".")
+                if rpath in cls.x__regmap:
+                    bfs.setdefault(rpath, {})[name] = BitField(f_i[1].bit_length() - 1, f_i[2], f_i[3], f_i[5])
+            cls.x__regmap_bf = bfs
+        return bfs
+
+    def lookup(self, path):
+        """Returns the handle of the object described by the path
+        (e.g. "LINKS[3].CTRL.START").
+
+        Registers and bitfields are created directly from the flat register
+        table. Other objects (subblocks, vectors, blackboxes) are found by
+        walking the hierarchy. The created handle is cached, so the next
+        lookup of the same path is just a dictionary access.
+        """
+        try:
+            return self.x__handles[path]
+        except KeyError:
+            pass
+        f_i = self.x__regmap.get(path)
+        if f_i is not None:
+            bfs = self._regmap_bfields()
+            rpath, _, name = path.rpartition(".")
+            mwr = f_i[6] if len(f_i) > 6 else 0
+            if rpath in bfs and name in bfs[rpath]:
+                handle = self.x__bf_access(self.x__iface, self.x__base + f_i[0], bfs[rpath][name],
+                                           (f_i[4] != "r") and (f_i[0] not in self.x__fifo), mwr)
+            elif f_i[4] == "r":
+                handle = self.x__status_register(self.x__iface, self.x__base + f_i[0], bfs.get(path, {}))
+            elif f_i[0] in self.x__fifo:
+                handle = self.x__register(self.x__iface, self.x__base + f_i[0], bfs.get(path, {}))
+            else:
+                handle = self.x__control_register(self.x__iface, self.x__base + f_i[0], bfs.get(path, {}), mwr,
+                                                  f_i[1])
+        else:
+            handle = self
+            for name, idx in _PATH_ITEM.findall(path):
+                if name:
+                    handle = getattr(handle, name)
+                else:
+                    handle = handle[int(idx)]
+        self.x__handles[path] = handle
+        return handle
+
+    @classmethod
+    def _id_ver_regs(cls, base, path, res, vectors=False):
+        """Appends the descriptions (path, class, address, expected value, name)
+        of ID and VER registers of the block located at base and of all its
+        subblocks (and vectors of subblocks, if vectors is True) to the res list.
+        Only the generated tables are used, no handles are created.
+        """
+        for name, f_i in cls.x__fields.items():
+            if len(f_i) == 3:
+                sub = f_i[2][0]
+                if vectors and issubclass(sub, _BlockBase):
+                    for i in range(f_i[1]):
+                        sub._id_ver_regs(base + f_i[0] + i * sub.x__size, path + name + "[" + str(i) + "].",
+                                         res, vectors)
+            elif issubclass(f_i[1][0], _BlockBase):
+                f_i[1][0]._id_ver_regs(base + f_i[0], path + name + ".", res, vectors)
+        if cls.x__is_blackbox == False:
+            res.append((path, cls, base + cls.x__fields["ID"][0], cls.x__id, "ID"))
+            res.append((path, cls, base + cls.x__fields["VER"][0], cls.x__ver, "VER"))
+
+    def enable_shadow(self):
+        """Enables the shadow cache of the control registers.
+        The cache is enabled for the interface of the block,
+        so it is used by all blocks accessed via that interface.
+        """
+        _shadows.setdefault(self.x__iface, {})
+
+    def disable_shadow(self):
+        """Disables the shadow cache for the interface of the block."""
+        _shadows.pop(self.x__iface, None)
+
+    def invalidate_shadow(self):
+        """Invalidates the shadow copies of the registers of the block
+        (and of its subblocks). It should be used when the registers
+        could be modified by another master, or reset by the hardware.
+        """
+        shadow = _shadows.get(self.x__iface)
+        if shadow:
+            end = self.x__base + self.x__size
+            for adr in [adr for adr in shadow if self.x__base <= adr < end]:
+                del shadow[adr]
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""
+Benchmark measuring the time of each phase of the addr_gen_wb.py
+generation for a synthetic design (see synth_sysdef.py).
+
+The phases (include expansion, parsing, DTD validation, construction
+of WbBlock objects, analyze and each gen_* backend) are run in-process,
+in the same order as in addr_gen_wb.py.
+The minimum time of each phase over all repetitions is stored
+in the JSON file, so the results of different versions may be compared.
+With --compare the results are compared with the earlier stored ones,
+and the script exits with code 1 if any phase is slower than allowed.
+
+Usage: gen_phases.py [shape options of synth_sysdef.py] [--repeat 3]
+                     [--output results.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "../../src")
+sys.path.insert(0, SRC_DIR)
+
+from lxml import etree as let
+import wb_block as wb
+import include
+import incremental as inc
+import expressions as ex
+from synth_sysdef import synth
+
+PHASES = ["includes", "parse", "validate", "construct", "analyze",
+          "gen_amap_xml", "gen_vhdl", "gen_python", "gen_ipbus_xml",
+          "gen_c_header", "gen_forth", "gen_html"]
+
+def run_once(top_path, outdir):
+    """ Runs all phases of the generation, and returns their times """
+    # Reset the global state of the generator modules
+    wb.GLB = wb.GlobalVars()
+    wb.created_files["vhdl"] = []
+    del inc.written_files[:]
+    del inc.changed_files[:]
+    for attr in ("VHDL_PATH", "AMAPXML_PATH", "IPBUS_PATH", "C_HEADER_PATH"):
+        setattr(wb.GLB, attr, outdir)
+    times = {}
+    t_start = time.perf_counter()
+    def phase(name):
+        nonlocal t_start
+        t_now = time.perf_counter()
+        times[name] = t_now - t_start
+        t_start = t_now
+
+    final_xml, lines_origin = include.handle_includes(top_path)
+    wb.GLB.VER_ID = zlib.crc32(bytes(final_xml.encode("utf-8")))
+    phase("includes")
+    el_root = let.fromstring(final_xml.encode("utf-8"))
+    phase("parse")
+    dtd = let.DTD(os.path.join(SRC_DIR, "agwb.dtd"))
+    if not dtd.validate(el_root):
+        raise Exception(str(dtd.error_log))
+    phase("validate")
+    top_name = el_root.attrib["top"]
+    wb.GLB.TOP_NAME = top_name
+    for el in el_root.findall("constant"):
+        ex.addval(el.attrib["name"], el.attrib["val"])
+    for el in el_root.findall("block"):
+        wb.blocks()[el.attrib["name"]] = wb.WbBlock(el)
+    phase("construct")
+    top = wb.blocks()[top_name]
+    top.analyze()
+    phase("analyze")
+    variants = [None,]
+    if wb.GLB.variants > 1:
+        variants += range(0, wb.GLB.variants)
+    used = [bl for bl in wb.blocks().values() if bl.used]
+    for nvar in variants:
+        for bl in used:
+            bl.gen_amap_xml(nvar)
+    phase("gen_amap_xml")
+    for bl in used:
+        bl.gen_vhdl()
+    phase("gen_vhdl")
+    for nvar in variants:
+        "".join(str(bl.gen_python(nvar)) for bl in used)
+    phase("gen_python")
+    for bl in used:
+        bl.gen_ipbus_xml()
+    phase("gen_ipbus_xml")
+    for bl in used:
+        bl.gen_c_header()
+    phase("gen_c_header")
+    str(top.gen_forth("//"))
+    phase("gen_forth")
+    str(top.gen_html(0, ""))
+    phase("gen_html")
+    return times
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("--depth", help="Depth of subblock nesting", type=int, default=2)
+    PARSER.add_argument("--reps", help="Number of repetitions of subblocks", type=int, default=8)
+    PARSER.add_argument("--regs", help="Number of registers in each block", type=int, default=200)
+    PARSER.add_argument("--fields", help="Number of bitfields in each register", type=int, default=4)
+    PARSER.add_argument("--variants", help="Number of variants", type=int, default=1)
+    PARSER.add_argument("--includes", help="Number of included files", type=int, default=1)
+    PARSER.add_argument("--repeat", help="Number of repetitions of the measurement", type=int, default=3)
+    PARSER.add_argument("--output", help="JSON file for the results", default="")
+    PARSER.add_argument("--compare", help="JSON file with the baseline results", default="")
+    PARSER.add_argument("--tolerance", help="Allowed relative slowdown of each phase", type=float, default=0.2)
+    ARGS = PARSER.parse_args()
+    CONFIG = {k: getattr(ARGS, k) for k in ("depth", "reps", "regs", "fields", "variants", "includes")}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        TOP, NREGS = synth(os.path.join(tmp, "xml"), **CONFIG)
+        OUTDIR = os.path.join(tmp, "gen")
+        os.makedirs(OUTDIR)
+        BEST = {}
+        for i in range(ARGS.repeat):
+            for name, t_phase in run_once(TOP, OUTDIR).items():
+                BEST[name] = min(BEST.get(name, t_phase), t_phase)
+
+    RESULTS = {
+        "config": CONFIG,
+        "registers": NREGS,
+        "python": platform.python_version(),
+        "phases": {name: BEST[name] for name in PHASES},
+        "total": sum(BEST.values()),
+    }
+    print("%-15s %10s" % ("phase", "time [s]"))
+    for name in PHASES:
+        print("%-15s %10.4f" % (name, BEST[name]))
+    print("%-15s %10.4f (%d registers)" % ("total", RESULTS["total"], NREGS))
+    if ARGS.output:
+        with open(ARGS.output, "w") as f_o:
+            json.dump(RESULTS, f_o, indent=1)
+    if ARGS.compare:
+        with open(ARGS.compare) as f_i:
+            BASE = json.load(f_i)
+        if BASE["config"] != CONFIG:
+            print("Warning: the baseline was measured for a different design: " + str(BASE["config"]))
+        FAILED = False
+        for name in PHASES:
+            t_base = BASE["phases"].get(name)
+            if t_base and BEST[name] > t_base * (1 + ARGS.tolerance):
+                print("Regression in %s: %.4f s (baseline %.4f s)" % (name, BEST[name], t_base))
+                FAILED = True
+        if FAILED:
+            sys.exit(1)
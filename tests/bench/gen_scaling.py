@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Benchmark checking how the generation time scales with the number
+of registers in the design.
+
+The synthetic design contains blocks with many registers (each one
+with a few bitfields). The generator is run with all backends for
+increasing number of registers, and the time per register is reported.
+For linear scaling it should be (roughly) constant.
+
+Usage: gen_scaling.py [--sizes 1250,2500,5000,10000,20000] [--regs-per-block 500] [--jobs 1]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+AGWB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src/addr_gen_wb.py")
+
+def synth_xml(nregs, regs_per_block):
+    """ Returns the XML describing the design with about nregs registers
+        (whole blocks of regs_per_block registers, at least one block),
+        and the actual number of registers in it
+    """
+    nblocks = max(1, nregs // regs_per_block)
+    res = '<sysdef top="MAIN">\n'
+    for b in range(nblocks):
+        res += '<block name="B' + str(b) + '">\n'
+        for r in range(regs_per_block):
+            tag = "creg" if r % 2 else "sreg"
+            res += '  <' + tag + ' name="R' + str(r) + '" desc="Register ' + str(r) + '">\n'
+            res += '    <field name="F0" width="8"/>\n'
+            res += '    <field name="F1" width="4" type="signed"/>\n'
+            res += '    <field name="F2" width="1"/>\n'
+            res += '  </' + tag + '>\n'
+        res += '</block>\n'
+    res += '<block name="MAIN">\n'
+    for b in range(nblocks):
+        res += '  <subblock name="S' + str(b) + '" type="B' + str(b) + '"/>\n'
+    res += '</block>\n</sysdef>\n'
+    return res, nblocks * regs_per_block
+
+def run(nregs, regs_per_block, jobs):
+    """ Returns the actual number of registers and the generation time """
+    xml, nregs = synth_xml(nregs, regs_per_block)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "top.xml"), "w") as f_o:
+            f_o.write(xml)
+        args = [sys.executable, AGWB, "--infile", "top.xml",
+                "--hdl", "gen", "--amapxml", "gen", "--ipbus", "gen", "--header", "gen",
+                "--fs", "gen", "--python", "gen", "--html", "gen", "--jobs", str(jobs)]
+        t_start = time.perf_counter()
+        subprocess.run(args, cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        return nregs, time.perf_counter() - t_start
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("--sizes", help="Numbers of registers", default="1250,2500,5000,10000,20000")
+    PARSER.add_argument("--regs-per-block", help="Number of registers in each block", type=int, default=500)
+    PARSER.add_argument("--jobs", help="Number of parallel generation processes", type=int, default=1)
+    ARGS = PARSER.parse_args()
+    print("%10s %10s %15s" % ("registers", "time [s]", "us/register"))
+    for nregs in [int(n) for n in ARGS.sizes.split(",")]:
+        nregs, t_gen = run(nregs, ARGS.regs_per_block, ARGS.jobs)
+        print("%10d %10.2f %15.1f" % (nregs, t_gen, 1e6 * t_gen / nregs))
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Benchmark of the pure Python IPbus 2.0 UDP client (IPbusUDPInterface).
+
+The emulated endpoint (ipbus_endpoint.py) is started in a separate
+process (or the endpoint given with --host and --port is used).
+The following operations are measured:
+ * single reads and writes (each is a separate round trip),
+ * scheduled reads and writes dispatched in batches of --batch operations,
+ * block reads and writes of --block words.
+For each operation the number of words per second is reported
+(the best of --repeat measurements).
+With --loss, the given fraction of packets is dropped by the endpoint
+(only for the locally started endpoint).
+
+Usage: ipbus_udp.py [-n 2000] [--batch 200] [--block 65536] [--repeat 3] [--loss 0.0]
+                    [--host 127.0.0.1 --port 50001] [--output results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "../../targets/python/backends/ipbus_udp"))
+from ipbus_udp_interface import IPbusUDPInterface
+from ipbus_endpoint import IPbusEndpoint
+
+def run_endpoint(port, loss, size):
+    rnd = random.Random(0)
+    drop = (lambda kind, pid: rnd.random() < loss) if loss else None
+    ep = IPbusEndpoint(size, port=port.value, drop=drop)
+    port.value = ep.port
+    ep.serve_forever()
+
+def measure(func, words, repeat):
+    best = None
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        t_el = time.perf_counter() - t_start
+        best = t_el if best is None else min(best, t_el)
+    return words / best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000, help="Number of single operations")
+    parser.add_argument("--batch", type=int, default=200, help="Number of operations in the batch")
+    parser.add_argument("--block", type=int, default=65536, help="Number of words in the block")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of dropped packets")
+    parser.add_argument("--host", default=None, help="Address of the endpoint (default: started locally)")
+    parser.add_argument("--port", type=int, default=50001)
+    parser.add_argument("--output", default=None, help="JSON file with the results")
+    args = parser.parse_args()
+
+    proc = None
+    host, port = args.host, args.port
+    if host is None:
+        host = "127.0.0.1"
+        shared = multiprocessing.Value("i", 0)
+        proc = multiprocessing.Process(target=run_endpoint, args=(shared, args.loss, args.block + 16),
+                                       daemon=True)
+        proc.start()
+        while shared.value == 0:
+            time.sleep(0.01)
+        port = shared.value
+    iface = IPbusUDPInterface(host, port, timeout=0.05, retries=50)
+    data = list(range(args.block))
+
+    def single_read():
+        for i in range(args.n):
+            iface.read(i & 0xf)
+
+    def single_write():
+        for i in range(args.n):
+            iface.write(i & 0xf, i)
+
+    def batch_read():
+        for start in range(0, args.n, args.batch):
+            for i in range(args.batch):
+                iface.readb(i & 0xf)
+            iface.dispatch()
+
+    def batch_write():
+        for start in range(0, args.n, args.batch):
+            for i in range(args.batch):
+                iface.writeb(i & 0xf, i)
+            iface.dispatch()
+
+    def block_read():
+        iface.read_block(16, args.block)
+
+    def block_write():
+        iface.write_block(16, data)
+
+    results = {}
+    for name, func, words in (("single read", single_read, args.n),
+                              ("single write", single_write, args.n),
+                              ("batch read", batch_read, args.n),
+                              ("batch write", batch_write, args.n),
+                              ("block read", block_read, args.block),
+                              ("block write", block_write, args.block)):
+        results[name] = measure(func, words, args.repeat)
+        print("%-14s %12.0f words/s" % (name, results[name]))
+    iface.close()
+    if proc is not None:
+        proc.terminate()
+    if args.output:
+        with open(args.output, "w") as f_o:
+            json.dump({"python": platform.python_version(), "loss": args.loss,
+                       "results": results}, f_o, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/python3
+"""
+Benchmark measuring the per-access overhead of the Python API
+(the agwb and agwb_dca flavours).
+
+The classes are built like the ones generated by addr_gen_wb.py
+(similar to the c1/c2/regs demo in agwb.py): the top block contains
+a vector of middle blocks, each with a vector of leaf blocks.
+They are used with the zero-latency in-memory interface, so only
+the overhead of the Python code is measured.
+For each operation the number of operations per second is reported
+(the best of --repeat measurements).
+
+With --props also the classes with properties (like the ones generated
+with the --python_props option) are measured.
+
+Usage: runtime_access.py [--flavour agwb,agwb_dca] [-n 100000] [--repeat 3] [--props]
+                         [--output results.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../targets/python"))
+
+class _Future(object):
+    """ Result of the scheduled read. It supports both the "val" field
+    (agwb flavour) and calling (agwb_dca flavour).
+    """
+    __slots__ = ("iface", "done", "value")
+
+    def __init__(self, iface):
+        self.iface = iface
+        self.done = False
+        self.value = None
+
+    @property
+    def val(self):
+        if not self.done:
+            self.iface.dispatch()
+        return self.value
+
+    def __call__(self):
+        return self.val
+
+class MemIface(object):
+    """ Zero-latency interface with the register file in memory.
+    It provides the extended methods of both flavours.
+    The scheduled operations are executed in order by dispatch.
+    """
+
+    def __init__(self, size):
+        self.rf = size * [0]
+        self.opers = []
+
+    def read(self, addr):
+        if self.opers:
+            self.dispatch()
+        return self.rf[addr]
+
+    def write(self, addr, val):
+        if self.opers:
+            self.dispatch()
+        self.rf[addr] = val
+
+    def readx(self, addr):
+        fut = _Future(self)
+        self.opers.append((0, addr, fut, 0))
+        return fut
+
+    def writex(self, addr, val):
+        self.opers.append((1, addr, val, 0))
+
+    def rmw(self, addr=None, mask=0, val=0):
+        # The aggregation of RMWs is not needed, as the operations
+        # are executed in order
+        if addr is not None:
+            self.opers.append((2, addr, val, mask))
+
+    def write_masked(self, addr, mask, val):
+        self.rmw(addr, mask, val)
+        self.dispatch()
+
+    def writeb_masked(self, addr, mask, val, more=False):
+        self.rmw(addr, mask, val)
+
+    readb = readx
+    writeb = writex
+
+    def dispatch(self):
+        rf = self.rf
+        for op, addr, arg, mask in self.opers:
+            if op == 0:
+                arg.value = rf[addr]
+                arg.done = True
+            elif op == 1:
+                rf[addr] = arg
+            else:
+                rf[addr] = (rf[addr] & ~mask) | (arg & mask)
+        self.opers = []
+
+def build_classes(agwb, props=False):
+    """ Returns the top block class built with the given agwb flavour.
+    If props is True, the classes are built like the ones generated
+    with the --python_props option.
+    """
+
+    def props_class(cls):
+        # Returns the class derived from cls, with the fields of cls as properties
+        if not props:
+            return cls
+        attrs = {name: agwb.FieldProperty() for name in cls.x__fields}
+        return type(cls.__name__, (cls,), attrs)
+
+    class LEAF_CTRL(agwb.ControlRegister):
+        START = agwb.BitFieldProperty(0, 0, False)
+        MODE = agwb.BitFieldProperty(4, 1, False)
+        OFS = agwb.BitFieldProperty(15, 8, True)
+        x__props = {"START": START, "MODE": MODE, "OFS": OFS}
+
+    class LEAF_STAT(agwb.StatusRegister):
+        BUSY = agwb.BitFieldProperty(0, 0, False)
+        x__props = {"BUSY": BUSY}
+
+    if props:
+        CTRL = (LEAF_CTRL, LEAF_CTRL.x__props)
+        STAT = (LEAF_STAT, LEAF_STAT.x__props)
+    else:
+        CTRL = (agwb.ControlRegister, {
+            "START": agwb.BitField(0, 0, False),
+            "MODE": agwb.BitField(4, 1, False),
+            "OFS": agwb.BitField(15, 8, True),
+        })
+        STAT = (agwb.StatusRegister, {"BUSY": agwb.BitField(0, 0, False)})
+
+    class LEAF(agwb.Block):
+        __slots__ = ()
+        x__size = 8
+        x__id = 0x1
+        x__ver = 0x2
+        x__fields = {
+            "ID": (0x0, (agwb.StatusRegister,)),
+            "VER": (0x1, (agwb.StatusRegister,)),
+            "CTRL": (0x2, CTRL),
+            "STAT": (0x3, STAT),
+            "REGS": (0x4, 4, (agwb.ControlRegister,)),
+        }
+    LEAF = props_class(LEAF)
+
+    class MID(agwb.Block):
+        __slots__ = ()
+        x__size = 0x40
+        x__fields = {
+            "CFG": (0x0, (agwb.ControlRegister,)),
+            "SUB": (0x8, 4, (LEAF,)),
+        }
+    MID = props_class(MID)
+
+    class TOP(agwb.Block):
+        __slots__ = ()
+        x__size = 0x400
+        x__fields = {
+            "CFG": (0x0, (agwb.ControlRegister,)),
+            "LINKS": (0x40, 8, (MID,)),
+        }
+    TOP = props_class(TOP)
+
+    # Flat register table of the top block (as generated)
+    def regmap(cls, base, path, res):
+        if issubclass(cls[0], agwb.Block):
+            for name, f_i in cls[0].x__fields.items():
+                if len(f_i) == 3:
+                    for i in range(f_i[1]):
+                        regmap(f_i[2], base + f_i[0] + i * f_i[2][0].x__size,
+                               path + "." + name + "[" + str(i) + "]", res)
+                else:
+                    regmap(f_i[1], base + f_i[0], path + "." + name, res)
+            return res
+        perm = "r" if issubclass(cls[0], agwb.StatusRegister) else "rw"
+        res[path[1:]] = (base, 0xffffffff, 0, False, perm, False)
+        if len(cls) > 1:
+            for name, bf in cls[1].items():
+                res[path[1:] + "." + name] = (base, bf.mask, bf.lsb, bf.sign_mask != 0, perm, bf.trigger)
+        return res
+    TOP.x__regmap = regmap((TOP,), 0, "", {})
+    return TOP
+
+DEEP_PATH = "LINKS[5].SUB[2].CTRL.MODE"
+
+def bench_agwb(agwb, top_cls, n):
+    """ Returns the dictionary of the benchmarked operations (agwb flavour).
+    Each function performs n operations.
+    """
+    iface = MemIface(top_cls.x__size)
+    top = top_cls(iface, 0)
+    leaf = top.LINKS[5].SUB[2]
+    reg = leaf.CTRL
+    bf = leaf.CTRL.MODE
+
+    def reg_read():
+        for i in range(n):
+            reg.read()
+    def reg_write():
+        for i in range(n):
+            reg.write(i)
+    def bf_read():
+        for i in range(n):
+            bf.read()
+    def bf_write():
+        for i in range(n):
+            bf.write(i & 0xf)
+    def readx_dispatch():
+        futs = [reg.readx() for i in range(n)]
+        top.dispatch()
+        for f in futs:
+            f.val
+    def writex_dispatch():
+        for i in range(n):
+            reg.writex(i)
+        top.dispatch()
+    def rmw_dispatch():
+        for i in range(n):
+            reg.rmw(0xff00, i << 8)
+        top.dispatch()
+    def bf_writex_dispatch():
+        for i in range(n):
+            bf.writex(i & 0xf)
+        top.dispatch()
+    return _common(top_cls, iface, top, n, {
+        "reg_read": reg_read,
+        "reg_write": reg_write,
+        "bf_read": bf_read,
+        "bf_write": bf_write,
+        "readx+dispatch": readx_dispatch,
+        "writex+dispatch": writex_dispatch,
+        "rmw+dispatch": rmw_dispatch,
+        "bf_writex+dispatch": bf_writex_dispatch,
+    })
+
+def bench_agwb_dca(agwb, top_cls, n):
+    """ Returns the dictionary of the benchmarked operations (agwb_dca flavour).
+    Each function performs n operations.
+    """
+    iface = MemIface(top_cls.x__size)
+    top = top_cls(iface, 0)
+    leaf = top.LINKS[5].SUB[2]
+    reg = leaf.CTRL
+    bf = leaf.CTRL.MODE
+
+    def reg_read():
+        for i in range(n):
+            reg.read()
+    def reg_write():
+        for i in range(n):
+            reg.write(i)
+    def bf_read():
+        for i in range(n):
+            bf.readf()
+    def bf_write():
+        for i in range(n):
+            bf.writef(i & 0xf)
+    def readb_dispatch():
+        futs = [reg.readb() for i in range(n)]
+        top.dispatch()
+        for f in futs:
+            f()
+    def writeb_dispatch():
+        for i in range(n):
+            reg.writeb(i)
+        top.dispatch()
+    def writeb_masked_dispatch():
+        for i in range(n):
+            reg.writeb_masked(0xff00, i << 8)
+        top.dispatch()
+    def bf_writefb_dispatch():
+        for i in range(n):
+            bf.writefb(i & 0xf)
+        top.dispatch()
+    return _common(top_cls, iface, top, n, {
+        "reg_read": reg_read,
+        "reg_write": reg_write,
+        "bf_read": bf_read,
+        "bf_write": bf_write,
+        "readx+dispatch": readb_dispatch,
+        "writex+dispatch": writeb_dispatch,
+        "rmw+dispatch": writeb_masked_dispatch,
+        "bf_writex+dispatch": bf_writefb_dispatch,
+    })
+
+def _common(top_cls, iface, top, n, ops):
+    """ Adds the operations common for both flavours """
+    links = top.LINKS
+
+    def vector_index():
+        for i in range(n):
+            links[i & 7]
+    def deep_path():
+        for i in range(n):
+            top.LINKS[5].SUB[2].CTRL.MODE
+    def lookup_cached():
+        for i in range(n):
+            top.lookup(DEEP_PATH)
+    def lookup_cold():
+        # A new top block is created, so the handles are not cached
+        for i in range(n):
+            top_cls(iface, 0).lookup(DEEP_PATH)
+    def walk_cold():
+        for i in range(n):
+            top_cls(iface, 0).LINKS[5].SUB[2].CTRL.MODE
+    ops.update({
+        "vector_index": vector_index,
+        "deep_path": deep_path,
+        "lookup_cached": lookup_cached,
+        "lookup_cold": lookup_cold,
+        "walk_cold": walk_cold,
+    })
+    return ops
+
+BENCHES = {"agwb": bench_agwb, "agwb_dca": bench_agwb_dca}
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("--flavour", help="Comma separated flavours", default="agwb,agwb_dca")
+    PARSER.add_argument("-n", help="Number of operations in each measurement", type=int, default=100000)
+    PARSER.add_argument("--repeat", help="Number of repetitions of the measurement", type=int, default=3)
+    PARSER.add_argument("--output", help="JSON file for the results", default="")
+    PARSER.add_argument("--props", help="Benchmark also the classes with properties (--python_props)",
+                        action="store_true")
+    ARGS = PARSER.parse_args()
+    RESULTS = {"n": ARGS.n, "python": platform.python_version(), "flavours": {}}
+    CASES = [(flavour, False) for flavour in ARGS.flavour.split(",")]
+    if ARGS.props:
+        CASES += [(flavour, True) for flavour, props in CASES]
+    for flavour, props in CASES:
+        agwb = importlib.import_module(flavour)
+        ops = BENCHES[flavour](agwb, build_classes(agwb, props), ARGS.n)
+        if props:
+            flavour += "+props"
+        res = {}
+        print(flavour)
+        for name, func in ops.items():
+            best = None
+            for i in range(ARGS.repeat):
+                t_start = time.perf_counter()
+                func()
+                t_op = time.perf_counter() - t_start
+                best = t_op if best is None else min(best, t_op)
+            res[name] = ARGS.n / best
+            print("  %-20s %12.0f ops/s %8.3f us/op" % (name, res[name], 1e6 * best / ARGS.n))
+        RESULTS["flavours"][flavour] = res
+    if ARGS.output:
+        with open(ARGS.output, "w") as f_o:
+            json.dump(RESULTS, f_o, indent=1)
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Generator of synthetic system descriptions for benchmarking
+of the addr_gen_wb.py.
+
+The design is a chain of nested blocks L0 (the top block), L1, ... Ldepth.
+Each block contains "regs" registers (control and status registers
+alternately) with "fields" bitfields each, and (except of the last one)
+the vector of "reps" subblocks of the next level.
+If "variants" is greater than 1, the number of repetitions differs
+in each variant.
+The blocks are distributed among "includes" included files.
+
+Usage: synth_sysdef.py OUTDIR [--depth 2] [--reps 4] [--regs 32] [--fields 4]
+                              [--variants 1] [--includes 1]
+"""
+import argparse
+import os
+
+def block_xml(level, depth, reps, regs, fields, variants):
+    """ Returns the XML describing the block of the given level """
+    width = max(1, 32 // max(1, fields))
+    res = '<block name="L' + str(level) + '" desc="Level ' + str(level) + ' block">\n'
+    for r in range(regs):
+        tag = "creg" if r % 2 == 0 else "sreg"
+        res += '  <' + tag + ' name="R' + str(r) + '" desc="Register ' + str(r) + '"'
+        if fields == 0:
+            res += '/>\n'
+            continue
+        res += '>\n'
+        for f in range(fields):
+            res += ('    <field name="F' + str(f) + '" width="' + str(width) + '"'
+                    + (' type="signed"' if f % 3 == 2 else '') + '/>\n')
+        res += '  </' + tag + '>\n'
+    if level < depth:
+        # Different number of repetitions in each variant
+        vreps = ";".join(str(max(1, reps - v)) for v in range(variants))
+        res += '  <subblock name="SUB" type="L' + str(level + 1) + '" reps="' + vreps + '"/>\n'
+    res += '</block>\n'
+    return res
+
+def synth(outdir, depth=2, reps=4, regs=32, fields=4, variants=1, includes=1):
+    """ Writes the synthetic design to outdir and returns the path
+    of the top XML file. Returns also the total number of registers.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    includes = max(1, min(includes, depth + 1))
+    files = [[] for i in range(includes)]
+    for level in range(depth + 1):
+        files[level % includes].append(block_xml(level, depth, reps, regs, fields, variants))
+    top = '<sysdef top="L0">\n'
+    for i, blks in enumerate(files):
+        fname = "blocks" + str(i) + ".xml"
+        with open(os.path.join(outdir, fname), "w") as f_o:
+            f_o.write("".join(blks))
+        top += '<include path="' + fname + '"/>\n'
+    top += '</sysdef>\n'
+    top_path = os.path.join(outdir, "top.xml")
+    with open(top_path, "w") as f_o:
+        f_o.write(top)
+    nregs = sum(regs * reps ** level for level in range(depth + 1))
+    return top_path, nregs
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser()
+    PARSER.add_argument("outdir", help="Output directory")
+    PARSER.add_argument("--depth", help="Depth of subblock nesting", type=int, default=2)
+    PARSER.add_argument("--reps", help="Number of repetitions of subblocks", type=int, default=4)
+    PARSER.add_argument("--regs", help="Number of registers in each block", type=int, default=32)
+    PARSER.add_argument("--fields", help="Number of bitfields in each register", type=int, default=4)
+    PARSER.add_argument("--variants", help="Number of variants", type=int, default=1)
+    PARSER.add_argument("--includes", help="Number of included files", type=int, default=1)
+    ARGS = PARSER.parse_args()
+    TOP, NREGS = synth(ARGS.outdir, ARGS.depth, ARGS.reps, ARGS.regs, ARGS.fields, ARGS.variants, ARGS.includes)
+    print(TOP + ": " + str(NREGS) + " registers")
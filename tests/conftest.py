@@ -0,0 +1,4 @@
+# The wb_test.py scripts of the test designs are run together with
+# the simulation (wb_test.sh), and the benchmarks are run directly,
+# so only the runtime tests are collected by pytest.
+collect_ignore = ["bench", "test", "test2", "test_ao", "test_aoai"]
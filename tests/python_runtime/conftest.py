@@ -0,0 +1,48 @@
+"""
+Fixtures providing the Python packages generated from the test designs.
+
+Each package is generated into the temporary directory, and imported
+under its own name (e.g. gen_std instead of agwb), so the packages
+of different flavours may be used in the same session.
+"""
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+TESTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGWB = os.path.join(TESTS, "..", "src", "addr_gen_wb.py")
+
+def generate(tmp_path_factory, design, option, name, extra=()):
+    """ Generates the Python package from the design
+        (path relative to the tests directory) and imports it as name.
+    """
+    out = tmp_path_factory.mktemp(name)
+    infile = os.path.join(TESTS, design)
+    subprocess.run([sys.executable, AGWB, "--infile", os.path.basename(infile), option, str(out)] + list(extra),
+                   cwd=os.path.dirname(infile), check=True, stdout=subprocess.DEVNULL)
+    os.rename(str(out / "agwb"), str(out / name))
+    sys.path.insert(0, str(out))
+    return importlib.import_module(name)
+
+@pytest.fixture(scope="session")
+def agwb_std(tmp_path_factory):
+    """ Package generated with --python from tests/test/example1.xml """
+    return generate(tmp_path_factory, "test/example1.xml", "--python", "gen_std")
+
+@pytest.fixture(scope="session")
+def agwb_dca(tmp_path_factory):
+    """ Package generated with --pythondca from tests/test/example1.xml """
+    return generate(tmp_path_factory, "test/example1.xml", "--pythondca", "gen_dca")
+
+@pytest.fixture(scope="session")
+def agwb_mwr(tmp_path_factory):
+    """ Package generated with --python from tests/test_mwr/mwr_test.xml (masked write windows) """
+    return generate(tmp_path_factory, "test_mwr/mwr_test.xml", "--python", "gen_mwr")
+
+@pytest.fixture(scope="session")
+def agwb_mwr_dca(tmp_path_factory):
+    """ Package generated with --pythondca from tests/test_mwr/mwr_test.xml """
+    return generate(tmp_path_factory, "test_mwr/mwr_test.xml", "--pythondca", "gen_mwr_dca")
@@ -0,0 +1,151 @@
+"""
+Emulated interfaces used by the runtime tests.
+
+All interfaces access the register file (dictionary) and record
+the bus accesses in the log, so the tests may check the number
+and the order of accesses seen by the hardware.
+"""
+
+class Future(object):
+    """Result of the queued read. The value is available via the val
+    field (agwb) or by calling the object (agwb_dca) after dispatch.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._val = None
+
+    @property
+    def val(self):
+        assert self.done, "value used before dispatch"
+        return self._val
+
+    def __call__(self):
+        return self.val
+
+class MemIface(object):
+    """Simple interface (read and write), with block transfers."""
+
+    def __init__(self):
+        self.mem = {}
+        self.log = []
+
+    def read(self, addr):
+        self.log.append(("r", addr))
+        return self.mem.get(addr, 0)
+
+    def write(self, addr, val):
+        self.log.append(("w", addr, val))
+        self.mem[addr] = val
+
+    def read_block(self, addr, count):
+        self.log.append(("rb", addr, count))
+        return [self.mem.get(addr + i, 0) for i in range(count)]
+
+    def write_block(self, addr, values):
+        values = list(values)
+        self.log.append(("wb", addr, values))
+        for i, val in enumerate(values):
+            self.mem[addr + i] = val
+
+    def read_fifo(self, addr, count):
+        self.log.append(("rf", addr, count))
+        return [self.mem.get(addr, 0) for _ in range(count)]
+
+    def write_fifo(self, addr, values):
+        values = list(values)
+        self.log.append(("wf", addr, values))
+        if values:
+            self.mem[addr] = values[-1]
+
+    def accesses(self, kind):
+        """Returns the logged accesses of the given kind."""
+        return [entry for entry in self.log if entry[0] == kind]
+
+class _QueuedIface(MemIface):
+    """Base of the extended interfaces: the reads, writes and masked writes
+    are queued until dispatch, the other accesses are immediate.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queue = []
+        self.dispatches = 0
+
+    def _queue_read(self, addr):
+        fut = Future()
+        self.queue.append(("r", addr, fut))
+        return fut
+
+    def _queue_write(self, addr, val):
+        self.queue.append(("w", addr, val))
+
+    def _queue_masked(self, addr, mask, val):
+        self.queue.append(("m", addr, mask, val))
+
+    def dispatch(self):
+        self.dispatches += 1
+        queue = self.queue
+        self.queue = []
+        for op in queue:
+            if op[0] == "r":
+                op[2]._val = self.read(op[1])
+                op[2].done = True
+            elif op[0] == "w":
+                self.write(op[1], op[2])
+            else:
+                self.write(op[1], (self.read(op[1]) & ~op[2]) | (op[3] & op[2]))
+
+class QueuedIface(_QueuedIface):
+    """Extended interface of the agwb flavour (readx, writex, rmw)."""
+
+    readx = _QueuedIface._queue_read
+    writex = _QueuedIface._queue_write
+
+    def rmw(self, addr=None, mask=0, val=0):
+        if addr is not None:
+            self._queue_masked(addr, mask, val)
+
+class QueuedDcaIface(_QueuedIface):
+    """Extended interface of the agwb_dca flavour (readb, writeb, writeb_masked)."""
+
+    readb = _QueuedIface._queue_read
+    writeb = _QueuedIface._queue_write
+
+    def writeb_masked(self, addr, mask, val, more=False):
+        self._queue_masked(addr, mask, val)
+
+    def write_masked(self, addr, mask, val):
+        self._queue_masked(addr, mask, val)
+        self.dispatch()
+
+class MwrMemIface(MemIface):
+    """Simple interface emulating the masked write windows of the block
+    at base (mwr is the size of the window), as generated in the HDL.
+    """
+
+    def __init__(self, mwr, base=0):
+        super().__init__()
+        self.mwr = mwr
+        self.base = base
+
+    def _window(self, addr):
+        # Returns the address of the register and the half of the window (or None)
+        half = (addr - self.base) // self.mwr - 1
+        if half in (0, 1):
+            return addr - (half + 1) * self.mwr, half
+        return addr, None
+
+    def read(self, addr):
+        if self._window(addr)[1] is not None:
+            raise Exception("Read from the masked write window at " + hex(addr))
+        return super().read(addr)
+
+    def write(self, addr, val):
+        reg, half = self._window(addr)
+        if half is None:
+            super().write(addr, val)
+            return
+        self.log.append(("w", addr, val))
+        mask = (val >> 16) << (16 * half)
+        self.mem[reg] = (self.mem.get(reg, 0) & ~mask) | (((val & 0xffff) << (16 * half)) & mask)
@@ -0,0 +1,64 @@
+"""
+Tests of the bulk access to the vectors of registers (read_all, write_all).
+"""
+import numpy as np
+import pytest
+
+from ifaces import MemIface
+
+class SimpleIface(object):
+    """Interface without block transfers."""
+
+    def __init__(self):
+        self.lower = MemIface()
+
+    def read(self, addr):
+        return self.lower.read(addr)
+
+    def write(self, addr, val):
+        self.lower.write(addr, val)
+
+@pytest.fixture
+def top(agwb_std):
+    return agwb_std.MAIN(MemIface(), 0)
+
+def test_block_transfers(top):
+    vec = top.TEST_OUT
+    base = vec[0].x__base
+    vec.write_all([1, 2, 3])
+    vals = vec.read_all()
+    assert vals.dtype == np.uint32
+    assert list(vals) == [1, 2, 3]
+    assert top.x__iface.log == [("wb", base, [1, 2, 3]), ("rb", base, 3)]
+
+def test_slices(top):
+    vec = top.TEST_OUT
+    base = vec[0].x__base
+    vec.write_all([1, 2, 3])
+    top.x__iface.log.clear()
+    # The registers selected with the step are accessed one by one
+    assert list(vec.read_all(slice(0, 3, 2))) == [1, 3]
+    vec.write_all([7, 9], slice(0, 3, 2))
+    assert top.x__iface.log == [("r", base), ("r", base + 2), ("w", base, 7), ("w", base + 2, 9)]
+    assert list(vec.read_all(slice(1, 3))) == [2, 9]
+
+def test_without_block_transfers(agwb_std):
+    iface = SimpleIface()
+    vec = agwb_std.MAIN(iface, 0).TEST_OUT
+    vec.write_all(np.arange(3))
+    assert list(vec.read_all()) == [0, 1, 2]
+    assert len(iface.lower.log) == 6
+
+def test_field_extraction(top):
+    vec = top.LINKS[0].X2
+    vec.write_all([0b101])
+    assert list(vec.read_all(field="B3")) == [1]
+    assert list(vec.read_all(field="B2")) == [0]
+
+def test_errors(top):
+    with pytest.raises(Exception, match="can't be written"):
+        top.TEST_IN.write_all([0] * len(top.TEST_IN))
+    with pytest.raises(Exception, match="doesn't match"):
+        top.TEST_OUT.write_all([1, 2])
+    with pytest.raises(Exception, match="only for vectors of registers"):
+        top.LINKS.read_all()
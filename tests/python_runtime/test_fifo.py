@@ -0,0 +1,108 @@
+"""
+Tests of the FIFO transfers into and from the preallocated buffers
+(read_fifo_into, write_fifo_from, stream_fifo).
+"""
+import array
+
+import numpy as np
+import pytest
+
+from ifaces import MemIface
+
+class FifoIface(MemIface):
+    """Interface with the FIFO delivering the consecutive numbers.
+    If native is True, it provides read_fifo_into and write_fifo_from.
+    """
+
+    def __init__(self, native):
+        super().__init__()
+        self.queue = list(range(1000, 1100))
+        self.out = []
+        if native:
+            self.read_fifo_into = self._read_fifo_into
+            self.write_fifo_from = self._write_fifo_from
+
+    def read_fifo(self, addr, count):
+        self.log.append(("rf", addr, count))
+        vals = self.queue[:count]
+        del self.queue[:count]
+        return vals
+
+    def write_fifo(self, addr, values):
+        assert isinstance(values, list)
+        self.log.append(("wf", addr, len(values)))
+        self.out += values
+
+    def _read_fifo_into(self, addr, buf):
+        assert buf.format == "I"
+        self.log.append(("rfi", addr, len(buf)))
+        count = len(buf)
+        buf[:] = array.array("I", self.queue[:count])
+        del self.queue[:count]
+
+    def _write_fifo_from(self, addr, buf):
+        self.log.append(("wfi", addr, len(buf)))
+        self.out += buf.tolist()
+
+NATIVE = [False, True]
+
+def fifo_reg(pkg, native):
+    lower = FifoIface(native)
+    return pkg.Register(lower, 0x10), lower
+
+@pytest.mark.parametrize("native", NATIVE)
+def test_read_into_numpy(agwb_std, native):
+    reg, lower = fifo_reg(agwb_std, native)
+    buf = np.zeros(10, dtype=np.uint32)
+    assert reg.read_fifo_into(buf, count=7, chunk=3) == 7
+    assert list(buf) == list(range(1000, 1007)) + [0, 0, 0]
+    kind = "rfi" if native else "rf"
+    assert lower.log == [(kind, 0x10, 3), (kind, 0x10, 3), (kind, 0x10, 1)]
+
+@pytest.mark.parametrize("native", NATIVE)
+def test_read_into_bytearray(agwb_std, native):
+    reg, lower = fifo_reg(agwb_std, native)
+    buf = bytearray(12)
+    assert reg.read_fifo_into(buf) == 3
+    assert list(memoryview(buf).cast("I")) == [1000, 1001, 1002]
+    assert reg.read_fifo_into(bytearray(0)) == 0
+
+@pytest.mark.parametrize("native", NATIVE)
+def test_stream(agwb_std, native):
+    reg, lower = fifo_reg(agwb_std, native)
+    got = []
+    sizes = []
+    for view in reg.stream_fifo(11, 4):
+        got += view.tolist()
+        sizes.append(len(view))
+    assert got == list(range(1000, 1011))
+    assert sizes == [4, 4, 3]
+
+@pytest.mark.parametrize("native", NATIVE)
+def test_write_from(agwb_std, native):
+    reg, lower = fifo_reg(agwb_std, native)
+    reg.write_fifo_from(np.arange(5, dtype=np.int32), chunk=2)
+    reg.write_fifo_from(array.array("I", [7, 8, 9]), count=2)
+    assert lower.out == [0, 1, 2, 3, 4, 7, 8]
+    assert len(lower.log) == 4
+
+def test_buffer_too_small(agwb_std):
+    reg, lower = fifo_reg(agwb_std, True)
+    with pytest.raises(Exception, match="too small"):
+        reg.read_fifo_into(bytearray(8), count=3)
+    assert lower.log == []
+
+def test_via_planner(agwb_std):
+    lower = FifoIface(True)
+    reg = agwb_std.Register(agwb_std.Planner(lower, (0x10,)), 0x10)
+    buf = array.array("I", bytes(8))
+    assert reg.read_fifo_into(buf) == 2
+    assert list(buf) == [1000, 1001]
+    reg.write_fifo_from(buf)
+    assert lower.out == [1000, 1001]
+
+def test_dca(agwb_dca):
+    reg, lower = fifo_reg(agwb_dca, False)
+    buf = np.zeros(5, dtype=np.uint32)
+    assert reg.read_fifo_into(buf, chunk=2) == 5
+    assert list(buf) == list(range(1000, 1005))
@@ -0,0 +1,93 @@
+"""
+Tests of the masked writes in the blocks with the masked_wr attribute
+(tests/test_mwr design): the bitfields and rmw are written via the masked
+write windows, without reading the registers.
+"""
+import pytest
+
+from ifaces import MwrMemIface, QueuedIface, QueuedDcaIface
+
+class QueuedMwrIface(MwrMemIface, QueuedIface):
+    """Extended interface of the agwb flavour with the masked write windows."""
+
+class QueuedMwrDcaIface(MwrMemIface, QueuedDcaIface):
+    """Extended interface of the agwb_dca flavour with the masked write windows."""
+
+def make(pkg, iface_cls=MwrMemIface):
+    top_cls = pkg.MWR_TEST
+    mwr = top_cls.x__regmap["REGS[0]"][6]
+    lower = iface_cls(mwr)
+    return top_cls(lower, 0), lower, mwr
+
+def test_window_size(agwb_mwr):
+    # The registers area (5 words) rounded up to the power of two
+    top, lower, mwr = make(agwb_mwr)
+    assert mwr == 8
+    assert top.REGS[1].x__mwr == mwr
+
+@pytest.mark.parametrize("field, value, writes, result", [
+    ("LO", 0xabc, [(0, 0x0fff0abc)], 0x12345abc),
+    ("HI", 0x555, [(1, 0xfff05550)], 0x55545678),
+    # The field crossing bit 16 is written via both halves
+    ("MID", 0xde, [(0, 0xf000e000), (1, 0x000f000d)], 0x123de678),
+])
+def test_bitfield_write(agwb_mwr, field, value, writes, result):
+    top, lower, mwr = make(agwb_mwr)
+    reg = top.REGS[1]
+    lower.mem[reg.x__base] = 0x12345678
+    getattr(reg, field).write(value)
+    assert lower.accesses("r") == []
+    assert lower.log == [("w", reg.x__base + (half + 1) * mwr, val) for half, val in writes]
+    assert lower.mem[reg.x__base] == result
+    assert getattr(reg, field).read() == value
+
+def test_rmw(agwb_mwr):
+    top, lower, mwr = make(agwb_mwr, QueuedMwrIface)
+    lower.mem[top.PLAIN.x__base] = 0x12345678
+    top.PLAIN.rmw(0xff0000ff, 0xa50000c3)
+    top.dispatch()
+    assert lower.accesses("r") == []
+    assert lower.mem[top.PLAIN.x__base] == 0xa53456c3
+    # Only the halves touched by the mask are written
+    top.PLAIN.rmw(0xf0, 0x90)
+    top.dispatch()
+    assert len(lower.accesses("w")) == 3
+    assert lower.mem[top.PLAIN.x__base] == 0xa5345693
+
+def test_writex_queued(agwb_mwr):
+    top, lower, mwr = make(agwb_mwr, QueuedMwrIface)
+    reg = top.REGS[0]
+    reg.LO.writex(0x123)
+    reg.MID.writex(0x45)
+    assert lower.log == []
+    top.dispatch()
+    assert lower.dispatches == 1
+    assert lower.accesses("r") == []
+    assert lower.mem[reg.x__base] == 0x45123
+
+def test_shadow_updated(agwb_mwr):
+    top, lower, mwr = make(agwb_mwr)
+    reg = top.REGS[0]
+    top.enable_shadow()
+    try:
+        reg.write(0x12345678)
+        reg.HI.write(0xfff)
+        lower.log.clear()
+        assert reg.read() == 0xfff45678
+        assert lower.log == []
+        assert lower.mem[reg.x__base] == 0xfff45678
+    finally:
+        top.disable_shadow()
+
+def test_dca(agwb_mwr_dca):
+    top, lower, mwr = make(agwb_mwr_dca, QueuedMwrDcaIface)
+    reg = top.REGS[1]
+    lower.mem[reg.x__base] = 0x12345678
+    reg.MID.writef(0xde)
+    reg.write_masked(0xf, 0x9)
+    assert lower.mem[reg.x__base] == 0x123de679
+    reg.LO.writefb(0xabc)
+    reg.writeb_masked(0xfff00000, 0x55500000)
+    top.dispatch()
+    assert lower.accesses("r") == []
+    assert lower.mem[reg.x__base] == 0x555deabc
@@ -0,0 +1,99 @@
+"""
+Tests of agwb.Multiplexer: per-thread transaction contexts, atomic
+aggregated RMW, and the order of the accesses passed to the lower interface.
+"""
+import threading
+
+import pytest
+
+from ifaces import MemIface, QueuedIface, QueuedDcaIface
+
+LOWER = [MemIface, QueuedIface, QueuedDcaIface]
+
+def in_thread(func):
+    """Runs func in a new thread, and returns its result."""
+    res = []
+    thread = threading.Thread(target=lambda: res.append(func()))
+    thread.start()
+    thread.join()
+    return res[0]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_contexts_are_separate(agwb_std, lower_cls):
+    lower = lower_cls()
+    mux = agwb_std.Multiplexer(lower)
+    # The write queued in the other thread is not dispatched with our operations
+    in_thread(lambda: mux.writex(0x10, 1))
+    fut = mux.readx(0x10)
+    mux.dispatch()
+    assert fut.val == 0
+    assert lower.accesses("w") == []
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_rmw_aggregated_per_context(agwb_std, lower_cls):
+    lower = lower_cls()
+    mux = agwb_std.Multiplexer(lower)
+    mux.rmw(0x10, 0x0f, 0x01)
+    # RMW of the other thread doesn't finalize nor extend our RMW
+    in_thread(lambda: (mux.rmw(0x10, 0xf0, 0x20), mux.dispatch()))
+    mux.rmw(0x10, 0xf00, 0x300)
+    mux.dispatch()
+    assert lower.mem[0x10] == 0x321
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_direct_access_ordered(agwb_std, lower_cls):
+    # The queued write must not be overtaken by the direct block read
+    lower = lower_cls()
+    mux = agwb_std.Multiplexer(lower)
+    mux.writex(0x10, 7)
+    assert mux.read_block(0x10, 2) == [7, 0]
+    fut = mux.readx(0x11)
+    mux.write_block(0x10, [1, 2])
+    assert fut.val == 0
+    assert mux.read(0x11) == 2
+
+def test_single_lower_dispatch(agwb_std):
+    lower = QueuedIface()
+    mux = agwb_std.Multiplexer(lower)
+    mux.readx(0x10)
+    mux.writex(0x20, 1)
+    mux.rmw(0x30, 1, 1)
+    mux.dispatch()
+    assert lower.dispatches == 1
+
+def test_dispatch_error_raised(agwb_std):
+    class FailingIface(QueuedIface):
+        def dispatch(self):
+            raise Exception("bus error")
+    mux = agwb_std.Multiplexer(FailingIface())
+    mux.writex(0x10, 1)
+    with pytest.raises(Exception, match="bus error"):
+        mux.dispatch()
+
+def test_interface_without_read_rejected(agwb_std):
+    with pytest.raises(TypeError):
+        agwb_std.Multiplexer(object())
+
+def test_concurrent_threads(agwb_std):
+    lower = QueuedIface()
+    mux = agwb_std.Multiplexer(lower)
+    errors = []
+
+    def worker(adr):
+        try:
+            top = agwb_std.MAIN(mux, 0)
+            reg = top.TEST_OUT[adr]
+            for i in range(200):
+                reg.writex(i)
+                fut = reg.readx()
+                mux.dispatch()
+                assert fut.val == i
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
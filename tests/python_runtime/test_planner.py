@@ -0,0 +1,110 @@
+"""
+Tests of agwb.Planner: merging of the queued accesses, and the order
+of the accesses passed to the lower interface.
+"""
+import pytest
+
+from ifaces import MemIface, QueuedIface, QueuedDcaIface
+
+LOWER = [MemIface, QueuedIface, QueuedDcaIface]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_contiguous_reads_merged(agwb_std, lower_cls):
+    lower = lower_cls()
+    lower.mem.update({0x10: 1, 0x11: 2, 0x12: 3})
+    planner = agwb_std.Planner(lower)
+    futs = [planner.readx(adr) for adr in (0x10, 0x11, 0x12)]
+    planner.dispatch()
+    assert [fut.val for fut in futs] == [1, 2, 3]
+    assert lower.log == [("rb", 0x10, 3)]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_contiguous_writes_merged(agwb_std, lower_cls):
+    lower = lower_cls()
+    planner = agwb_std.Planner(lower)
+    for adr, val in ((0x10, 1), (0x11, 2), (0x13, 4)):
+        planner.writex(adr, val)
+    planner.dispatch()
+    assert lower.log == [("wb", 0x10, [1, 2]), ("w", 0x13, 4)]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_queued_write_before_block_read(agwb_std, lower_cls):
+    # The write queued in the lower interface must not be overtaken
+    # by the immediate block read
+    lower = lower_cls()
+    planner = agwb_std.Planner(lower)
+    planner.writex(0x10, 7)
+    futs = [planner.readx(0x10), planner.readx(0x11)]
+    planner.dispatch()
+    assert [fut.val for fut in futs] == [7, 0]
+    assert lower.log == [("w", 0x10, 7), ("rb", 0x10, 2)]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_queued_read_before_block_write(agwb_std, lower_cls):
+    lower = lower_cls()
+    lower.mem[0x10] = 5
+    planner = agwb_std.Planner(lower)
+    fut = planner.readx(0x10)
+    planner.writex(0x10, 1)
+    planner.writex(0x11, 2)
+    planner.dispatch()
+    assert fut.val == 5
+    assert lower.log == [("r", 0x10), ("wb", 0x10, [1, 2])]
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_rmw_before_block_read(agwb_std, lower_cls):
+    lower = lower_cls()
+    lower.mem[0x10] = 0xf0
+    planner = agwb_std.Planner(lower)
+    planner.rmw(0x10, 0x0f, 0x05)
+    futs = [planner.readx(0x10), planner.readx(0x11)]
+    planner.dispatch()
+    assert futs[0].val == 0xf5
+    assert lower.log[-1] == ("rb", 0x10, 2)
+
+@pytest.mark.parametrize("lower_cls", LOWER)
+def test_reads_not_reordered_nor_deduplicated(agwb_std, lower_cls):
+    # Reads may have side effects, so each one is performed in the original order
+    lower = lower_cls()
+    planner = agwb_std.Planner(lower)
+    for adr in (0x11, 0x10, 0x10, 0x12):
+        planner.readx(adr)
+    planner.dispatch()
+    assert lower.log == [("r", 0x11), ("r", 0x10), ("r", 0x10), ("r", 0x12)]
+
+def test_fifo_not_merged(agwb_std):
+    lower = MemIface()
+    planner = agwb_std.Planner(lower, fifo=(0x1,), base=0x10)
+    for adr in (0x10, 0x11, 0x12):
+        planner.readx(adr)
+    planner.dispatch()
+    assert lower.log == [("r", 0x10), ("r", 0x11), ("r", 0x12)]
+
+def test_single_lower_dispatch(agwb_std):
+    lower = QueuedIface()
+    planner = agwb_std.Planner(lower)
+    planner.readx(0x10)
+    planner.writex(0x20, 1)
+    planner.rmw(0x30, 1, 1)
+    planner.dispatch()
+    assert lower.dispatches == 1
+
+def test_interface_without_read_rejected(agwb_std):
+    with pytest.raises(TypeError):
+        agwb_std.Planner(object())
+
+def test_generated_classes(agwb_std):
+    lower = QueuedIface()
+    top = agwb_std.MAIN(agwb_std.Planner(lower, agwb_std.MAIN.x__fifo), 0)
+    base = agwb_std.MAIN.x__regmap["TEST_OUT[0]"][0]
+    for i in range(3):
+        lower.mem[base + i] = i + 1
+    futs = [top.TEST_OUT[i].readx() for i in range(3)]
+    # STATUS has the "ack" strobe, so both reads must reach the hardware
+    status = [top.LINKS[0].STATUS.readx() for _ in range(2)]
+    top.dispatch()
+    assert [fut.val for fut in futs] == [1, 2, 3]
+    assert lower.log[0] == ("rb", base, 3)
+    adr = agwb_std.MAIN.x__regmap["LINKS[0].STATUS"][0]
+    assert lower.accesses("r") == [("r", adr), ("r", adr)]
+    assert [fut.val for fut in status] == [0, 0]
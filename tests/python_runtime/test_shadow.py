@@ -0,0 +1,106 @@
+"""
+Tests of the shadow cache of the control registers: serving the reads
+from the cache, handling of the trigger bits, and invalidation.
+"""
+import pytest
+
+from ifaces import MemIface, QueuedIface
+
+@pytest.fixture
+def shadowed(agwb_std):
+    """Top block with the shadow cache enabled for its interface."""
+    lower = QueuedIface()
+    top = agwb_std.MAIN(lower, 0)
+    top.enable_shadow()
+    yield top, lower
+    top.disable_shadow()
+
+def test_reads_cached(shadowed):
+    top, lower = shadowed
+    ctrl = top.LINKS[1].CTRL
+    lower.mem[ctrl.x__base] = 0x14
+    assert ctrl.read() == 0x14
+    assert ctrl.readx().val == 0x14
+    assert ctrl.SPEED.read() == 5
+    assert lower.accesses("r") == [("r", ctrl.x__base)]
+
+def test_trigger_bits_not_cached(shadowed):
+    top, lower = shadowed
+    ctrl = top.LINKS[1].CTRL
+    # START and STOP are the trigger bits, read as zeros
+    ctrl.write(0x3f)
+    assert lower.mem[ctrl.x__base] == 0x3f
+    assert ctrl.read() == 0x3c
+    assert lower.accesses("r") == []
+    # The trigger bitfield is always read from the hardware
+    lower.mem[ctrl.x__base] = 0x3c
+    assert ctrl.START.read() == 0
+    assert len(lower.accesses("r")) == 1
+
+def test_bitfield_write_without_read(shadowed):
+    top, lower = shadowed
+    ctrl = top.LINKS[1].CTRL
+    ctrl.write(0x3c)
+    ctrl.SPEED.write(-3)
+    ctrl.START.write(1)
+    ctrl.SPEED.writex(2)
+    top.dispatch()
+    assert lower.accesses("r") == []
+    assert lower.mem[ctrl.x__base] == 2 << 2
+    assert ctrl.SPEED.read() == 2
+
+def test_status_not_cached(shadowed):
+    top, lower = shadowed
+    status = top.LINKS[1].STATUS
+    lower.mem[status.x__base] = 5
+    assert status.read() == 5
+    lower.mem[status.x__base] = 6
+    assert status.read() == 6
+
+def test_block_invalidation(shadowed, agwb_std):
+    top, lower = shadowed
+    ctrl0 = top.LINKS[0].CTRL
+    ctrl1 = top.LINKS[1].CTRL
+    ctrl0.write(0x4)
+    ctrl1.write(0x8)
+    lower.mem[ctrl0.x__base] = 0x10
+    lower.mem[ctrl1.x__base] = 0x10
+    # Only the registers of the invalidated block are read again
+    top.LINKS[1].invalidate_shadow()
+    assert ctrl0.read() == 0x4
+    assert ctrl1.read() == 0x10
+    lower.mem[ctrl1.x__base] = 0x14
+    agwb_std.invalidate_shadow(lower)
+    assert ctrl0.read() == 0x10
+    assert ctrl1.read() == 0x14
+
+def test_write_all_invalidates(shadowed):
+    top, lower = shadowed
+    vec = top.TEST_OUT
+    assert vec[1].read() == 0
+    vec.write_all([1, 2, 3])
+    assert vec[1].read() == 2
+
+def test_other_interface_not_cached(shadowed, agwb_std):
+    top, lower = shadowed
+    other = MemIface()
+    ctrl = agwb_std.MAIN(other, 0).LINKS[1].CTRL
+    ctrl.write(0x8)
+    other.mem[ctrl.x__base] = 0x10
+    assert ctrl.read() == 0x10
+
+def test_dca(agwb_dca):
+    lower = MemIface()
+    top = agwb_dca.MAIN(lower, 0)
+    ctrl = top.LINKS[1].CTRL
+    top.enable_shadow()
+    try:
+        ctrl.write(0x3c)
+        ctrl.SPEED.writef(-3)
+        assert ctrl.SPEED.readf() == -3
+        assert lower.accesses("r") == []
+        lower.mem[ctrl.x__base] = 0
+        top.invalidate_shadow()
+        assert ctrl.SPEED.readf() == 0
+    finally:
+        top.disable_shadow()
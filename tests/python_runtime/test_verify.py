@@ -0,0 +1,46 @@
+"""
+Tests of verify_id_and_version in the sequential and batched modes.
+"""
+import pytest
+
+from ifaces import MemIface, QueuedIface, QueuedDcaIface
+
+def preset(top_cls, mem, vectors=True):
+    """Stores the expected ID and VER values in the register file."""
+    regs = []
+    top_cls._id_ver_regs(0, "", regs, vectors)
+    for path, cls, adr, exp, name in regs:
+        mem[adr] = exp
+    return regs
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_vectors_opt_in(agwb_std, batched):
+    lower = MemIface()
+    preset(agwb_std.MAIN, lower.mem)
+    top = agwb_std.MAIN(lower, 0)
+    # By default only the block and its subblocks are verified
+    top.verify_id_and_version(batched=batched)
+    assert len(lower.accesses("r")) == 2
+    lower.log.clear()
+    top.verify_id_and_version(batched=batched, vectors=True)
+    assert len(lower.accesses("r")) == 2 + 2 * len(top.LINKS)
+
+@pytest.mark.parametrize("lower_cls", [MemIface, QueuedIface])
+def test_batched_reports_all_mismatches(agwb_std, lower_cls):
+    lower = lower_cls()
+    regs = preset(agwb_std.MAIN, lower.mem)
+    lower.mem[regs[0][2]] += 1
+    lower.mem[regs[-1][2]] += 1
+    top = agwb_std.MAIN(lower, 0)
+    with pytest.raises(Exception, match="mismatch in 2 registers"):
+        top.verify_id_and_version(batched=True, vectors=True)
+
+def test_batched_dca(agwb_dca):
+    lower = QueuedDcaIface()
+    preset(agwb_dca.MAIN, lower.mem)
+    top = agwb_dca.MAIN(lower, 0)
+    top.verify_id_and_version(batched=True, vectors=True)
+    assert lower.dispatches == 1
+    lower.mem[agwb_dca.MAIN.x__regmap["LINKS[2].ID"][0]] = 0
+    with pytest.raises(Exception, match="SYS1 has ID"):
+        top.verify_id_and_version(vectors=True)
@@ -32,3 +32,22 @@
   r> ( val address )
   wb!
 ;
+
+\ Masked write of the bitfield with a single bus access
+\ (for blocks with the masked_wr attribute).
+\ The address is the address in the masked write window,
+\ the mask and the shift are related to the half of the register
+\ (as delivered by the generated *.MWR words).
+: bfm! ( val address mask shift -- )
+  rot ( val mask shift address )
+  >r ( val mask shift ) ( R: address )
+  rot ( mask shift val ) ( R: address )
+  swap ( mask val shift ) ( R: address )
+  lshift ( mask val ) ( R: address )
+  over ( mask val mask ) ( R: address )
+  and ( mask val ) ( R: address )
+  swap $10 lshift ( val mask<<16 ) ( R: address )
+  or ( val ) ( R: address )
+  r> ( val address )
+  wb!
+;
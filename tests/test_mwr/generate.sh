@@ -0,0 +1,4 @@
+#!/bin/bash
+set -e
+mkdir -p gen
+../../src/addr_gen_wb.py --infile mwr_test.xml --hdl ./gen
@@ -0,0 +1,185 @@
+-------------------------------------------------------------------------------
+-- Title      : Testbench for the masked write windows
+-- Project    :
+-------------------------------------------------------------------------------
+-- File       : mwr_test_tb.vhd
+-- Platform   :
+-- Standard   : VHDL'93/02
+-------------------------------------------------------------------------------
+-- Description: Self-checking test of the masked write windows generated
+--              for the block with the masked_wr attribute.
+--              The vector of control registers is modified via both halves
+--              of the window, and the results are checked both in the
+--              register outputs and by reading the registers via the bus.
+-------------------------------------------------------------------------------
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+library general_cores;
+use general_cores.wishbone_pkg.all;
+library agwb;
+use agwb.MWR_TEST_pkg.all;
+
+-------------------------------------------------------------------------------
+
+entity mwr_test_tb is
+
+end entity mwr_test_tb;
+
+-------------------------------------------------------------------------------
+
+architecture test of mwr_test_tb is
+
+  -- The registers area (5 words) rounded up to the power of two
+  constant c_MWR_WINDOW : integer := 8;
+  constant c_REGS_ADR   : integer := to_integer(C_REGS_REG_ADDR);
+  constant c_PLAIN_ADR  : integer := to_integer(C_PLAIN_REG_ADDR);
+
+  signal rst_n_i   : std_logic := '0';
+  signal clk_sys_i : std_logic := '1';
+  signal done      : boolean   := false;
+
+  signal wb_s_in  : t_wishbone_slave_in := (cyc => '0', stb => '0', we => '0',
+                                             adr => (others => '0'), dat => (others => '0'),
+                                             sel => (others => '0'));
+  signal wb_s_out : t_wishbone_slave_out;
+  signal REGS_o   : ut_REGS_array(c_REGS_size - 1 downto 0);
+  signal PLAIN_o  : t_PLAIN;
+
+begin  -- architecture test
+
+  DUT : entity agwb.MWR_TEST
+    port map (
+      slave_i   => wb_s_in,
+      slave_o   => wb_s_out,
+      REGS_o    => REGS_o,
+      PLAIN_o   => PLAIN_o,
+      rst_n_i   => rst_n_i,
+      clk_sys_i => clk_sys_i);
+
+  -- clock generation (stopped at the end of the test)
+  clk_sys_i <= not clk_sys_i after 5 ns when not done else clk_sys_i;
+
+  Test_Proc : process
+
+    -- Single bus access, returns the read data and the error flag
+    procedure wb_access (
+      constant adr : in  integer;
+      constant we  : in  std_logic;
+      constant wd  : in  std_logic_vector(31 downto 0);
+      variable rd  : out std_logic_vector(31 downto 0);
+      variable err : out boolean) is
+    begin
+      wb_s_in.adr <= std_logic_vector(to_unsigned(adr, 32));
+      wb_s_in.dat <= wd;
+      wb_s_in.we  <= we;
+      wb_s_in.sel <= (others => '1');
+      wb_s_in.cyc <= '1';
+      wb_s_in.stb <= '1';
+      loop
+        wait until rising_edge(clk_sys_i);
+        exit when wb_s_out.ack = '1' or wb_s_out.err = '1';
+      end loop;
+      rd  := wb_s_out.dat;
+      err := wb_s_out.err = '1';
+      wb_s_in.cyc <= '0';
+      wb_s_in.stb <= '0';
+      wb_s_in.we  <= '0';
+      wait until rising_edge(clk_sys_i);
+    end procedure wb_access;
+
+    procedure wb_write (
+      constant adr : in integer;
+      constant wd  : in std_logic_vector(31 downto 0)) is
+      variable rd  : std_logic_vector(31 downto 0);
+      variable err : boolean;
+    begin
+      wb_access(adr, '1', wd, rd, err);
+      assert not err report "Error in write to address " & integer'image(adr) severity failure;
+    end procedure wb_write;
+
+    -- Masked write via the given half (0: bits 15..0, 1: bits 31..16) of the window
+    procedure wb_mwr (
+      constant adr  : in integer;
+      constant half : in integer;
+      constant mask : in std_logic_vector(15 downto 0);
+      constant val  : in std_logic_vector(15 downto 0)) is
+    begin
+      wb_write(adr + (half + 1) * c_MWR_WINDOW, mask & val);
+    end procedure wb_mwr;
+
+    -- Checks the register value both in the outputs and via the bus
+    procedure check (
+      constant adr  : in integer;
+      constant outp : in std_logic_vector(31 downto 0);
+      constant exp  : in std_logic_vector(31 downto 0)) is
+      variable rd  : std_logic_vector(31 downto 0);
+      variable err : boolean;
+    begin
+      assert outp = exp report "Wrong output of the register at address " & integer'image(adr) severity failure;
+      wb_access(adr, '0', (others => '0'), rd, err);
+      assert not err report "Error in read from address " & integer'image(adr) severity failure;
+      assert rd = exp report "Wrong value read from address " & integer'image(adr) severity failure;
+    end procedure check;
+
+    variable rd  : std_logic_vector(31 downto 0);
+    variable err : boolean;
+
+  begin
+    rst_n_i <= '0';
+    for i in 1 to 3 loop
+      wait until rising_edge(clk_sys_i);
+    end loop;
+    rst_n_i <= '1';
+    wait until rising_edge(clk_sys_i);
+
+    wb_write(c_REGS_ADR, x"12345678");
+    wb_write(c_REGS_ADR + 1, x"9abcdef0");
+    wb_write(c_PLAIN_ADR, x"00000000");
+    check(c_REGS_ADR, to_slv(REGS_o(0)), x"12345678");
+    check(c_REGS_ADR + 1, to_slv(REGS_o(1)), x"9abcdef0");
+
+    -- Field LO (bits 11..0) via the lower half
+    wb_mwr(c_REGS_ADR, 0, x"0fff", x"0abc");
+    check(c_REGS_ADR, to_slv(REGS_o(0)), x"12345abc");
+    assert REGS_o(0).LO = x"abc" report "Wrong value of LO" severity failure;
+    -- The other register of the vector is not modified
+    check(c_REGS_ADR + 1, to_slv(REGS_o(1)), x"9abcdef0");
+
+    -- Field HI (bits 31..20) via the upper half, in the second register
+    wb_mwr(c_REGS_ADR + 1, 1, x"fff0", x"5550");
+    check(c_REGS_ADR + 1, to_slv(REGS_o(1)), x"555cdef0");
+    assert REGS_o(1).HI = x"555" report "Wrong value of HI" severity failure;
+    check(c_REGS_ADR, to_slv(REGS_o(0)), x"12345abc");
+
+    -- Field MID (bits 19..12) crossing the halves needs two writes
+    wb_mwr(c_REGS_ADR, 0, x"f000", x"e000");
+    wb_mwr(c_REGS_ADR, 1, x"000f", x"000d");
+    check(c_REGS_ADR, to_slv(REGS_o(0)), x"123deabc");
+    assert REGS_o(0).MID = x"de" report "Wrong value of MID" severity failure;
+
+    -- Only the bits enabled by the mask are modified
+    wb_mwr(c_REGS_ADR + 1, 0, x"0000", x"ffff");
+    wb_mwr(c_REGS_ADR + 1, 1, x"0000", x"ffff");
+    check(c_REGS_ADR + 1, to_slv(REGS_o(1)), x"555cdef0");
+    wb_mwr(c_REGS_ADR + 1, 0, x"2001", x"ffff");
+    check(c_REGS_ADR + 1, to_slv(REGS_o(1)), x"555cfef1");
+
+    -- Register without bitfields
+    wb_mwr(c_PLAIN_ADR, 1, x"ff00", x"a5ff");
+    wb_mwr(c_PLAIN_ADR, 0, x"00ff", x"ff5a");
+    check(c_PLAIN_ADR, PLAIN_o, x"a500005a");
+
+    -- Reads from the windows end with an error
+    for half in 0 to 1 loop
+      wb_access(c_REGS_ADR + (half + 1) * c_MWR_WINDOW, '0', (others => '0'), rd, err);
+      assert err report "Read from the masked write window didn't end with an error" severity failure;
+    end loop;
+
+    report "Masked write test passed" severity note;
+    done <= true;
+    wait;
+  end process Test_Proc;
+
+end architecture test;